@@ -0,0 +1,369 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+# Banco de pruebas del pipeline: genera conjuntos de datos SQLite reproducibles de distintos
+# tamaños, mide cada paso en un proceso propio y guarda el resultado en un histórico JSON.
+PROJECT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'production_analysis')
+BENCHMARK_DIR = os.path.join(PROJECT_DIR, 'data', 'benchmark')
+HISTORY_FILE = os.path.join(BENCHMARK_DIR, 'history.json')
+
+DATASET_SIZES = (10_000, 100_000, 1_000_000, 10_000_000)
+START_DATE, END_DATE = '2023-01-01', '2023-12-31'
+BUDGET, EFFICIENCY_IMPROVEMENT = 100000, 10
+
+STEPS = ('etl_process', 'perform_analysis', 'improve_efficiency', 'generate_visualizations', 'data_visualization')
+# Métricas de cada paso que se comparan entre ejecuciones
+COMPARED_METRICS = ('wall_time', 'peak_memory')
+# Diferencias absolutas por debajo de las cuales no se considera regresión (ruido de medida)
+NOISE_FLOOR = {'wall_time': 0.05, 'peak_memory': 1 * 2**20}
+
+
+def dataset_dir(size, seed, directory=BENCHMARK_DIR):
+    return os.path.join(directory, f"{size}-seed{seed}")
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def prepare_dataset(size, seed):
+    """
+    Deja en la base de trabajo el conjunto de datos del tamaño y la semilla indicados.
+
+    La primera vez se genera con data_generator y se guarda una copia intacta; las siguientes
+    se restaura esa copia, de modo que todas las ejecuciones parten de los mismos datos.
+
+    Args:
+    size (int): Número de transacciones.
+    seed (int): Semilla del generador.
+
+    Returns:
+    float: Segundos de generación, o None si se restauró la copia.
+    """
+    from django.conf import settings
+    from django.core.cache import cache
+    from django.core.management import call_command
+    from django.db import connections
+
+    database = settings.DATABASES['default']['NAME']
+    pristine = os.path.join(settings.BENCHMARK_DATA_DIR, 'dataset.sqlite3')
+    shutil.rmtree(settings.ANALYTICS_SNAPSHOT_DIR, ignore_errors=True)
+    cache.clear()
+    connections.close_all()
+
+    if os.path.exists(pristine):
+        shutil.copyfile(pristine, database)
+        return None
+
+    if os.path.exists(database):
+        os.remove(database)
+    started = time.perf_counter()
+    call_command('migrate', verbosity=0)
+    from scripts import data_generator
+    data_generator.main(size, START_DATE, END_DATE, seed=seed)
+    elapsed = time.perf_counter() - started
+    connections.close_all()
+    shutil.copyfile(database, pristine)
+    cache.clear()
+    return elapsed
+
+
+def measure(size, seed, output, etl_chunk_size=None, trace_memory=False):
+    """
+    Mide los pasos del pipeline sobre un conjunto de datos. Se ejecuta en un proceso hijo
+    configurado con production_analysis.benchmark_settings.
+
+    Args:
+    size (int): Número de transacciones.
+    seed (int): Semilla del generador.
+    output (str): Fichero JSON donde se escribe el resultado.
+    etl_chunk_size (int, optional): Tamaño de bloque del ETL; por defecto, el ETL en memoria.
+    trace_memory (bool): Medir el pico de memoria con tracemalloc, que ralentiza los pasos.
+    """
+    sys.path.insert(0, PROJECT_DIR)
+    import django
+    django.setup()
+
+    from django.conf import settings
+    from analyzer.models import LogisticProcess
+    from scripts import data_visualization, efficiency_improvement, etl_process, instrumentation, performance_analysis, visualization
+
+    generate_seconds = prepare_dataset(size, seed)
+
+    def improve_all_processes():
+        for process_id in LogisticProcess.objects.order_by('id').values_list('id', flat=True):
+            efficiency_improvement.improve_efficiency(process_id, BUDGET, EFFICIENCY_IMPROVEMENT)
+
+    steps = {
+        'etl_process': lambda: etl_process.etl_process(chunk_size=etl_chunk_size),
+        'perform_analysis': performance_analysis.perform_analysis,
+        'improve_efficiency': improve_all_processes,
+        'generate_visualizations': visualization.generate_visualizations,
+        'data_visualization': data_visualization.generate_visualizations,
+    }
+
+    # Las visualizaciones escriben sus imágenes en el directorio actual
+    output_dir = os.path.join(settings.BENCHMARK_DATA_DIR, 'output')
+    os.makedirs(output_dir, exist_ok=True)
+    os.chdir(output_dir)
+
+    with instrumentation.pipeline(f"benchmark-{size}", trace_memory=trace_memory) as run:
+        for name in STEPS:
+            with run.stage(name):
+                steps[name]()
+
+    stages = [stage.to_dict() for stage in run.stages]
+    with open(output, 'w') as output_file:
+        json.dump({
+            'size': size,
+            'seed': seed,
+            'etl_chunk_size': etl_chunk_size,
+            'trace_memory': trace_memory,
+            'generate_seconds': generate_seconds,
+            'steps': {stage['stage']: stage for stage in stages if stage['stage'] in STEPS},
+            'stages': stages,
+        }, output_file)
+
+
+def load_history(path=HISTORY_FILE):
+    if not os.path.exists(path):
+        return []
+    with open(path) as history_file:
+        return json.load(history_file)
+
+
+def save_history(history, path=HISTORY_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as history_file:
+        json.dump(history, history_file, indent=1)
+    os.replace(tmp, path)
+
+
+def best_of(results):
+    """
+    Combina repeticiones de una medida conservando el mínimo de cada métrica de cada paso.
+
+    Args:
+    results (list): Resultados de measure para el mismo conjunto de datos.
+
+    Returns:
+    dict: Resultado con las métricas mínimas y las etapas de la repetición más rápida.
+    """
+    fastest = min(results, key=lambda result: sum(stage['wall_time'] for stage in result['steps'].values()))
+    steps = {}
+    for step, stage in fastest['steps'].items():
+        steps[step] = dict(stage)
+        for metric, value in stage.items():
+            values = [result['steps'][step][metric] for result in results]
+            if isinstance(value, (int, float)) and None not in values:
+                steps[step][metric] = min(values)
+        steps[step]['wall_time_samples'] = [result['steps'][step]['wall_time'] for result in results]
+    return {**fastest, 'steps': steps, 'repeat': len(results)}
+
+
+def run_benchmarks(sizes=DATASET_SIZES, seed=0, label=None, etl_chunk_size=None, repeat=1, trace_memory=False,
+                   directory=BENCHMARK_DIR, history_file=HISTORY_FILE):
+    """
+    Mide el pipeline para cada tamaño de conjunto de datos, cada uno en un proceso nuevo, y
+    añade los resultados al histórico.
+
+    Args:
+    sizes (tuple): Números de transacciones de los conjuntos de datos.
+    seed (int): Semilla del generador.
+    label (str, optional): Etiqueta de la ejecución, útil como referencia en compare_runs.
+    etl_chunk_size (int, optional): Tamaño de bloque del ETL.
+    repeat (int): Repeticiones por conjunto de datos; se conserva el mínimo de cada métrica.
+    trace_memory (bool): Medir también el pico de memoria; los tiempos no son comparables con los
+        de ejecuciones sin esta opción.
+    directory (str): Directorio de los conjuntos de datos.
+    history_file (str): Fichero JSON del histórico.
+
+    Returns:
+    list: Registros añadidos al histórico, uno por tamaño.
+    """
+    started_at = datetime.now(timezone.utc).isoformat()
+    commit = git_commit()
+    records = []
+    for size in sizes:
+        data_dir = dataset_dir(size, seed, directory)
+        os.makedirs(data_dir, exist_ok=True)
+        output = os.path.join(data_dir, 'result.json')
+        print(f"Midiendo {size} transacciones (semilla {seed})...")
+        command = [sys.executable, os.path.abspath(__file__), 'measure', '--size', str(size), '--seed', str(seed),
+                   '--output', output]
+        if etl_chunk_size:
+            command += ['--etl-chunk-size', str(etl_chunk_size)]
+        if trace_memory:
+            command.append('--trace-memory')
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE='production_analysis.benchmark_settings',
+                   BENCHMARK_DATA_DIR=data_dir, MPLBACKEND='Agg')
+        results = []
+        for _ in range(repeat):
+            subprocess.run(command, env=env, check=True, stdout=subprocess.DEVNULL)
+            with open(output) as output_file:
+                results.append(json.load(output_file))
+        result = best_of(results)
+        records.append({
+            'label': label,
+            'commit': commit,
+            'started_at': started_at,
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            **result,
+        })
+
+    save_history(load_history(history_file) + records, history_file)
+    return records
+
+
+def run_key(record):
+    # Los registros anteriores a la opción --trace-memory se midieron siempre con tracemalloc
+    return record['size'], record['seed'], record.get('etl_chunk_size'), record.get('trace_memory', True)
+
+
+def find_baseline(history, record, baseline=None):
+    """
+    Busca la ejecución de referencia de un registro: la última anterior con el mismo tamaño,
+    semilla, tamaño de bloque del ETL y medida de memoria, restringida a la etiqueta o commit indicados.
+
+    Args:
+    history (list): Registros del histórico.
+    record (dict): Registro que se quiere comparar.
+    baseline (str, optional): Etiqueta o commit de referencia.
+
+    Returns:
+    dict: Registro de referencia, o None si no hay ninguno.
+    """
+    for candidate in reversed(history[:history.index(record)]):
+        if run_key(candidate) != run_key(record):
+            continue
+        if baseline is None or baseline in (candidate.get('label'), candidate.get('commit')):
+            return candidate
+    return None
+
+
+def compare_runs(history, threshold=0.1, baseline=None):
+    """
+    Compara la última ejecución de cada conjunto de datos con su referencia.
+
+    Args:
+    history (list): Registros del histórico.
+    threshold (float): Aumento relativo a partir del cual un paso se marca como regresión.
+    baseline (str, optional): Etiqueta o commit de referencia; por defecto, la ejecución anterior.
+
+    Returns:
+    list: Filas con el paso, la métrica, ambos valores, el cambio relativo y si es regresión.
+    """
+    latest = {}
+    for record in history:
+        latest[run_key(record)] = record
+
+    rows = []
+    for record in latest.values():
+        reference = find_baseline(history, record, baseline)
+        if reference is None:
+            continue
+        for step in STEPS:
+            for metric in COMPARED_METRICS:
+                current = record['steps'].get(step, {}).get(metric)
+                previous = reference['steps'].get(step, {}).get(metric)
+                if current is None or previous is None:
+                    continue
+                change = (current - previous) / previous if previous else 0.0
+                rows.append({
+                    'size': record['size'],
+                    'step': step,
+                    'metric': metric,
+                    'baseline': previous,
+                    'current': current,
+                    'change': change,
+                    'regression': change > threshold and current - previous > NOISE_FLOOR[metric],
+                    'baseline_run': reference.get('label') or reference.get('commit') or reference['started_at'],
+                })
+    return rows
+
+
+def _format_metric(metric, value):
+    return f"{value / 2**20:.1f} MB" if metric == 'peak_memory' else f"{value:.3f} s"
+
+
+def print_records(records):
+    print(f"\n{'transacciones':>14}{'paso':>26}{'reloj (s)':>11}{'CPU (s)':>10}{'pico MB':>10}{'SQL':>8}")
+    for record in records:
+        for step in STEPS:
+            stage = record['steps'][step]
+            peak = f"{stage['peak_memory'] / 2**20:.1f}" if stage['peak_memory'] is not None else '-'
+            print(f"{record['size']:>14}{step:>26}{stage['wall_time']:>11.3f}{stage['cpu_time']:>10.3f}{peak:>10}"
+                  f"{stage['query_count']:>8}")
+
+
+def print_comparison(rows, threshold):
+    if not rows:
+        print("No hay ejecuciones de referencia con las que comparar.")
+        return
+    print(f"\nComparación con la ejecución de referencia (umbral {threshold:.0%}):")
+    for row in rows:
+        flag = 'REGRESIÓN' if row['regression'] else ''
+        print(f"  {row['size']:>10} {row['step']:<24} {row['metric']:<12} "
+              f"{_format_metric(row['metric'], row['baseline']):>12} -> {_format_metric(row['metric'], row['current']):>12} "
+              f"{row['change']:>+8.1%} {flag}")
+    regressions = sum(row['regression'] for row in rows)
+    print(f"\n{regressions} regresiones." if regressions else "\nSin regresiones.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banco de pruebas del pipeline de análisis.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help="Mide el pipeline y añade el resultado al histórico.")
+    run_parser.add_argument('--sizes', type=int, nargs='+', default=list(DATASET_SIZES))
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument('--label')
+    run_parser.add_argument('--etl-chunk-size', type=int)
+    run_parser.add_argument('--repeat', type=int, default=1)
+    run_parser.add_argument('--trace-memory', action='store_true', help="Mide el pico de memoria con tracemalloc.")
+    run_parser.add_argument('--compare', action='store_true', help="Compara con la ejecución anterior al terminar.")
+    run_parser.add_argument('--threshold', type=float, default=0.1)
+
+    compare_parser = commands.add_parser('compare', help="Marca las regresiones de la última ejecución.")
+    compare_parser.add_argument('--baseline', help="Etiqueta o commit de referencia.")
+    compare_parser.add_argument('--threshold', type=float, default=0.1)
+
+    measure_parser = commands.add_parser('measure', help=argparse.SUPPRESS)
+    measure_parser.add_argument('--size', type=int, required=True)
+    measure_parser.add_argument('--seed', type=int, required=True)
+    measure_parser.add_argument('--output', required=True)
+    measure_parser.add_argument('--etl-chunk-size', type=int)
+    measure_parser.add_argument('--trace-memory', action='store_true')
+
+    args = parser.parse_args()
+    if args.command == 'measure':
+        measure(args.size, args.seed, args.output, args.etl_chunk_size, args.trace_memory)
+        return 0
+
+    if args.command == 'run':
+        print_records(run_benchmarks(args.sizes, args.seed, args.label, args.etl_chunk_size, args.repeat, args.trace_memory))
+        if not args.compare:
+            return 0
+
+    rows = compare_runs(load_history(), args.threshold, getattr(args, 'baseline', None))
+    print_comparison(rows, args.threshold)
+    # Un código de salida distinto de cero permite usar la comparación como control en CI
+    return 1 if any(row['regression'] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,37 +1,69 @@
-from production_analysis.scripts.data_generator import generate_sales_data
-from production_analysis.scripts.etl_process import etl_process
-from production_analysis.scripts.efficiency_improvement import improve_efficiency
-from production_analysis.scripts.data_visualization import generate_visualizations
-from production_analysis.scripts.performance_analysis import perform_analysis, print_analysis_results
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Los scripts usan el proyecto Django de production_analysis
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'production_analysis'))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "production_analysis.settings")
+
+import django
+django.setup()
+
+from analyzer.models import LogisticProcess
+from scripts import instrumentation
+from scripts.data_generator import main as generate_data
+from scripts.etl_process import etl_process
+from scripts.efficiency_improvement import improve_efficiency
+from scripts.visualization import generate_visualizations
+from scripts.performance_analysis import perform_analysis, print_analysis_results
+from scripts.segment_analysis import analyze_segments, print_segment_results
 
 def main():
     # Configuración
-    raw_data_file = 'raw_production_data.csv'
-    processed_data_file = 'processed_production_data.csv'
+    num_records = 1000
+    # El rango cubre el último año para que existan tipos de cambio en la fecha de inicio de cada proceso
+    start_date = (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d')
+    end_date = datetime.now().strftime('%Y-%m-%d')
     budget = 100000  # Ejemplo de presupuesto
+    efficiency_improvement = 10
+
+    with instrumentation.pipeline('main'):
+        # Paso 1: Generación de datos
+        print("Generando datos de producción...")
+        with instrumentation.stage('generate_data') as stage:
+            generate_data(num_records, start_date, end_date, bulk=True)
+            stage.rows_out = num_records
 
-    # Paso 1: Generación de datos
-    print("Generando datos de producción...")
-    generate_sales_data(raw_data_file)
+        # Paso 2: Proceso ETL
+        print("Realizando proceso ETL...")
+        with instrumentation.stage('etl'):
+            etl_process()
 
-    # Paso 2: Proceso ETL
-    print("Realizando proceso ETL...")
-    etl_process(raw_data_file, processed_data_file)
+        # Paso 4: Mejoramiento de eficiencia
+        print("Optimizando eficiencia de producción...")
+        logistic_process_id = LogisticProcess.objects.order_by('id').values_list('id', flat=True).first()
+        with instrumentation.stage('optimization'):
+            optimization_results = improve_efficiency(logistic_process_id, budget, efficiency_improvement)
+        print(optimization_results)
 
-    # Paso 4: Mejoramiento de eficiencia
-    print("Optimizando eficiencia de producción...")
-    optimization_results = improve_efficiency(processed_data_file, budget)
+        # Paso 5: Visualización de datos
+        print("Generando visualizaciones...")
+        with instrumentation.stage('visualization'):
+            generate_visualizations()
 
-    # Paso 5: Visualización de datos
-    print("Generando visualizaciones...")
-    generate_visualizations(processed_data_file, optimization_results)
+        # Paso 6: Análisis de desempeño
+        print("Realizando análisis de desempeño...")
+        with instrumentation.stage('analysis'):
+            performance_results = perform_analysis()
+        print_analysis_results(performance_results)
 
-    # Paso 6: Análisis de desempeño
-    print("Realizando análisis de desempeño...")
-    performance_results = perform_analysis(processed_data_file)
-    print_analysis_results(performance_results)
+        # Paso 7: Análisis por segmento (casa de cambio × tipo de proceso) en paralelo
+        print("Realizando análisis por segmento...")
+        with instrumentation.stage('segment_analysis'):
+            segment_results = analyze_segments()
+        print_segment_results(segment_results)
 
     print("\nProceso completo. Revise los archivos de salida para ver los resultados.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0002_alter_exchangerate_unique_together_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EtlWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=100, unique=True)),
+                ('last_id', models.BigIntegerField(default=0, help_text='Highest primary key already processed by the ETL')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProcessMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_amount', models.FloatField(default=0)),
+                ('transaction_count', models.BigIntegerField(default=0)),
+                ('exchange_rate_sum', models.FloatField(default=0, help_text='Sum of exchange rates, kept so the average can be merged incrementally')),
+                ('avg_exchange_rate', models.FloatField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('logistic_process', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='metrics', to='analyzer.logisticprocess')),
+            ],
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0003_process_metrics_etl_watermark'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyTransactionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('volume', models.FloatField(default=0)),
+                ('transaction_count', models.BigIntegerField(default=0)),
+                ('rate_sum', models.FloatField(default=0, help_text='Sum of exchange rates, kept so the mean can be merged incrementally')),
+                ('mean_rate', models.FloatField(blank=True, null=True)),
+                ('from_currency', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='from_daily_rollups', to='analyzer.currency')),
+                ('logistic_process', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='analyzer.logisticprocess')),
+                ('to_currency', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='to_daily_rollups', to='analyzer.currency')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('logistic_process', 'from_currency', 'to_currency', 'date'), name='unique_daily_rollup')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0004_daily_transaction_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatisticsAccumulator',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('state', models.JSONField(default=dict, help_text='Mergeable sufficient statistics (count, mean, M2, co-moments)')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -125,3 +125,52 @@ class GenerativeAI(models.Model):
 
     def __str__(self):
         return self.name
+
+
+class ProcessMetrics(models.Model):
+    logistic_process = models.OneToOneField(LogisticProcess, on_delete=models.CASCADE, related_name='metrics')
+    total_amount = models.FloatField(default=0)
+    transaction_count = models.BigIntegerField(default=0)
+    exchange_rate_sum = models.FloatField(default=0, help_text="Sum of exchange rates, kept so the average can be merged incrementally")
+    avg_exchange_rate = models.FloatField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Metrics of {self.logistic_process}"
+
+
+class EtlWatermark(models.Model):
+    source = models.CharField(max_length=100, unique=True)
+    last_id = models.BigIntegerField(default=0, help_text="Highest primary key already processed by the ETL")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.source} @ {self.last_id}"
+
+
+class DailyTransactionRollup(models.Model):
+    logistic_process = models.ForeignKey(LogisticProcess, on_delete=models.CASCADE, related_name='daily_rollups')
+    from_currency = models.ForeignKey(Currency, on_delete=models.CASCADE, related_name='from_daily_rollups')
+    to_currency = models.ForeignKey(Currency, on_delete=models.CASCADE, related_name='to_daily_rollups')
+    date = models.DateField()
+    volume = models.FloatField(default=0)
+    transaction_count = models.BigIntegerField(default=0)
+    rate_sum = models.FloatField(default=0, help_text="Sum of exchange rates, kept so the mean can be merged incrementally")
+    mean_rate = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['logistic_process', 'from_currency', 'to_currency', 'date'], name='unique_daily_rollup')
+        ]
+
+    def __str__(self):
+        return f"{self.logistic_process_id} {self.from_currency_id}/{self.to_currency_id} - {self.volume} ({self.date})"
+
+
+class StatisticsAccumulator(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+    state = models.JSONField(default=dict, help_text="Mergeable sufficient statistics (count, mean, M2, co-moments)")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
@@ -1,3 +1,515 @@
-from django.test import TestCase
+import os
+import tempfile
+import warnings
+from datetime import date, timedelta
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from scipy import stats
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from analyzer.models import Currency, ExchangeRate, LogisticProcess, Optimization
+from scripts import (
+    accumulators, data_generator, efficiency_improvement, instrumentation, performance_analysis,
+    portfolio_optimization, rate_cube, rate_index, segment_analysis, snapshot, solver, trend_analysis,
+)
+from scripts.sketches import HyperLogLog, QuantileSketch, ReservoirSample
+
+
+class GeneratedDataTestCase(TestCase):
+    """
+    Base de las pruebas que generan datos: data_generator.main publica el cubo de tipos de cambio e
+    invalida la caché de resultados, y las vistas y el ETL leen la instantánea y añaden métricas, así
+    que todo se redirige a un directorio temporal para no tocar los datos del proyecto.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        data_dir = tempfile.TemporaryDirectory(prefix='analyzer-tests-')
+        cls.addClassCleanup(data_dir.cleanup)
+        cls.data_dir = data_dir.name
+        settings_override = override_settings(
+            ANALYTICS_RATE_CUBE_DIR=os.path.join(data_dir.name, 'rate_cube'),
+            ANALYTICS_SNAPSHOT_DIR=os.path.join(data_dir.name, 'snapshot'),
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'analyzer-tests'}},
+            PIPELINE_METRICS_FILE=os.path.join(data_dir.name, 'pipeline_metrics.jsonl'),
+        )
+        settings_override.enable()
+        cls.addClassCleanup(settings_override.disable)
+        super().setUpClass()
+
+
+class DatabaseAnalysisBackendTests(GeneratedDataTestCase):
+    """
+    Los KPIs y tendencias agregados en la base de datos deben coincidir con los del DataFrame combinado.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        data_generator.main(1500, '2025-01-01', '2025-03-31', seed=7)
+
+    def setUp(self):
+        self.data = performance_analysis.load_data(use_snapshot=False, use_cache=False)
+
+    def test_kpis_match_pandas(self):
+        expected = performance_analysis.calculate_kpis(self.data)
+        result = performance_analysis.calculate_kpis(backend='database')
+        self.assertEqual(result.keys(), expected.keys())
+        for kpi, value in expected.items():
+            self.assertAlmostEqual(result[kpi], value, delta=1e-9 * max(1, abs(value)), msg=kpi)
+
+    def test_trends_match_pandas(self):
+        expected = performance_analysis.analyze_trends(self.data)
+        result = performance_analysis.analyze_trends(backend='database')
+        self.assertEqual(result.keys(), expected.keys())
+        for trend, value in expected.items():
+            self.assertAlmostEqual(result[trend], value, delta=1e-9 * max(1, abs(value)), msg=trend)
+
+    def test_segment_trends_match_pandas(self):
+        expected = trend_analysis.summarize_segment_trends(trend_analysis.analyze_segment_trends(self.data))
+        result = performance_analysis.perform_analysis(backend='database')['tendencias_segmentos']
+        self.assertEqual(result.keys(), expected.keys())
+        for name, table in expected.items():
+            self.assertEqual(result[name].index.tolist(), table.index.tolist(), msg=name)
+            np.testing.assert_allclose(result[name].to_numpy(), table.to_numpy(), rtol=1e-9, atol=1e-9, err_msg=name)
+        self.assertIn('USD/EUR', result['currency_pair'].index)
+
+    def test_parallel_segments_match_groupby(self):
+        results = segment_analysis.analyze_segments(workers=2, data=self.data)
+        columns = list(segment_analysis.SEGMENT_COLUMNS.values())
+        groups = self.data.groupby(columns, observed=True)
+        self.assertEqual(len(results['segmentos']), groups.ngroups)
+        for key, rows in groups:
+            result = results['segmentos'][tuple(map(str, key))]
+            self.assertEqual(result['transacciones'], len(rows))
+            expected = {**performance_analysis.calculate_kpis(rows), **performance_analysis.analyze_trends(rows)}
+            for name, value in {**result['kpis'], **result['tendencias']}.items():
+                self.assertAlmostEqual(value, expected[name], delta=1e-9 * max(1, abs(expected[name])), msg=(key, name))
+            pd.testing.assert_frame_equal(result['correlaciones'], performance_analysis.analyze_correlations(rows))
+
+    def test_pending_messages_bypass_not_modified(self):
+        url = reverse('analyze_performance')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.client.get(reverse('improve_efficiency'), {'process_id': 999999})
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+        self.assertContains(response, 'alert(')
+        # Una vez mostrado el aviso, la página vuelve a validarse con el ETag
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_approximate_mode_bounds_exact_results(self):
+        results = performance_analysis.perform_approximate_analysis(self.data)
+        self.assertEqual(results['muestra']['total'], len(self.data))
+        distinct = results['distintos']['monedas']
+        exact = len(set(self.data['from_currency__code']) | set(self.data['to_currency__code']))
+        self.assertAlmostEqual(distinct['valor'], exact, delta=max(1, 3 * distinct['error_relativo'] * exact))
+        # Sin estado acumulado ni instantánea, la vista resume las transacciones de esta base de datos
+        response = self.client.get(reverse('analyze_performance'), {'mode': 'approximate'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Análisis Aproximado')
+        self.assertEqual(response.context['results']['muestra']['total'], len(self.data))
+
+    def test_monthly_series_totals_match_daily(self):
+        daily = performance_analysis.aggregate_series('day')
+        monthly = performance_analysis.aggregate_series('month')
+        self.assertAlmostEqual(monthly['volume'].sum(), daily['volume'].sum(), delta=1e-6 * daily['volume'].sum())
+        self.assertEqual(len(monthly), 3)
+
+
+class TrendSlopeTests(SimpleTestCase):
+    """
+    Las pendientes en forma cerrada deben coincidir con np.polyfit sobre los puntos presentes.
+    """
+
+    def setUp(self):
+        rng = np.random.default_rng(13)
+        self.values = rng.normal(100, 20, (6, 40)) + np.arange(40) * rng.normal(0, 3, (6, 1))
+        self.values[rng.random(self.values.shape) < 0.25] = np.nan
+        self.values[4, :] = np.nan
+        self.values[5, :-1] = np.nan
+
+    def polyfit_slope(self, row, offset=0):
+        present = ~np.isnan(row)
+        if present.sum() < 2:
+            return np.nan
+        return np.polyfit(np.arange(len(row))[present] + offset, row[present], 1)[0]
+
+    def test_batch_slopes_match_polyfit(self):
+        slopes = trend_analysis.batch_trend_slopes(self.values)
+        expected = [self.polyfit_slope(row) for row in self.values]
+        np.testing.assert_allclose(slopes, expected, rtol=1e-9, atol=1e-9)
+
+    def test_rolling_slopes_match_polyfit(self):
+        # Una ventana más larga que la serie usa todos los puntos disponibles hasta cada día
+        for window in (5, 12, 60):
+            slopes = trend_analysis.rolling_trend_slopes(self.values, window)
+            for row, row_slopes in zip(self.values, slopes):
+                for end in range(len(row)):
+                    start = max(0, end + 1 - window)
+                    expected = self.polyfit_slope(row[start:end + 1], start)
+                    np.testing.assert_allclose(row_slopes[end], expected, rtol=1e-7, atol=1e-9, err_msg=(window, end))
+
+
+class CurrencyComparisonTests(SimpleTestCase):
+    """
+    Las pruebas t a partir de los estadísticos acumulados deben coincidir con scipy sobre las filas.
+    """
+
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        sizes = {'USD': 40, 'EUR': 25, 'GBP': 1}
+        self.data = pd.DataFrame({
+            'from_currency__code': np.repeat(list(sizes), list(sizes.values())),
+            'amount': np.concatenate([rng.normal(1000, 150, size) for size in sizes.values()]),
+        })
+        self.state = {'currencies': {
+            code: accumulators.Moments.from_values(group['amount']) for code, group in self.data.groupby('from_currency__code')
+        }}
+
+    def test_compare_currencies_matches_ttest(self):
+        # JPY no tiene filas y GBP solo una: la prueba no está definida y ambos caminos devuelven NaN
+        pairs = [('USD', 'EUR'), ('EUR', 'GBP'), ('USD', 'JPY'), ('JPY', 'USD'), ('JPY', 'CHF')]
+        for equal_var in (True, False):
+            for currency1, currency2 in pairs:
+                with np.errstate(all='ignore'), warnings.catch_warnings():
+                    warnings.simplefilter('ignore')
+                    expected = performance_analysis.compare_currencies(self.data, currency1, currency2, equal_var)
+                result = accumulators.compare_currencies(self.state, currency1, currency2, equal_var)
+                for key, value in expected.items():
+                    np.testing.assert_allclose(
+                        result[key], value, rtol=1e-9, err_msg=(currency1, currency2, equal_var, key)
+                    )
+
+
+    def test_compare_all_currencies_matches_ttest(self):
+        # GBP tiene una sola fila: su varianza no está definida y sus pruebas dan NaN, como en scipy
+        for equal_var in (True, False):
+            results = performance_analysis.compare_all_currencies(self.data, equal_var)
+            self.assertEqual(results['valor_p'].index.tolist(), ['EUR', 'GBP', 'USD'])
+            for currency1 in results['valor_p'].index:
+                for currency2 in results['valor_p'].columns:
+                    with np.errstate(all='ignore'), warnings.catch_warnings():
+                        warnings.simplefilter('ignore')
+                        t_stat, p_value = stats.ttest_ind(
+                            self.data.loc[self.data['from_currency__code'] == currency1, 'amount'],
+                            self.data.loc[self.data['from_currency__code'] == currency2, 'amount'],
+                            equal_var=equal_var,
+                        )
+                    message = (currency1, currency2, equal_var)
+                    np.testing.assert_allclose(results['estadistica_t'].loc[currency1, currency2], t_stat, rtol=1e-9, err_msg=message)
+                    np.testing.assert_allclose(results['valor_p'].loc[currency1, currency2], p_value, rtol=1e-9, atol=1e-12, err_msg=message)
+
+class SketchTests(SimpleTestCase):
+    """
+    Los sketches combinados por lotes deben quedar dentro de su cota de error respecto al valor exacto.
+    """
+
+    def setUp(self):
+        rng = np.random.default_rng(21)
+        self.values = rng.lognormal(6, 1.2, 60000)
+        self.batches = np.array_split(self.values, 12)
+
+    def merge_all(self, sketches):
+        merged = sketches[0]
+        for sketch in sketches[1:]:
+            merged = merged.merge(sketch)
+        return merged
+
+    def test_reservoir_merge_is_uniform(self):
+        samples = [ReservoirSample.from_frame(pd.DataFrame({'amount': batch}), ['amount'], 2000) for batch in self.batches]
+        merged = self.merge_all(samples)
+        self.assertEqual(merged.seen, len(self.values))
+        self.assertEqual(len(merged.rows), 2000)
+        # Cada lote aporta a la muestra en proporción a su tamaño y la media queda dentro de 4 errores estándar
+        self.assertAlmostEqual(merged.rows.mean(), self.values.mean(), delta=4 * self.values.std() / np.sqrt(2000))
+        np.testing.assert_array_equal(self.merge_all(samples).rows, merged.rows)
+
+    def test_quantile_merge_within_rank_error(self):
+        merged = self.merge_all([QuantileSketch.from_values(batch) for batch in self.batches])
+        self.assertEqual(merged.count, len(self.values))
+        ordered = np.sort(self.values)
+        probabilities = np.array([0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99])
+        ranks = np.searchsorted(ordered, merged.quantiles(probabilities)) / len(ordered)
+        np.testing.assert_array_less(np.abs(ranks - probabilities), merged.rank_error())
+        np.testing.assert_array_equal(
+            self.merge_all([QuantileSketch.from_values(batch) for batch in self.batches]).quantiles(probabilities),
+            merged.quantiles(probabilities)
+        )
+
+    def test_hyperloglog_merge_within_relative_error(self):
+        keys = (self.values * 100).astype(np.int64) % 20000
+        merged = self.merge_all([HyperLogLog.from_values(batch) for batch in np.array_split(keys, 12)])
+        np.testing.assert_array_equal(merged.registers, HyperLogLog.from_values(keys).registers)
+        exact = len(np.unique(keys))
+        self.assertAlmostEqual(merged.estimate(), exact, delta=3 * merged.relative_error() * exact)
+
+
+class LinearSolverTests(SimpleTestCase):
+    """
+    Las soluciones analíticas y de HiGHS deben coincidir con las de SLSQP.
+    """
+
+    def assertMatchesSlsqp(self, objective, constraints, x0, bounds):
+        fast = solver.maximize(objective, constraints, x0, bounds)
+        slow = solver.maximize(lambda x: objective(x), [lambda x, c=c: c(x) for c in constraints], x0, bounds)
+        self.assertEqual(slow.method, 'slsqp')
+        self.assertAlmostEqual(fast.value, slow.value, delta=1e-6 * max(1, abs(slow.value)))
+        for fast_x, slow_x in zip(fast.x, slow.x):
+            self.assertAlmostEqual(fast_x, slow_x, delta=1e-6 * max(1, abs(slow_x)))
+        return fast
+
+    def test_exchange_model_closed_form(self):
+        for rate, budget, efficiency in ((1.1, 100000, 10), (0.73, 2500, 25), (1.9, 1e6, 0)):
+            objective = solver.LinearFunction([1 + efficiency / 100])
+            constraints = [solver.LinearFunction([-rate], budget)]
+            solution = self.assertMatchesSlsqp(objective, constraints, [1000], [(0, None)])
+            self.assertEqual(solution.method, 'closed_form')
+            self.assertAlmostEqual(solution.x[0], budget / rate)
+
+    def test_multivariable_model_highs(self):
+        objective = solver.LinearFunction([1.1, 1.25, 1.05])
+        constraints = [solver.LinearFunction([-1.2, -0.9, -1.5], 50000), solver.LinearFunction([0, -1, 0], 20000)]
+        solution = self.assertMatchesSlsqp(objective, constraints, [1000] * 3, [(0, None)] * 3)
+        self.assertEqual(solution.method, 'highs')
+
+    def test_unbounded_model_raises(self):
+        with self.assertRaises(ValueError):
+            solver.maximize(solver.LinearFunction([1.0]), [], [1000], [(0, None)])
+
+    def test_zero_slope_returns_finite_feasible_point(self):
+        for bounds, constraints, expected in (
+            ([(None, 10)], [], 10),
+            ([(2, 10)], [], 2),
+            ([(None, None)], [], 0),
+            ([(None, None)], [solver.LinearFunction([-1.0], 5)], 5),
+        ):
+            solution = solver.maximize(solver.LinearFunction([0.0], 3), constraints, [1000], bounds)
+            self.assertEqual(solution.method, 'closed_form')
+            self.assertEqual(solution.x[0], expected, msg=bounds)
+            self.assertEqual(solution.value, 3)
+
+    def test_knapsack_matches_highs(self):
+        rng = np.random.default_rng(5)
+        value, cost, caps = rng.uniform(1, 1.3, 300), rng.uniform(0.5, 2, 300), rng.uniform(100, 1000, 300)
+        cold = solver.maximize_knapsack(value, cost, 50000, caps)
+        highs = solver.maximize_linear(
+            solver.LinearFunction(value), [solver.LinearFunction(-cost, 50000)], list(zip([0] * 300, caps))
+        )
+        self.assertAlmostEqual(cold.value, highs.value, delta=1e-6 * highs.value)
+        self.assertLessEqual(cost @ cold.x, 50000 * (1 + 1e-9))
+
+        # Con otro presupuesto el orden de llenado sigue valiendo y se reutiliza
+        warm = solver.maximize_knapsack(value, cost, 80000, caps, order=cold.order)
+        self.assertEqual(warm.method, 'greedy_warm')
+        np.testing.assert_allclose(warm.x, solver.maximize_knapsack(value, cost, 80000, caps).x)
+
+
+class EfficiencyBatchTests(GeneratedDataTestCase):
+    """
+    La malla de optimize_batch debe coincidir con improve_efficiency proceso a proceso.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        data_generator.main(300, '2025-01-01', '2025-03-31', seed=11)
+        cls.process_ids = list(LogisticProcess.objects.order_by('id').values_list('id', flat=True))
+
+    def test_grid_matches_improve_efficiency(self):
+        budgets, efficiency_improvements = [1000, 250000], [0, 12.5]
+        grid = efficiency_improvement.optimize_batch(self.process_ids, budgets, efficiency_improvements)
+        self.assertEqual(len(grid), len(self.process_ids) * len(budgets) * len(efficiency_improvements))
+        solved = 0
+        for row in grid.itertuples():
+            try:
+                expected = efficiency_improvement.improve_efficiency(
+                    row.logistic_process_id, row.budget, row.efficiency_improvement
+                )
+            except ValueError as e:
+                self.assertIsNotNone(row.error, msg=str(e))
+                continue
+            self.assertIsNone(row.error)
+            solved += 1
+            for column, value in expected.items():
+                actual = getattr(row, column)
+                if isinstance(value, str):
+                    self.assertEqual(actual, value, msg=column)
+                else:
+                    self.assertAlmostEqual(actual, value, delta=1e-9 * max(1, abs(value)), msg=column)
+        self.assertGreater(solved, 0)
+
+    def test_error_rows(self):
+        without_rate = LogisticProcess.objects.get(id=self.process_ids[0])
+        without_rate.start_date = date(2000, 1, 1)
+        without_rate.save()
+        without_transactions = LogisticProcess.objects.create(
+            currency_exchange_house=without_rate.currency_exchange_house, process_type=without_rate.process_type,
+            start_date=date(2025, 2, 1), status='pending'
+        )
+        grid = efficiency_improvement.optimize_batch(
+            [without_rate.id, without_transactions.id, 999999], [1000], [10]
+        ).set_index('logistic_process_id')
+        self.assertEqual(grid.loc[without_rate.id, 'error'], "No exchange rate found for the logistic process.")
+        self.assertEqual(grid.loc[without_transactions.id, 'error'], "No transactions found for the given logistic process.")
+        self.assertEqual(grid.loc[999999, 'error'], "Logistic process not found.")
+        self.assertTrue(grid['optimal_resource_allocation'].isna().all())
+
+    def test_view_ignores_repeated_values(self):
+        response = self.client.get(reverse('improve_efficiency_batch'), {
+            'process_id': f"{self.process_ids[1]},{self.process_ids[1]}", 'budget': '1000,1000,5000', 'efficiency_improvement': 10,
+        })
+        self.assertEqual(response.status_code, 200)
+        matrix = response.json()['matrix']
+        self.assertEqual(matrix['logistic_process_ids'], [self.process_ids[1]])
+        self.assertEqual(matrix['budgets'], [1000, 5000])
+        self.assertEqual(len(response.json()['results']), 2)
+        self.assertEqual(len(matrix['max_exchange_volume'][0]), 2)
+
+    def test_invalid_parameter_returns_400(self):
+        response = self.client.get(reverse('improve_efficiency_batch'), {'budget': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+
+class PortfolioOptimizationTests(GeneratedDataTestCase):
+    """
+    El reparto por pares debe coincidir con el programa lineal completo proceso × par y guardarse como optimizaciones.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        data_generator.main(400, '2025-01-01', '2025-03-31', seed=17)
+
+    def setUp(self):
+        self.candidates = portfolio_optimization.load_candidates(date(2025, 3, 31))
+
+    def test_candidates_cover_every_process_and_pair(self):
+        self.assertEqual(len(self.candidates), len(self.candidates[['logistic_process_id', 'pair']].drop_duplicates()))
+        self.assertEqual(set(self.candidates['pair']), {'USD/EUR', 'EUR/USD'})
+        self.assertFalse(self.candidates['exchange_rate'].isna().any())
+        rate = ExchangeRate.objects.get(from_currency__code='USD', to_currency__code='EUR', date=date(2025, 3, 31))
+        usd_eur = self.candidates[self.candidates['pair'] == 'USD/EUR']
+        np.testing.assert_allclose(usd_eur['exchange_rate'], float(rate.rate))
+
+    def test_allocation_matches_full_linear_program(self):
+        process_id = int(self.candidates['logistic_process_id'].iloc[0])
+        caps = {'USD/EUR': 300, ('EUR', 'USD'): 250}
+        efficiency_improvements = {process_id: 40}
+        result = portfolio_optimization.optimize_portfolio(
+            600, caps=caps, efficiency_improvements=efficiency_improvements, candidates=self.candidates
+        )
+        allocations = result['allocations'].set_index('pair')
+        self.assertTrue((allocations['logistic_process_id'] == process_id).all())
+        self.assertEqual(allocations['cap'].to_dict(), {'EUR/USD': 250, 'USD/EUR': 300})
+        self.assertLessEqual(result['total_cost'], 600 * (1 + 1e-9))
+
+        # Programa lineal con una variable por proceso × par y el límite de cada par como restricción
+        candidates = self.candidates.assign(
+            efficiency_improvement=self.candidates['logistic_process_id'].map(efficiency_improvements).fillna(
+                self.candidates['efficiency_improvement']
+            )
+        )
+        constraints = [solver.LinearFunction(-candidates['exchange_rate'].to_numpy(), 600)] + [
+            solver.LinearFunction(-(candidates['pair'] == pair).to_numpy(dtype=np.float64), cap)
+            for pair, cap in (('USD/EUR', 300), ('EUR/USD', 250))
+        ]
+        expected = solver.maximize_linear(
+            solver.LinearFunction(1 + candidates['efficiency_improvement'].to_numpy() / 100), constraints,
+            [(0, None)] * len(candidates)
+        )
+        self.assertAlmostEqual(result['total_volume'], expected.value, delta=1e-6 * expected.value)
+
+        # Arrancar desde la solución anterior reutiliza su orden y llega al mismo reparto
+        warm = portfolio_optimization.optimize_portfolio(
+            800, caps=caps, efficiency_improvements=efficiency_improvements, previous=result, candidates=result['candidates']
+        )
+        cold = portfolio_optimization.optimize_portfolio(800, caps=caps, efficiency_improvements=efficiency_improvements,
+                                                         candidates=self.candidates)
+        self.assertEqual(warm['method'], 'greedy_warm')
+        np.testing.assert_allclose(warm['allocations']['allocation'], cold['allocations']['allocation'])
+
+    def test_save_portfolio_writes_one_optimization_per_process(self):
+        result = portfolio_optimization.optimize_portfolio(100000, caps=500, candidates=self.candidates)
+        allocations = result['allocations']
+        before = Optimization.objects.count()
+        created = portfolio_optimization.save_portfolio(result, date(2025, 4, 1))
+        self.assertEqual(Optimization.objects.count() - before, allocations['logistic_process_id'].nunique())
+        self.assertEqual(len(created), allocations['logistic_process_id'].nunique())
+
+        even_volume = (100000 / len(allocations) / allocations['exchange_rate']
+                       * (1 + allocations['efficiency_improvement'] / 100)).sum()
+        for optimization in Optimization.objects.filter(implementation_date=date(2025, 4, 1)):
+            rows = allocations[allocations['logistic_process_id'] == optimization.logistic_process_id]
+            self.assertAlmostEqual(optimization.efficiency_improvement, rows['efficiency_improvement'].iloc[0])
+            cost_per_volume = rows['cost'].sum() / rows['volume'].sum()
+            self.assertAlmostEqual(optimization.cost_reduction, (1 - cost_per_volume / (100000 / even_volume)) * 100)
+            for pair in rows['pair']:
+                self.assertIn(pair, optimization.comments)
+
+
+class RateIndexTests(GeneratedDataTestCase):
+    """
+    Las búsquedas del índice de tipos de cambio deben coincidir con las consultas del ORM.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        data_generator.main(100, '2025-01-01', '2025-01-31', seed=3)
+        # Un hueco de dos días para comprobar la búsqueda a fecha
+        ExchangeRate.objects.filter(date__in=[date(2025, 1, 10), date(2025, 1, 11)]).delete()
+
+    def test_lookup_matches_orm(self):
+        currency_ids = list(Currency.objects.values_list('id', flat=True)) + [0]
+        queries = [
+            (from_id, to_id, date(2024, 12, 30) + timedelta(days=offset))
+            for from_id in currency_ids for to_id in currency_ids for offset in range(0, 40, 3)
+        ]
+        from_ids, to_ids, dates = zip(*queries)
+        index = rate_index.get_rate_index()
+        as_of_ids, _ = index.lookup(from_ids, to_ids, dates)
+        exact_ids, _ = index.lookup(from_ids, to_ids, dates, exact=True)
+        for (from_id, to_id, day), as_of_id, exact_id in zip(queries, as_of_ids, exact_ids):
+            rates = ExchangeRate.objects.filter(from_currency_id=from_id, to_currency_id=to_id)
+            expected = rates.filter(date__lte=day).order_by('-date').values_list('id', flat=True).first()
+            self.assertEqual(as_of_id, expected or -1, msg=(from_id, to_id, day))
+            expected = rates.filter(date=day).values_list('id', flat=True).first()
+            self.assertEqual(exact_id, expected or -1, msg=(from_id, to_id, day))
+
+    def test_rate_cube_matches_index(self):
+        currency_codes = list(Currency.objects.values_list('code', flat=True)) + ['XXX']
+        queries = [
+            (from_code, to_code, date(2024, 12, 30) + timedelta(days=offset))
+            for from_code in currency_codes for to_code in currency_codes for offset in range(40)
+        ]
+        from_codes, to_codes, dates = zip(*queries)
+        index = rate_index.get_rate_index()
+        with tempfile.TemporaryDirectory() as directory:
+            cube = rate_cube.build_cube(directory)
+            self.assertTrue(rate_cube.is_current(cube))
+            for exact in (False, True):
+                expected_ids, expected_rates = index.lookup(from_codes, to_codes, dates, exact=exact, codes=True)
+                ids, rates = cube.lookup(from_codes, to_codes, dates, exact=exact, codes=True)
+                self.assertEqual(ids.tolist(), expected_ids.tolist())
+                np.testing.assert_array_equal(rates, expected_rates)
+            del cube
+
+    def test_generator_writes_only_to_temporary_locations(self):
+        self.assertTrue(rate_cube.rate_cube_dir().startswith(self.data_dir))
+        self.assertTrue(snapshot.snapshot_dir().startswith(self.data_dir))
+        self.assertTrue(instrumentation.metrics_file_path().startswith(self.data_dir))
+        self.assertIsInstance(caches['default'], LocMemCache)
+        self.assertIsNotNone(rate_cube.read_pointer())
+
+    def test_index_refreshes_when_rates_change(self):
+        index = rate_index.get_rate_index()
+        rate = ExchangeRate.objects.order_by('date').last()
+        ExchangeRate.objects.create(
+            from_currency=rate.from_currency, to_currency=rate.to_currency, date=rate.date + timedelta(days=1), rate=2
+        )
+        refreshed = rate_index.get_rate_index()
+        self.assertIsNot(refreshed, index)
+        self.assertEqual(refreshed.as_of(rate.from_currency_id, rate.to_currency_id, date(2030, 1, 1)).rate, 2)
@@ -1,6 +1,7 @@
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.http import JsonResponse
+from django.views.decorators.http import condition
 import base64
 from datetime import datetime, timedelta
 from .models import LogisticProcess, Transaction
@@ -8,6 +9,7 @@ import json
 
 from scripts import(
     data_generator,
+    dataset,
     data_visualization,
     efficiency_improvement,
     etl_process,
@@ -30,8 +32,43 @@ def run_etl(request):
     messages.success(request, 'Proceso ETL completado')
     return redirect('index')
 
+def data_etag(request, *args, **kwargs):
+    # El token cambia cada vez que el ETL o el generador escriben; permite responder 304 sin recalcular
+    return f"{dataset.data_token()}-{request.GET.urlencode()}"
+
+def data_last_modified(request, *args, **kwargs):
+    return dataset.data_modified()
+
+def has_pending_messages(request):
+    # len() no marca los avisos como leídos; solo los consume la plantilla al recorrerlos
+    return len(messages.get_messages(request)) > 0
+
+# Las páginas que heredan de base.html muestran los avisos pendientes: con avisos, la respuesta
+# se renderiza siempre (sin ETag ni Last-Modified) para que se muestren y se consuman
+def page_etag(request, *args, **kwargs):
+    return None if has_pending_messages(request) else data_etag(request)
+
+def page_last_modified(request, *args, **kwargs):
+    return None if has_pending_messages(request) else data_last_modified(request)
+
+@condition(etag_func=page_etag, last_modified_func=page_last_modified)
 def analyze_performance(request):
-    results = performance_analysis.perform_analysis()
+    if request.GET.get('mode') == 'approximate':
+        results = dataset.cached_result(
+            'performance_analysis_approximate', lambda: performance_analysis.perform_analysis(approximate=True)
+        )
+        correlations = results['correlaciones']
+        return render(request, 'analyzer/approximate_results.html', {
+            'results': results,
+            'correlations': [
+                {'var1': var1, 'var2': var2, 'valor': correlations['valor'].loc[var1, var2],
+                 'inferior': correlations['inferior'].loc[var1, var2], 'superior': correlations['superior'].loc[var1, var2]}
+                for var1 in correlations['valor'].index for var2 in correlations['valor'].columns
+                if var1 < var2 and abs(correlations['valor'].loc[var1, var2]) > 0.5
+            ],
+            'quantiles': results['cuantiles_importe'].reset_index().to_dict('records'),
+        })
+    results = dataset.cached_result('performance_analysis', performance_analysis.perform_analysis)
     return render(request, 'analyzer/results.html', {'results': results})
 
 def improve_efficiency(request):
@@ -57,6 +94,27 @@ def improve_efficiency(request):
 
     # Redirigir a la página de inicio
     return redirect('index')
+
+def _number_list(request, name, default=None, cast=float):
+    # Acepta tanto ?budget=1&budget=2 como ?budget=1,2
+    values = [value for item in request.GET.getlist(name) for value in item.split(',') if value.strip()]
+    return [cast(value) for value in values] if values else default
+
+def improve_efficiency_batch(request):
+    try:
+        process_ids = _number_list(request, 'process_id', cast=int)
+        budgets = _number_list(request, 'budget', [100000])
+        efficiency_improvements = _number_list(request, 'efficiency_improvement', [10])
+    except ValueError as e:
+        return JsonResponse({'error': f'Parámetro no válido: {str(e)}'}, status=400)
+
+    results = efficiency_improvement.optimize_batch(process_ids, budgets, efficiency_improvements)
+    records = results.astype(object).where(results.notna(), None).to_dict('records')
+    return JsonResponse({
+        'results': records,
+        'matrix': efficiency_improvement.batch_matrix(results),
+    })
+
 def visualize_data(request):
     # Generar visualizaciones
     visualization.generate_visualizations()
@@ -82,10 +140,16 @@ def visualize_data(request):
     return render(request, 'analyzer/visualizations.html', {'images': images})
 
 
+@condition(etag_func=data_etag, last_modified_func=data_last_modified)
 def get_exchange_houses(request):
-    exchange_houses = LogisticProcess.objects.values_list('currency_exchange_house__name', flat=True).distinct()
-    return JsonResponse(list(exchange_houses), safe=False)
+    exchange_houses = dataset.cached_result('exchange_houses', lambda: list(
+        LogisticProcess.objects.values_list('currency_exchange_house__name', flat=True).distinct()
+    ))
+    return JsonResponse(exchange_houses, safe=False)
 
+@condition(etag_func=data_etag, last_modified_func=data_last_modified)
 def get_currencies(request):
-    currencies = Transaction.objects.values_list('from_currency__code', flat=True).distinct()
-    return JsonResponse(list(currencies), safe=False)
+    currencies = dataset.cached_result('currencies', lambda: list(
+        Transaction.objects.values_list('from_currency__code', flat=True).distinct()
+    ))
+    return JsonResponse(currencies, safe=False)
@@ -0,0 +1,32 @@
+"""
+Django settings for the benchmark harness (benchmark.py at the repository root).
+
+Each benchmarked dataset gets its own directory, selected with the BENCHMARK_DATA_DIR
+environment variable, holding a SQLite database, the analytics snapshot, the rate cube, the result cache and
+the pipeline metrics, so benchmark runs never touch the development database.
+"""
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR
+
+BENCHMARK_DATA_DIR = os.path.abspath(os.environ.get('BENCHMARK_DATA_DIR', os.path.join(BASE_DIR, 'data', 'benchmark', 'default')))
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BENCHMARK_DATA_DIR, 'db.sqlite3'),
+    }
+}
+
+ANALYTICS_SNAPSHOT_DIR = os.path.join(BENCHMARK_DATA_DIR, 'snapshot')
+ANALYTICS_RATE_CUBE_DIR = os.path.join(BENCHMARK_DATA_DIR, 'rate_cube')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BENCHMARK_DATA_DIR, 'cache'),
+    }
+}
+
+PIPELINE_METRICS_FILE = os.path.join(BENCHMARK_DATA_DIR, 'pipeline_metrics.jsonl')
@@ -130,6 +130,33 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
+# Columnar analytics snapshot written by the ETL (scripts/snapshot.py)
+ANALYTICS_SNAPSHOT_DIR = os.path.join(BASE_DIR, 'data', 'snapshot')
+
+# Memory-mapped dense exchange-rate cube shared by all worker processes (scripts/rate_cube.py)
+ANALYTICS_RATE_CUBE_DIR = os.path.join(BASE_DIR, 'data', 'rate_cube')
+
+# In-process cache of the merged analytics DataFrame (scripts/dataset.py)
+ANALYTICS_CACHE_TTL = 300  # seconds
+ANALYTICS_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Cache of analysis results and view payloads, keyed on a data-version token that the ETL and
+# the data generator bump after writing (scripts/dataset.py). The file backend is shared by the
+# web server and the command-line scripts without external services.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'data', 'cache'),
+    }
+}
+ANALYTICS_RESULT_CACHE_TIMEOUT = 3600  # seconds
+
+# Per-stage pipeline metrics, appended as JSON Lines (scripts/instrumentation.py)
+PIPELINE_METRICS_FILE = os.path.join(BASE_DIR, 'data', 'pipeline_metrics.jsonl')
+# Peak memory per stage via tracemalloc; it slows the pipeline several times over, so it is opt-in
+# (benchmark.py run --trace-memory, python -m scripts.etl_process --trace-memory)
+PIPELINE_TRACE_MEMORY = False
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -0,0 +1,319 @@
+# accumulators.py
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.db.models import Count, Max
+from scipy import stats
+from analyzer.models import Optimization, StatisticsAccumulator
+from scripts.sketches import HyperLogLog, QuantileSketch, ReservoirSample
+
+# Estadísticos suficientes que mantiene el ETL para responder correlaciones y pruebas t sin
+# recorrer las transacciones. Los estados de dos lotes (o de dos shards) se combinan con las
+# fórmulas de Chan, de modo que el resultado no depende de cómo se partieron los datos.
+CORRELATION_VARIABLES = ['amount', 'exchange_rate__rate', 'efficiency_improvement', 'cost_reduction', 'processing_time_reduction']
+STATE_NAME = 'performance_analysis'
+# Versión del formato del estado; un estado de otra versión se recalcula con todo el histórico
+STATE_FORMAT = 2
+# Columnas de la muestra del modo aproximado; 'day' son los días desde 1970-01-01
+SAMPLE_COLUMNS = ['day'] + CORRELATION_VARIABLES
+SAMPLE_CAPACITY = 5000
+DISTINCT_COLUMNS = {
+    'monedas': ['from_currency__code', 'to_currency__code'],
+    'casas_cambio': ['currency_exchange_house__name'],
+}
+
+
+class Moments:
+    """
+    Número de observaciones, media y suma de cuadrados centrada (M2) de una variable.
+    """
+
+    def __init__(self, count=0, mean=0.0, m2=0.0):
+        self.count = int(count)
+        self.mean = float(mean)
+        self.m2 = float(m2)
+
+    @classmethod
+    def from_values(cls, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return cls()
+        mean = values.mean()
+        return cls(len(values), mean, ((values - mean) ** 2).sum())
+
+    def merge(self, other):
+        count = self.count + other.count
+        if not count:
+            return Moments()
+        delta = other.mean - self.mean
+        return Moments(
+            count,
+            self.mean + delta * other.count / count,
+            self.m2 + other.m2 + delta ** 2 * self.count * other.count / count
+        )
+
+    def variance(self, ddof=1):
+        return self.m2 / (self.count - ddof) if self.count > ddof else np.nan
+
+    def to_list(self):
+        return [self.count, self.mean, self.m2]
+
+
+class PairwiseMoments:
+    """
+    Momentos de cada par de variables sobre las filas en que ambas tienen valor, como pandas.corr().
+
+    Para el par (i, j): count[i, j] filas, mean[i, j] y m2[i, j] de la variable i en esas filas
+    (mean[j, i] y m2[j, i] son los de la variable j) y comoment[i, j] = Σ (xi - media)(xj - media).
+    """
+
+    def __init__(self, variables, count=None, mean=None, m2=None, comoment=None):
+        size = (len(variables), len(variables))
+        self.variables = list(variables)
+        self.count = np.zeros(size) if count is None else np.asarray(count, dtype=np.float64)
+        self.mean = np.zeros(size) if mean is None else np.asarray(mean, dtype=np.float64)
+        self.m2 = np.zeros(size) if m2 is None else np.asarray(m2, dtype=np.float64)
+        self.comoment = np.zeros(size) if comoment is None else np.asarray(comoment, dtype=np.float64)
+
+    @classmethod
+    def from_frame(cls, df, variables):
+        result = cls(variables)
+        values = df[variables].to_numpy(dtype=np.float64)
+        present = ~np.isnan(values)
+        for i in range(len(variables)):
+            for j in range(i, len(variables)):
+                rows = present[:, i] & present[:, j]
+                if not rows.any():
+                    continue
+                x = values[rows, i] - values[rows, i].mean()
+                y = values[rows, j] - values[rows, j].mean()
+                result.count[i, j] = result.count[j, i] = rows.sum()
+                result.mean[i, j], result.mean[j, i] = values[rows, i].mean(), values[rows, j].mean()
+                result.m2[i, j], result.m2[j, i] = (x ** 2).sum(), (y ** 2).sum()
+                result.comoment[i, j] = result.comoment[j, i] = (x * y).sum()
+        return result
+
+    def merge(self, other):
+        count = self.count + other.count
+        nonempty = count > 0
+        delta = other.mean - self.mean
+        ratio = np.divide(self.count * other.count, count, out=np.zeros_like(count), where=nonempty)
+        return PairwiseMoments(
+            self.variables,
+            count,
+            self.mean + np.divide(delta * other.count, count, out=np.zeros_like(count), where=nonempty),
+            self.m2 + other.m2 + delta ** 2 * ratio,
+            self.comoment + other.comoment + delta * delta.T * ratio
+        )
+
+    def correlation(self):
+        scale = np.sqrt(self.m2 * self.m2.T)
+        matrix = np.divide(self.comoment, scale, out=np.full_like(scale, np.nan), where=scale > 0)
+        return pd.DataFrame(matrix, index=self.variables, columns=self.variables)
+
+    def to_dict(self):
+        return {
+            'variables': self.variables,
+            'count': self.count.tolist(),
+            'mean': self.mean.tolist(),
+            'm2': self.m2.tolist(),
+            'comoment': self.comoment.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['variables'], data['count'], data['mean'], data['m2'], data['comoment'])
+
+
+def empty_state():
+    return {
+        'correlations': PairwiseMoments(CORRELATION_VARIABLES),
+        'currencies': {},
+        'sample': ReservoirSample(SAMPLE_COLUMNS, SAMPLE_CAPACITY),
+        'amount_quantiles': QuantileSketch(),
+        'distinct': {name: HyperLogLog() for name in DISTINCT_COLUMNS},
+    }
+
+
+def batch_state(df, rng=None):
+    """
+    Calcula los estadísticos suficientes y los sketches de un lote de transacciones.
+
+    Args:
+    df (pd.DataFrame): Transacciones con las columnas de CORRELATION_VARIABLES, date, los códigos
+        de moneda y currency_exchange_house__name.
+    rng (np.random.Generator, optional): Generador para el muestreo y la compactación de los sketches;
+        por defecto, cada sketch usa uno con semilla fija (sketches.SEED).
+
+    Returns:
+    dict: Momentos por par de variables, momentos del importe por moneda de origen, muestra de
+        filas, sketch de cuantiles del importe y contadores de valores distintos.
+    """
+    grouped = df.groupby('from_currency__code', observed=True)['amount'].agg(['count', 'mean', 'var'])
+    days = (pd.to_datetime(df['date']) - pd.Timestamp('1970-01-01')).dt.days
+    return {
+        'correlations': PairwiseMoments.from_frame(df, CORRELATION_VARIABLES),
+        'currencies': {
+            code: Moments(row['count'], row['mean'], 0.0 if row['count'] < 2 else row['var'] * (row['count'] - 1))
+            for code, row in grouped.iterrows() if row['count']
+        },
+        'sample': ReservoirSample.from_frame(df.assign(day=days), SAMPLE_COLUMNS, SAMPLE_CAPACITY, rng),
+        'amount_quantiles': QuantileSketch.from_values(df['amount'], rng=rng),
+        'distinct': {
+            name: HyperLogLog.from_values(pd.concat([df[column].astype(object) for column in columns]))
+            for name, columns in DISTINCT_COLUMNS.items()
+        },
+    }
+
+
+def merge_states(left, right):
+    """
+    Combina los estados de dos lotes o shards.
+
+    Args:
+    left (dict, optional): Estado acumulado; None si aún no hay ninguno.
+    right (dict): Estado a añadir.
+
+    Returns:
+    dict: Estado equivalente al calculado sobre la unión de ambos lotes.
+    """
+    if left is None:
+        return right
+    currencies = dict(left['currencies'])
+    for code, moments in right['currencies'].items():
+        currencies[code] = currencies[code].merge(moments) if code in currencies else moments
+    return {
+        'correlations': left['correlations'].merge(right['correlations']),
+        'currencies': currencies,
+        'sample': left['sample'].merge(right['sample']),
+        'amount_quantiles': left['amount_quantiles'].merge(right['amount_quantiles']),
+        'distinct': {name: left['distinct'][name].merge(right['distinct'][name]) for name in DISTINCT_COLUMNS},
+    }
+
+
+def optimizations_signature():
+    # Las métricas de optimización de cada transacción son las de su proceso; si cambian las
+    # optimizaciones, el estado acumulado deja de ser válido y hay que recalcularlo
+    signature = Optimization.objects.aggregate(count=Count('id'), max_id=Max('id'))
+    return [signature['count'], signature['max_id'] or 0]
+
+
+def load_state():
+    """
+    Lee el estado persistido.
+
+    Returns:
+    dict: Estado con la firma de optimizaciones con la que se calculó, o None si no existe o si
+        tiene un formato anterior (en ese caso se marca con 'format' para que el ETL lo recalcule).
+    """
+    accumulator = StatisticsAccumulator.objects.filter(name=STATE_NAME).first()
+    if accumulator is None or not accumulator.state:
+        return None
+    state = accumulator.state
+    if state.get('format') != STATE_FORMAT:
+        return {'format': state.get('format'), 'optimizations': state['optimizations']}
+    return {
+        'correlations': PairwiseMoments.from_dict(state['correlations']),
+        'currencies': {code: Moments(*values) for code, values in state['currencies'].items()},
+        'sample': ReservoirSample.from_dict(state['sample']),
+        'amount_quantiles': QuantileSketch.from_dict(state['amount_quantiles']),
+        'distinct': {name: HyperLogLog.from_dict(sketch) for name, sketch in state['distinct'].items()},
+        'optimizations': state['optimizations'],
+        'format': STATE_FORMAT,
+    }
+
+
+def is_current(state, signature):
+    # El estado sirve si se calculó con las optimizaciones actuales y con el formato actual
+    return state['optimizations'] == signature and state['format'] == STATE_FORMAT
+
+
+def save_state(state, signature):
+    StatisticsAccumulator.objects.update_or_create(name=STATE_NAME, defaults={'state': {
+        'correlations': state['correlations'].to_dict(),
+        'currencies': {code: moments.to_list() for code, moments in state['currencies'].items()},
+        'sample': state['sample'].to_dict(),
+        'amount_quantiles': state['amount_quantiles'].to_dict(),
+        'distinct': {name: sketch.to_dict() for name, sketch in state['distinct'].items()},
+        'optimizations': signature,
+        'format': STATE_FORMAT,
+    }})
+
+
+def update(df, signature):
+    """
+    Añade un lote de transacciones al estado persistido.
+
+    Args:
+    df (pd.DataFrame): Transacciones nuevas con las métricas de optimización de su proceso.
+    signature (list): Firma de optimizaciones con la que se adjuntaron las métricas.
+    """
+    with transaction.atomic():
+        StatisticsAccumulator.objects.select_for_update().filter(name=STATE_NAME).first()
+        save_state(merge_states(load_state(), batch_state(df)), signature)
+
+
+def rebuild(frames, signature):
+    """
+    Recalcula el estado desde cero a partir de lotes de transacciones.
+
+    Args:
+    frames (iterable): Lotes de transacciones con las métricas de optimización de su proceso.
+    signature (list): Firma de optimizaciones con la que se adjuntaron las métricas.
+    """
+    state = None
+    for df in frames:
+        state = merge_states(state, batch_state(df))
+    save_state(state or empty_state(), signature)
+
+
+def state_exists():
+    return StatisticsAccumulator.objects.filter(name=STATE_NAME, state__format=STATE_FORMAT).exists()
+
+
+def reset():
+    StatisticsAccumulator.objects.filter(name=STATE_NAME).delete()
+
+
+def correlation_matrix(state):
+    return state['correlations'].correlation()
+
+
+def compare_currencies(state, currency1, currency2, equal_var=True):
+    """
+    Prueba t de Student (o de Welch) del importe entre dos monedas de origen, a partir del estado.
+
+    Args:
+    state (dict): Estado de load_state.
+    currency1 (str): Código de la primera moneda.
+    currency2 (str): Código de la segunda moneda.
+    equal_var (bool): Si es False, aplica la prueba de Welch.
+
+    Returns:
+    dict: Resultados de la comparación, incluyendo estadísticas y valor p.
+    """
+    first = state['currencies'].get(currency1, Moments())
+    second = state['currencies'].get(currency2, Moments())
+    mean1 = first.mean if first.count else np.nan
+    mean2 = second.mean if second.count else np.nan
+    var1, var2 = first.variance(), second.variance()
+    if equal_var:
+        # Sin filas en una de las monedas la prueba no está definida, como en ttest_ind
+        dof = first.count + second.count - 2
+        defined = first.count and second.count and dof > 0
+        pooled = (first.m2 + second.m2) / dof if defined else np.nan
+        standard_error = np.sqrt(pooled * (1 / first.count + 1 / second.count)) if defined else np.nan
+    else:
+        term1, term2 = var1 / first.count if first.count else np.nan, var2 / second.count if second.count else np.nan
+        standard_error = np.sqrt(term1 + term2)
+        dof = (term1 + term2) ** 2 / (term1 ** 2 / (first.count - 1) + term2 ** 2 / (second.count - 1)) \
+            if first.count > 1 and second.count > 1 else np.nan
+    t_stat = (mean1 - mean2) / standard_error if standard_error else np.nan
+    return {
+        'moneda1_volumen_medio': mean1,
+        'moneda2_volumen_medio': mean2,
+        'diferencia_media': mean1 - mean2,
+        'estadistica_t': t_stat,
+        'valor_p': 2 * stats.t.sf(np.abs(t_stat), dof) if not np.isnan(t_stat) else np.nan,
+    }
@@ -2,6 +2,8 @@
 import os
 import django
 import random
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 import pandas as pd
 import numpy as np
@@ -10,10 +12,36 @@ import numpy as np
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "your_project_name.settings")
 django.setup()
 
+from django.db import connections
 from analyzer.models import (
     CurrencyExchangeHouse, Currency, ExchangeRate, ProcessType,
     LogisticProcess, Transaction, Optimization, Outcome, Report, GenerativeAI
 )
+from scripts import dataset, rate_cube, rate_index
+
+# Número de filas por sentencia INSERT en el modo masivo
+DEFAULT_BATCH_SIZE = 5000
+
+# Número de transacciones generadas por bloque de arrays en el modo vectorizado.
+# Es independiente de batch_size para que un mismo seed produzca siempre los mismos datos.
+GENERATION_CHUNK_SIZE = 1_000_000
+
+# Límites y volatilidad diaria del paseo aleatorio de tipos de cambio
+RATE_MIN, RATE_MAX = 0.5, 2.0
+RATE_DAILY_VOLATILITY = 0.01
+
+def report_throughput(label, rows, started):
+    """
+    Imprime el número de filas escritas y el rendimiento en filas/segundo.
+
+    Args:
+    label (str): Nombre del conjunto de datos escrito.
+    rows (int): Número de filas escritas.
+    started (float): Marca de tiempo (time.perf_counter) del inicio de la escritura.
+    """
+    elapsed = time.perf_counter() - started
+    rate = rows / elapsed if elapsed > 0 else float('inf')
+    print(f"{rows} {label} written in {elapsed:.2f}s ({rate:,.0f} rows/s).")
 
 def create_currency_exchange_house():
     return CurrencyExchangeHouse.objects.create(
@@ -46,6 +74,62 @@ def create_exchange_rates(start_date, end_date):
                         date=date
                     )
 
+def create_exchange_rates_bulk(start_date, end_date, batch_size=DEFAULT_BATCH_SIZE):
+    currencies = list(Currency.objects.all())
+    date_range = pd.date_range(start=start_date, end=end_date)
+    pairs = [(f, t) for f in currencies for t in currencies if f != t]
+
+    started = time.perf_counter()
+    rates = [
+        ExchangeRate(
+            from_currency=from_currency,
+            to_currency=to_currency,
+            rate=round(random.uniform(0.5, 2), 4),
+            date=date.date()
+        )
+        for date in date_range
+        for from_currency, to_currency in pairs
+    ]
+    ExchangeRate.objects.bulk_create(rates, batch_size=batch_size)
+    report_throughput("exchange rates", len(rates), started)
+
+def generate_rate_walks(num_days, num_pairs, rng):
+    """
+    Genera un paseo aleatorio multiplicativo de tipos de cambio por cada par de monedas.
+
+    Args:
+    num_days (int): Número de días del rango.
+    num_pairs (int): Número de pares de monedas.
+    rng (np.random.Generator): Generador de números aleatorios.
+
+    Returns:
+    np.ndarray: Matriz (num_days, num_pairs) con los tipos de cambio redondeados a 4 decimales.
+    """
+    start = rng.uniform(RATE_MIN, RATE_MAX, size=num_pairs)
+    steps = rng.normal(0.0, RATE_DAILY_VOLATILITY, size=(num_days, num_pairs))
+    steps[0] = 0.0
+    walks = start * np.exp(np.cumsum(steps, axis=0))
+    return np.round(np.clip(walks, RATE_MIN, RATE_MAX), 4)
+
+def currency_pairs():
+    currency_ids = list(Currency.objects.order_by('id').values_list('id', flat=True))
+    return [(f, t) for f in currency_ids for t in currency_ids if f != t]
+
+def create_exchange_rates_vectorized(start_date, end_date, rng, batch_size=DEFAULT_BATCH_SIZE, walks=None):
+    dates = pd.date_range(start=start_date, end=end_date).date
+    pairs = currency_pairs()
+    if walks is None:
+        walks = generate_rate_walks(len(dates), len(pairs), rng)
+
+    started = time.perf_counter()
+    rates = [
+        ExchangeRate(from_currency_id=from_id, to_currency_id=to_id, rate=rate, date=date)
+        for date, day_rates in zip(dates, walks.tolist())
+        for (from_id, to_id), rate in zip(pairs, day_rates)
+    ]
+    ExchangeRate.objects.bulk_create(rates, batch_size=batch_size)
+    report_throughput("exchange rates", len(rates), started)
+
 def create_process_types():
     process_types = [
         "Currency Exchange",
@@ -75,6 +159,7 @@ def generate_transactions(num_records, start_date, end_date):
     processes = LogisticProcess.objects.all()
     currencies = Currency.objects.all()
     date_range = pd.date_range(start=start_date, end=end_date)
+    index = rate_index.get_rate_index()
 
     for _ in range(num_records):
         process = random.choice(processes)
@@ -82,11 +167,9 @@ def generate_transactions(num_records, start_date, end_date):
         to_currency = random.choice([c for c in currencies if c != from_currency])
         date = random.choice(date_range)
         
-        exchange_rate = ExchangeRate.objects.get(
-            from_currency=from_currency,
-            to_currency=to_currency,
-            date=date
-        )
+        exchange_rate_id = index.lookup([from_currency.id], [to_currency.id], [date], exact=True)[0][0]
+        if exchange_rate_id < 0:
+            raise ValueError(f"No exchange rate found for {from_currency.code}/{to_currency.code} on {date.date()}.")
         
         amount = round(random.uniform(100, 10000), 2)
         
@@ -96,8 +179,130 @@ def generate_transactions(num_records, start_date, end_date):
             from_currency=from_currency,
             to_currency=to_currency,
             amount=amount,
-            exchange_rate=exchange_rate
+            exchange_rate_id=int(exchange_rate_id)
+        )
+
+def generate_transactions_bulk(num_records, start_date, end_date, batch_size=DEFAULT_BATCH_SIZE):
+    process_ids = list(LogisticProcess.objects.values_list('id', flat=True))
+    currency_ids = list(Currency.objects.values_list('id', flat=True))
+    dates = [d.date() for d in pd.date_range(start=start_date, end=end_date)]
+    index = rate_index.get_rate_index()
+
+    started = time.perf_counter()
+    written = 0
+    while written < num_records:
+        batch = []
+        for _ in range(min(batch_size, num_records - written)):
+            from_id = random.choice(currency_ids)
+            to_id = random.choice([c for c in currency_ids if c != from_id])
+            date = random.choice(dates)
+            batch.append(Transaction(
+                logistic_process_id=random.choice(process_ids),
+                date=date,
+                from_currency_id=from_id,
+                to_currency_id=to_id,
+                amount=round(random.uniform(100, 10000), 2)
+            ))
+        # Los tipos de cambio del lote se resuelven con una sola búsqueda vectorizada
+        rate_ids, _ = index.lookup(
+            [t.from_currency_id for t in batch], [t.to_currency_id for t in batch], [t.date for t in batch], exact=True
+        )
+        if (rate_ids < 0).any():
+            raise ValueError("Missing exchange rates for some generated transactions; create rates for the full date range first.")
+        for t, rate_id in zip(batch, rate_ids.tolist()):
+            t.exchange_rate_id = rate_id
+        Transaction.objects.bulk_create(batch, batch_size=batch_size)
+        written += len(batch)
+    report_throughput("transactions", written, started)
+
+def generate_transaction_columns(num_records, num_processes, num_currencies, num_days, rng):
+    """
+    Genera las columnas de transacciones como arrays de índices.
+
+    Args:
+    num_records (int): Número de transacciones.
+    num_processes (int): Número de procesos logísticos disponibles.
+    num_currencies (int): Número de monedas disponibles (al menos 2).
+    num_days (int): Número de días del rango de fechas.
+    rng (np.random.Generator): Generador de números aleatorios.
+
+    Returns:
+    dict: Arrays 'process', 'from_currency', 'to_currency', 'day' (índices) y 'amount'.
+    """
+    from_idx = rng.integers(0, num_currencies, size=num_records)
+    # Desplazamiento en [1, n-1] para que la moneda destino nunca coincida con la de origen
+    to_idx = (from_idx + rng.integers(1, num_currencies, size=num_records)) % num_currencies
+    return {
+        'process': rng.integers(0, num_processes, size=num_records),
+        'from_currency': from_idx,
+        'to_currency': to_idx,
+        'day': rng.integers(0, num_days, size=num_records),
+        'amount': np.round(rng.uniform(100, 10000, size=num_records), 2),
+    }
+
+def build_exchange_rate_array(currency_ids, dates):
+    """
+    Construye un array denso [día, moneda origen, moneda destino] con los ids de ExchangeRate.
+
+    Args:
+    currency_ids (list): Ids de las monedas, en el orden de los índices del array.
+    dates (np.ndarray): Fechas del rango, en el orden de los índices del array.
+
+    Returns:
+    np.ndarray: Ids de tipos de cambio; -1 donde no existe tipo de cambio.
+    """
+    day, from_idx, to_idx = np.meshgrid(
+        np.arange(len(dates)), np.arange(len(currency_ids)), np.arange(len(currency_ids)), indexing='ij'
+    )
+    currency_ids = np.asarray(currency_ids, dtype=np.int64)
+    rate_ids, _ = rate_index.get_rate_index().lookup(
+        currency_ids[from_idx.ravel()], currency_ids[to_idx.ravel()], np.asarray(dates)[day.ravel()], exact=True
+    )
+    return rate_ids.reshape(day.shape)
+
+def generate_transactions_vectorized(num_records, start_date, end_date, rng, batch_size=DEFAULT_BATCH_SIZE):
+    process_ids = np.array(LogisticProcess.objects.order_by('id').values_list('id', flat=True), dtype=np.int64)
+    currency_ids = list(Currency.objects.order_by('id').values_list('id', flat=True))
+    dates = pd.date_range(start=start_date, end=end_date).date
+    rate_ids = build_exchange_rate_array(currency_ids, dates)
+    currency_ids = np.array(currency_ids, dtype=np.int64)
+
+    started = time.perf_counter()
+    written = 0
+    while written < num_records:
+        columns = generate_transaction_columns(
+            min(GENERATION_CHUNK_SIZE, num_records - written),
+            len(process_ids), len(currency_ids), len(dates), rng
         )
+        chunk_rate_ids = rate_ids[columns['day'], columns['from_currency'], columns['to_currency']]
+        if (chunk_rate_ids < 0).any():
+            raise ValueError("Missing exchange rates for some generated transactions; create rates for the full date range first.")
+
+        rows = zip(
+            process_ids[columns['process']].tolist(),
+            dates[columns['day']].tolist(),
+            currency_ids[columns['from_currency']].tolist(),
+            currency_ids[columns['to_currency']].tolist(),
+            columns['amount'].tolist(),
+            chunk_rate_ids.tolist(),
+        )
+        batch = []
+        for process_id, date, from_id, to_id, amount, rate_id in rows:
+            batch.append(Transaction(
+                logistic_process_id=process_id,
+                date=date,
+                from_currency_id=from_id,
+                to_currency_id=to_id,
+                amount=amount,
+                exchange_rate_id=rate_id
+            ))
+            if len(batch) == batch_size:
+                Transaction.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            Transaction.objects.bulk_create(batch)
+        written += len(chunk_rate_ids)
+    report_throughput("transactions", written, started)
 
 def create_optimizations():
     processes = LogisticProcess.objects.all()
@@ -133,6 +338,56 @@ def create_reports():
             created_by="AI Analysis Team"
         )
 
+def create_optimizations_bulk(batch_size=DEFAULT_BATCH_SIZE):
+    processes = LogisticProcess.objects.select_related('process_type')
+    started = time.perf_counter()
+    optimizations = [
+        Optimization(
+            logistic_process=process,
+            efficiency_improvement=random.uniform(5, 30),
+            cost_reduction=random.uniform(5, 25),
+            processing_time_reduction=random.uniform(10, 40),
+            implementation_date=datetime.now().date() - timedelta(days=random.randint(30, 180)),
+            comments=f"AI-driven optimization for {process.process_type.name}"
+        )
+        for process in processes
+    ]
+    Optimization.objects.bulk_create(optimizations, batch_size=batch_size)
+    report_throughput("optimizations", len(optimizations), started)
+
+def create_outcomes_bulk(batch_size=DEFAULT_BATCH_SIZE):
+    # Se vuelven a leer las optimizaciones porque bulk_create no devuelve claves primarias en MySQL
+    optimizations = Optimization.objects.select_related('logistic_process__process_type')
+    started = time.perf_counter()
+    outcomes = [
+        Outcome(
+            optimization=optimization,
+            description=f"Results of AI optimization for {optimization.logistic_process.process_type.name}",
+            impact=random.choices(['positive', 'neutral', 'negative'], weights=[0.7, 0.2, 0.1])[0],
+            date=optimization.implementation_date + timedelta(days=random.randint(30, 90)),
+            observations=f"Significant improvements observed in {optimization.logistic_process.process_type.name}"
+        )
+        for optimization in optimizations
+    ]
+    Outcome.objects.bulk_create(outcomes, batch_size=batch_size)
+    report_throughput("outcomes", len(outcomes), started)
+
+def create_reports_bulk(batch_size=DEFAULT_BATCH_SIZE):
+    processes = LogisticProcess.objects.select_related('process_type')
+    started = time.perf_counter()
+    reports = [
+        Report(
+            logistic_process=process,
+            date=datetime.now().date() - timedelta(days=random.randint(1, 30)),
+            summary=f"Performance summary for {process.process_type.name} after AI optimization",
+            details=f"Detailed analysis of efficiency gains, cost reductions, and processing time improvements in {process.process_type.name}",
+            created_by="AI Analysis Team"
+        )
+        for process in processes
+    ]
+    Report.objects.bulk_create(reports, batch_size=batch_size)
+    report_throughput("reports", len(reports), started)
+
 def create_generative_ai_models():
     processes = LogisticProcess.objects.all()
     ai_models = [
@@ -151,8 +406,135 @@ def create_generative_ai_models():
         )
         ai_model.used_in_processes.set(random.sample(list(processes), k=random.randint(2, len(processes))))
 
-def main(num_records, start_date, end_date):
+def split_date_range(start_date, end_date, num_shards):
+    """
+    Divide un rango de fechas en tramos contiguos que no se solapan.
+
+    Args:
+    start_date (str): Fecha de inicio del rango.
+    end_date (str): Fecha de finalización del rango.
+    num_shards (int): Número máximo de tramos.
+
+    Returns:
+    list: Lista de tuplas (fecha_inicio, fecha_fin) con fechas datetime.date.
+    """
+    dates = pd.date_range(start=start_date, end=end_date).date
+    return [(chunk[0], chunk[-1]) for chunk in np.array_split(dates, min(num_shards, len(dates)))]
+
+def generate_shard(shard):
+    """
+    Genera e inserta los tipos de cambio y las transacciones de un tramo de fechas.
+    Se ejecuta en un proceso trabajador con su propia conexión a la base de datos.
+
+    Args:
+    shard (dict): Parámetros del tramo ('index', 'start_date', 'end_date', 'num_records',
+        'walks', 'seed' y 'batch_size').
+
+    Returns:
+    dict: Resumen del tramo con el número de filas escritas y el tiempo empleado.
+    """
+    started = time.perf_counter()
+    rng = np.random.default_rng(shard['seed'])
+    try:
+        create_exchange_rates_vectorized(shard['start_date'], shard['end_date'], rng, shard['batch_size'], walks=shard['walks'])
+        generate_transactions_vectorized(shard['num_records'], shard['start_date'], shard['end_date'], rng, shard['batch_size'])
+    finally:
+        connections.close_all()
+    return {
+        'index': shard['index'],
+        'start_date': shard['start_date'],
+        'end_date': shard['end_date'],
+        'exchange_rates': int(shard['walks'].size),
+        'transactions': shard['num_records'],
+        'seconds': time.perf_counter() - started,
+    }
+
+def generate_sharded(num_records, start_date, end_date, workers, rng, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Genera tipos de cambio y transacciones en paralelo, un proceso por tramo de fechas.
+
+    Cada tramo inserta únicamente los tipos de cambio de sus propias fechas, por lo que
+    la restricción unique_exchange_rate no puede violarse entre trabajadores. Los paseos
+    aleatorios de tipos de cambio se generan una sola vez para que sean continuos entre tramos.
+
+    Args:
+    num_records (int): Número total de transacciones a generar.
+    start_date (str): Fecha de inicio del rango de datos.
+    end_date (str): Fecha de finalización del rango de datos.
+    workers (int): Número de procesos trabajadores.
+    rng (np.random.Generator): Generador del que se derivan las semillas de cada tramo.
+    batch_size (int): Número de filas por lote.
+
+    Returns:
+    dict: Resumen combinado con los totales y el detalle de cada tramo.
+    """
+    started = time.perf_counter()
+    shards = split_date_range(start_date, end_date, workers)
+    days = np.array([(end - start).days + 1 for start, end in shards])
+    walks = generate_rate_walks(int(days.sum()), len(currency_pairs()), rng)
+
+    # Reparto de transacciones proporcional al número de días de cada tramo
+    bounds = np.round(np.concatenate([[0], np.cumsum(days)]) / days.sum() * num_records).astype(int)
+    seeds = rng.integers(0, 2**63, size=len(shards)).tolist()
+    day_offsets = np.concatenate([[0], np.cumsum(days)])
+    tasks = [
+        {
+            'index': i,
+            'start_date': shard_start,
+            'end_date': shard_end,
+            'num_records': int(bounds[i + 1] - bounds[i]),
+            'walks': walks[day_offsets[i]:day_offsets[i + 1]],
+            'seed': seeds[i],
+            'batch_size': batch_size,
+        }
+        for i, (shard_start, shard_end) in enumerate(shards)
+    ]
+
+    # Los procesos hijos no deben heredar la conexión abierta del proceso padre
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = sorted(executor.map(generate_shard, tasks), key=lambda r: r['index'])
+
+    summary = {
+        'shards': results,
+        'exchange_rates': sum(r['exchange_rates'] for r in results),
+        'transactions': sum(r['transactions'] for r in results),
+        'seconds': time.perf_counter() - started,
+    }
+    for r in results:
+        print(f"  Shard {r['index']} ({r['start_date']} - {r['end_date']}): "
+              f"{r['exchange_rates']} rates, {r['transactions']} transactions in {r['seconds']:.2f}s")
+    report_throughput("rates and transactions", summary['exchange_rates'] + summary['transactions'], started)
+    return summary
+
+def main(num_records, start_date, end_date, bulk=False, batch_size=DEFAULT_BATCH_SIZE, seed=None, workers=1):
+    """
+    Genera el conjunto completo de datos sintéticos.
+
+    Args:
+    num_records (int): Número de transacciones a generar.
+    start_date (str): Fecha de inicio del rango de datos.
+    end_date (str): Fecha de finalización del rango de datos.
+    bulk (bool): Si es True, escribe con bulk_create por lotes en lugar de fila a fila.
+    batch_size (int): Número de filas por lote en el modo masivo.
+    seed (int, optional): Si se indica, genera tipos de cambio y transacciones de forma vectorizada
+        y reproducible con numpy (implica el modo masivo).
+    workers (int): Si es mayor que 1, reparte el rango de fechas en tramos generados por procesos
+        paralelos (implica el modo vectorizado).
+
+    Returns:
+    dict: Resumen de la generación en paralelo, o None en el modo de un solo proceso.
+    """
     print("Starting data generation...")
+    started = time.perf_counter()
+    summary = None
+    rng = None
+    if workers > 1 and seed is None:
+        seed = np.random.SeedSequence().entropy
+    if seed is not None:
+        bulk = True
+        rng = np.random.default_rng(seed)
+        random.seed(seed)
     
     # Crear una única casa de cambios
     exchange_house = create_currency_exchange_house()
@@ -162,10 +544,6 @@ def main(num_records, start_date, end_date):
     create_currencies()
     print("Currencies created.")
     
-    # Crear tasas de cambio
-    create_exchange_rates(start_date, end_date)
-    print("Exchange rates created.")
-    
     # Crear tipos de procesos
     create_process_types()
     print("Process types created.")
@@ -174,27 +552,60 @@ def main(num_records, start_date, end_date):
     create_logistic_processes(exchange_house)
     print("Logistic processes created.")
     
-    # Generar transacciones
-    generate_transactions(num_records, start_date, end_date)
+    if workers > 1:
+        # Cada trabajador crea los tipos de cambio de su tramo de fechas junto con sus transacciones
+        summary = generate_sharded(num_records, start_date, end_date, workers, rng, batch_size)
+    else:
+        # Crear tasas de cambio
+        if rng is not None:
+            create_exchange_rates_vectorized(start_date, end_date, rng, batch_size)
+        elif bulk:
+            create_exchange_rates_bulk(start_date, end_date, batch_size)
+        else:
+            create_exchange_rates(start_date, end_date)
+        print("Exchange rates created.")
+
+        # Generar transacciones
+        if rng is not None:
+            generate_transactions_vectorized(num_records, start_date, end_date, rng, batch_size)
+        elif bulk:
+            generate_transactions_bulk(num_records, start_date, end_date, batch_size)
+        else:
+            generate_transactions(num_records, start_date, end_date)
     print(f"{num_records} transactions generated.")
     
     # Crear optimizaciones
-    create_optimizations()
+    if bulk:
+        create_optimizations_bulk(batch_size)
+    else:
+        create_optimizations()
     print("Optimizations created.")
     
     # Crear resultados
-    create_outcomes()
+    if bulk:
+        create_outcomes_bulk(batch_size)
+    else:
+        create_outcomes()
     print("Outcomes created.")
     
     # Crear informes
-    create_reports()
+    if bulk:
+        create_reports_bulk(batch_size)
+    else:
+        create_reports()
     print("Reports created.")
     
     # Crear modelos de IA generativa
     create_generative_ai_models()
     print("Generative AI models created.")
     
-    print("Data generation completed successfully.")
+    # Publicar los tipos de cambio nuevos en el cubo compartido por los procesos
+    rate_cube.refresh_cube()
+
+    # Los DataFrames de análisis cacheados en este proceso ya no reflejan la base de datos
+    dataset.invalidate()
+    print(f"Data generation completed successfully in {time.perf_counter() - started:.2f}s.")
+    return summary
 
 if __name__ == "__main__":
     num_records = 1000  # Número de transacciones a generar
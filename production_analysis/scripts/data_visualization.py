@@ -1,17 +1,24 @@
 # data_visualization.py
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 from django_pandas.io import read_frame
 from analyzer.models import LogisticProcess, Optimization, Outcome, Transaction, ExchangeRate
+from scripts import rate_cube, snapshot
 
 def load_optimization_data():
-    optimization_data = Optimization.objects.select_related('logistic_process__process_type').prefetch_related('outcomes').all()
-    df = read_frame(optimization_data)
+    optimization_data = Optimization.objects.all()
+    df = read_frame(optimization_data, fieldnames=[
+        'implementation_date', 'efficiency_improvement', 'cost_reduction', 'logistic_process__process_type__name'
+    ])
     df['implementation_date'] = pd.to_datetime(df['implementation_date'])
     return df
 
-def load_transaction_data():
+def load_transaction_data(use_snapshot=True):
+    if use_snapshot and snapshot.snapshot_exists():
+        # Solo se leen de la instantánea las columnas que usan los gráficos
+        return snapshot.read_table(snapshot.TRANSACTIONS_TABLE, ['date', 'from_currency__code', 'amount'])
     transaction_data = Transaction.objects.select_related('logistic_process__process_type', 'from_currency', 'to_currency', 'exchange_rate').all()
     df = read_frame(transaction_data)
     df['date'] = pd.to_datetime(df['date'])
@@ -58,7 +65,7 @@ def outcome_distribution():
     plt.close()
 
 def transaction_volume_by_currency(df):
-    volume_by_currency = df.groupby('from_currency__code')['amount'].sum().sort_values(ascending=False)
+    volume_by_currency = df.groupby('from_currency__code', observed=True)['amount'].sum().sort_values(ascending=False)
 
     plt.figure(figsize=(12, 6))
     sns.barplot(x=volume_by_currency.index, y=volume_by_currency.values)
@@ -70,9 +77,18 @@ def transaction_volume_by_currency(df):
     plt.savefig('transaction_volume_by_currency.png')
     plt.close()
 
+def load_exchange_rate_series(from_code, to_code):
+    cube = rate_cube.get_rate_cube()
+    if cube is not None and rate_cube.is_current(cube) and from_code in cube.codes and to_code in cube.codes:
+        # Serie leída como vista del cubo mapeado, sin consultar la base de datos
+        dates, rates = cube.series(from_code, to_code, codes=True)
+        present = ~np.isnan(rates)
+        return pd.DataFrame({'date': dates[present], 'rate': rates[present]})
+    exchange_rate_data = ExchangeRate.objects.filter(from_currency__code=from_code, to_currency__code=to_code).order_by('date')
+    return read_frame(exchange_rate_data, fieldnames=['date', 'rate'])
+
 def exchange_rate_trend():
-    exchange_rate_data = ExchangeRate.objects.filter(from_currency__code='USD', to_currency__code='EUR').order_by('date')
-    exchange_rate_df = read_frame(exchange_rate_data)
+    exchange_rate_df = load_exchange_rate_series('USD', 'EUR')
     
     plt.figure(figsize=(12, 6))
     plt.plot(exchange_rate_df['date'], exchange_rate_df['rate'])
@@ -0,0 +1,333 @@
+# dataset.py
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, FloatField, Max
+from django.db.models.functions import Cast
+from analyzer.models import LogisticProcess, Transaction, Optimization
+from scripts import snapshot
+
+PROCESS_COLUMNS = ['id', 'currency_exchange_house__name', 'process_type__name', 'start_date', 'end_date', 'status']
+TRANSACTION_COLUMNS = ['logistic_process_id', 'date', 'from_currency__code', 'to_currency__code', 'amount', 'exchange_rate__rate']
+OPTIMIZATION_COLUMNS = ['logistic_process_id', 'efficiency_improvement', 'cost_reduction', 'processing_time_reduction']
+OPTIMIZATION_METRIC_COLUMNS = OPTIMIZATION_COLUMNS[1:]
+
+# Tipos compactos de las columnas extraídas. Las columnas DecimalField se convierten a float en
+# SQL para no materializar un objeto Decimal por celda; los textos repetidos son categorías.
+DECIMAL_COLUMNS = ('amount', 'exchange_rate__rate')
+FLOAT_COLUMNS = DECIMAL_COLUMNS + ('efficiency_improvement', 'cost_reduction', 'processing_time_reduction')
+INTEGER_COLUMNS = ('id', 'logistic_process_id')
+CATEGORY_COLUMNS = (
+    'from_currency__code', 'to_currency__code', 'currency_exchange_house__name', 'process_type__name', 'status'
+)
+DATE_COLUMNS = ('date', 'start_date', 'end_date', 'implementation_date')
+
+# Segundos que una entrada puede reutilizarse aunque la versión de los datos no cambie
+CACHE_TTL = getattr(settings, 'ANALYTICS_CACHE_TTL', 300)
+# Memoria máxima (bytes) que pueden ocupar los DataFrames cacheados en el proceso
+CACHE_MAX_BYTES = getattr(settings, 'ANALYTICS_CACHE_MAX_BYTES', 512 * 1024 * 1024)
+# Segundos que se conservan los resultados en la caché de Django (compartida entre procesos)
+RESULT_CACHE_TIMEOUT = getattr(settings, 'ANALYTICS_RESULT_CACHE_TIMEOUT', 3600)
+DATA_TOKEN_KEY = 'analytics:data_token'
+
+
+class DatasetCache:
+    """
+    Caché LRU en memoria de DataFrames, con caducidad por tiempo y límite de memoria.
+
+    Las claves incluyen la versión de los datos, de modo que una entrada deja de usarse en
+    cuanto cambian los datos de origen aunque no se haya invalidado explícitamente.
+    """
+
+    def __init__(self, ttl=CACHE_TTL, max_bytes=CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry['stored_at'] > self.ttl:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry['value']
+
+    def set(self, key, value):
+        size = int(value.memory_usage(deep=True).sum())
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = {'value': value, 'size': size, 'stored_at': time.monotonic()}
+            self._size += size
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'max_bytes': self.max_bytes,
+            }
+
+    def _remove(self, key):
+        self._size -= self._entries.pop(key)['size']
+
+
+_cache = DatasetCache()
+
+
+def data_version(use_snapshot=True):
+    """
+    Calcula un identificador barato de la versión de los datos de análisis.
+
+    Args:
+    use_snapshot (bool): Si la instantánea del ETL existe, su versión identifica los datos.
+
+    Returns:
+    tuple: Identificador de versión que cambia cuando cambian los datos.
+    """
+    if use_snapshot and snapshot.snapshot_exists():
+        return ('snapshot', snapshot.read_meta().get('version'))
+    transactions = Transaction.objects.aggregate(max_id=Max('id'), count=Count('id'))
+    optimizations = Optimization.objects.aggregate(max_id=Max('id'), count=Count('id'))
+    return (
+        'database',
+        transactions['max_id'], transactions['count'],
+        LogisticProcess.objects.count(),
+        optimizations['max_id'], optimizations['count'],
+    )
+
+
+def read_queryset(queryset, columns):
+    """
+    Lee un QuerySet en un DataFrame con tipos compactos.
+
+    Args:
+    queryset (QuerySet): Consulta de origen.
+    columns (list): Campos a leer, con la sintaxis de QuerySet.values().
+
+    Returns:
+    pd.DataFrame: Importes como float64, ids como int64, textos como category y fechas como datetime64.
+    """
+    aliases = {column: f"{column.replace('__', '_')}_float" for column in columns if column in DECIMAL_COLUMNS}
+    queryset = queryset.annotate(**{alias: Cast(column, FloatField()) for column, alias in aliases.items()})
+    rows = queryset.values_list(*[aliases.get(column, column) for column in columns])
+    df = pd.DataFrame.from_records(list(rows), columns=list(columns))
+    return compact_dtypes(df)
+
+
+def compact_dtypes(df):
+    """
+    Convierte las columnas conocidas de un DataFrame a sus tipos compactos.
+
+    Args:
+    df (pd.DataFrame): DataFrame de origen.
+
+    Returns:
+    pd.DataFrame: El mismo DataFrame con los tipos convertidos.
+    """
+    for column in df.columns:
+        if column in FLOAT_COLUMNS:
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype(np.float64)
+        elif column in INTEGER_COLUMNS and df[column].notna().all():
+            df[column] = df[column].astype(np.int64)
+        elif column in CATEGORY_COLUMNS:
+            df[column] = df[column].astype('category')
+        elif column in DATE_COLUMNS:
+            df[column] = pd.to_datetime(df[column], errors='coerce')
+    return df
+
+
+def memory_report(use_snapshot=False):
+    """
+    Compara la memoria del DataFrame de análisis con los tipos que devuelve values() y con los tipos compactos.
+
+    Args:
+    use_snapshot (bool): Medir el DataFrame compacto leído de la instantánea en lugar de la base de datos.
+
+    Returns:
+    pd.DataFrame: Bytes por columna de cada variante y porcentaje de reducción.
+    """
+    legacy = join_star(
+        pd.DataFrame(list(LogisticProcess.objects.values(*PROCESS_COLUMNS))),
+        pd.DataFrame(list(Transaction.objects.values(*TRANSACTION_COLUMNS))),
+        pd.DataFrame(list(Optimization.objects.values(*OPTIMIZATION_COLUMNS)), columns=OPTIMIZATION_COLUMNS)
+    )
+    report = pd.DataFrame({
+        'values_bytes': legacy.memory_usage(deep=True, index=False),
+        'compact_bytes': build_analytics_frame(use_snapshot).memory_usage(deep=True, index=False),
+    })
+    report.loc['total'] = report.sum()
+    report['reduction_pct'] = 100 * (1 - report['compact_bytes'] / report['values_bytes'])
+    return report
+
+
+def aggregate_optimizations(df_optimizations):
+    """
+    Resume las optimizaciones de cada proceso en una sola fila.
+
+    Args:
+    df_optimizations (pd.DataFrame): Optimizaciones con las columnas de OPTIMIZATION_COLUMNS.
+
+    Returns:
+    pd.DataFrame: Media de cada métrica y número de optimizaciones, indexados por logistic_process_id.
+    """
+    grouped = df_optimizations.groupby('logistic_process_id')
+    summary = grouped[OPTIMIZATION_METRIC_COLUMNS].mean()
+    summary['optimization_count'] = grouped.size()
+    return summary
+
+
+def join_star(df_processes, df_transactions, df_optimizations):
+    """
+    Une transacciones con su proceso y con el resumen de optimizaciones del proceso.
+
+    Al adjuntar una fila de optimizaciones por proceso, cada transacción aparece una sola vez
+    aunque su proceso tenga varias optimizaciones.
+
+    Args:
+    df_processes (pd.DataFrame): Procesos (dimensión).
+    df_transactions (pd.DataFrame): Transacciones (hechos).
+    df_optimizations (pd.DataFrame): Optimizaciones, una o varias por proceso.
+
+    Returns:
+    pd.DataFrame: Una fila por transacción; las métricas de optimización son NaN en procesos sin optimizaciones.
+    """
+    df = pd.merge(df_processes, df_transactions, left_on='id', right_on='logistic_process_id')
+    df = df.join(aggregate_optimizations(df_optimizations), on='logistic_process_id')
+    df['optimization_count'] = df['optimization_count'].fillna(0).astype(np.int64)
+    return df
+
+
+def read_tables(use_snapshot=True):
+    """
+    Lee las tablas de procesos, transacciones y optimizaciones con tipos compactos.
+
+    Args:
+    use_snapshot (bool): Leer la instantánea columnar del ETL cuando exista.
+
+    Returns:
+    tuple: DataFrames de procesos, transacciones y optimizaciones.
+    """
+    if use_snapshot and snapshot.snapshot_exists():
+        # Leer la instantánea columnar escrita por el ETL en lugar de consultar la base de datos
+        return (
+            snapshot.read_table(snapshot.PROCESSES_TABLE, PROCESS_COLUMNS),
+            snapshot.read_table(snapshot.TRANSACTIONS_TABLE, TRANSACTION_COLUMNS),
+            snapshot.read_table(snapshot.OPTIMIZATIONS_TABLE, OPTIMIZATION_COLUMNS),
+        )
+    return (
+        read_queryset(LogisticProcess.objects.all(), PROCESS_COLUMNS),
+        read_queryset(Transaction.objects.all(), TRANSACTION_COLUMNS),
+        read_queryset(Optimization.objects.all(), OPTIMIZATION_COLUMNS),
+    )
+
+
+def build_analytics_frame(use_snapshot=True):
+    """
+    Construye el DataFrame de transacciones con sus procesos y el resumen de optimizaciones de cada proceso.
+
+    Args:
+    use_snapshot (bool): Leer la instantánea columnar del ETL cuando exista.
+
+    Returns:
+    pd.DataFrame: Una fila por transacción con los datos de su proceso y sus optimizaciones.
+    """
+    return join_star(*read_tables(use_snapshot))
+
+
+def load_analytics_frame(use_snapshot=True, use_cache=True):
+    """
+    Devuelve el DataFrame de análisis, reutilizando la copia cacheada mientras no cambie la versión de los datos.
+
+    Args:
+    use_snapshot (bool): Leer la instantánea columnar del ETL cuando exista.
+    use_cache (bool): Usar la caché en memoria del proceso.
+
+    Returns:
+    pd.DataFrame: Copia superficial del DataFrame combinado; los llamadores pueden añadir o
+        reemplazar columnas sin afectar a la caché.
+    """
+    if not use_cache:
+        return build_analytics_frame(use_snapshot)
+    key = ('analytics', use_snapshot, data_version(use_snapshot))
+    df = _cache.get(key)
+    if df is None:
+        df = build_analytics_frame(use_snapshot)
+        _cache.set(key, df)
+    return df.copy(deep=False)
+
+
+def data_token():
+    """
+    Devuelve el token de versión de los datos, compartido entre procesos a través de la caché de Django.
+
+    Returns:
+    int: Instante (ns desde epoch) de la última escritura del ETL o del generador.
+    """
+    token = cache.get(DATA_TOKEN_KEY)
+    if token is None:
+        cache.add(DATA_TOKEN_KEY, time.time_ns(), None)
+        token = cache.get(DATA_TOKEN_KEY)
+    return token
+
+
+def data_modified():
+    return datetime.fromtimestamp(data_token() / 1e9, tz=timezone.utc)
+
+
+def cached_result(name, compute, timeout=RESULT_CACHE_TIMEOUT):
+    """
+    Devuelve un resultado de la caché de Django o lo calcula y lo guarda para la versión actual de los datos.
+
+    Args:
+    name (str): Nombre del resultado.
+    compute (callable): Función sin argumentos que calcula el resultado.
+    timeout (int): Segundos que se conserva la entrada.
+
+    Returns:
+    Resultado cacheado o recién calculado.
+    """
+    key = f"analytics:{name}:{data_token()}"
+    result = cache.get(key)
+    if result is None:
+        result = compute()
+        cache.set(key, result, timeout)
+    return result
+
+
+def invalidate():
+    """
+    Vacía la caché de DataFrames de análisis y cambia el token de versión de los datos, con lo que
+    dejan de usarse los resultados cacheados. La llaman el ETL y el generador de datos después de escribir.
+    """
+    _cache.invalidate()
+    cache.set(DATA_TOKEN_KEY, time.time_ns(), None)
+
+
+def cache_stats():
+    return _cache.stats()
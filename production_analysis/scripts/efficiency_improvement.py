@@ -1,6 +1,8 @@
 import numpy as np
-from scipy.optimize import minimize
-from analyzer.models import LogisticProcess, ExchangeRate, Transaction
+import pandas as pd
+from django.db.models import OuterRef, Subquery
+from analyzer.models import LogisticProcess, Transaction
+from scripts import rate_cube, solver
 
 def load_data():
     """
@@ -34,7 +36,7 @@ def exchange_cost(x, exchange_rate):
     Returns:
     float: Costo total.
     """
-    return x[0] * exchange_rate.rate
+    return x[0] * float(exchange_rate.rate)
 
 def exchange_volume(x, efficiency_improvement):
     """
@@ -49,50 +51,98 @@ def exchange_volume(x, efficiency_improvement):
     """
     return x[0] * (1 + efficiency_improvement / 100)
 
-def optimize_exchange(logistic_process_id, budget, efficiency_improvement):
+def budget_constraint(budget, exchange_rate):
     """
-    Optimiza la asignación de recursos para maximizar el volumen de intercambio dentro de un presupuesto.
+    Restricción de presupuesto budget - exchange_cost(x) >= 0 como función lineal.
 
     Args:
-    logistic_process_id (int): ID del proceso logístico.
     budget (float): Presupuesto total disponible.
-    efficiency_improvement (float): Porcentaje de mejora de la eficiencia.
+    exchange_rate (ExchangeRate): Tipo de cambio actual.
 
     Returns:
-    tuple: Asignación óptima de recursos y volumen máximo de intercambio.
+    solver.LinearFunction: Holgura del presupuesto.
+    """
+    return solver.LinearFunction([-float(exchange_rate.rate)], budget)
+
+def volume_objective(efficiency_improvement):
+    """
+    Volumen de intercambio exchange_volume(x) como función lineal.
+
+    Args:
+    efficiency_improvement (float): Porcentaje de mejora de eficiencia.
+
+    Returns:
+    solver.LinearFunction: Volumen en función de la asignación.
+    """
+    return solver.LinearFunction([1 + efficiency_improvement / 100])
+
+def process_exchange_rate(logistic_process_id):
+    """
+    Obtiene el tipo de cambio con el que se optimiza un proceso: el último del par de monedas de su
+    primera transacción en o antes de la fecha de inicio del proceso, del cubo de tipos de cambio
+    o del índice en memoria.
+
+    Args:
+    logistic_process_id (int): ID del proceso logístico.
+
+    Returns:
+    rate_index.Rate: Tipo de cambio, con los códigos de las monedas.
     """
     # Obtener el proceso logístico
     logistic_process = LogisticProcess.objects.get(id=logistic_process_id)
-    
-    # Obtener la primera transacción asociada para obtener el tipo de cambio
-    transaction = logistic_process.transactions.first()
-    
+
+    # Obtener el par de monedas de la primera transacción asociada
+    transaction = logistic_process.transactions.order_by('pk').values(
+        'from_currency_id', 'to_currency_id', 'from_currency__code', 'to_currency__code'
+    ).first()
+
     if not transaction:
         raise ValueError("No transactions found for the given logistic process.")
 
-    # Buscar el tipo de cambio para las monedas y la fecha
-    exchange_rate = ExchangeRate.objects.filter(
-        from_currency=transaction.from_currency,
-        to_currency=transaction.to_currency,
-        date__lte=logistic_process.start_date  # Permitir fechas anteriores o iguales
-    ).order_by('-date').first()
+    # Buscar el tipo de cambio para las monedas y la fecha (permitiendo fechas anteriores o iguales)
+    exchange_rate = rate_cube.get_rates().as_of(
+        transaction['from_currency_id'], transaction['to_currency_id'], logistic_process.start_date
+    )
 
     if not exchange_rate:
-        raise ValueError(f"No exchange rate found for currencies {transaction.from_currency} to {transaction.to_currency} on or before date {logistic_process.start_date}.")
+        raise ValueError(f"No exchange rate found for currencies {transaction['from_currency__code']} to {transaction['to_currency__code']} on or before date {logistic_process.start_date}.")
 
-    def objective(x):
-        return -exchange_volume(x, efficiency_improvement)
+    return exchange_rate
 
-    def constraint(x):
-        return budget - exchange_cost(x, exchange_rate)
+def solve_exchange(exchange_rate, budget, efficiency_improvement):
+    """
+    Maximiza el volumen de intercambio con un tipo de cambio dado dentro de un presupuesto.
 
-    x0 = [1000]  # Valor inicial
+    Args:
+    exchange_rate (rate_index.Rate): Tipo de cambio.
+    budget (float): Presupuesto total disponible.
+    efficiency_improvement (float): Porcentaje de mejora de la eficiencia.
+
+    Returns:
+    tuple: Asignación óptima de recursos y volumen máximo de intercambio.
+    """
+    # Objetivo y restricción son lineales: el solver los resuelve en forma cerrada sin iterar
+    x0 = [1000]  # Valor inicial, solo para modelos no lineales
     bounds = [(0, None)]  # Límite para la variable
-    cons = {'type': 'ineq', 'fun': constraint}
+    solution = solver.maximize(
+        volume_objective(efficiency_improvement), [budget_constraint(budget, exchange_rate)], x0, bounds
+    )
+
+    return solution.x, solution.value
+
+def optimize_exchange(logistic_process_id, budget, efficiency_improvement):
+    """
+    Optimiza la asignación de recursos para maximizar el volumen de intercambio dentro de un presupuesto.
 
-    result = minimize(objective, x0, method='SLSQP', bounds=bounds, constraints=cons)
+    Args:
+    logistic_process_id (int): ID del proceso logístico.
+    budget (float): Presupuesto total disponible.
+    efficiency_improvement (float): Porcentaje de mejora de la eficiencia.
 
-    return result.x, -result.fun
+    Returns:
+    tuple: Asignación óptima de recursos y volumen máximo de intercambio.
+    """
+    return solve_exchange(process_exchange_rate(logistic_process_id), budget, efficiency_improvement)
 
 def improve_efficiency(logistic_process_id, budget, efficiency_improvement):
     """
@@ -106,24 +156,118 @@ def improve_efficiency(logistic_process_id, budget, efficiency_improvement):
     Returns:
     dict: Resultados de la optimización.
     """
-    optimal_allocation, max_volume = optimize_exchange(logistic_process_id, budget, efficiency_improvement)
-
-    # Volver a obtener la tasa de cambio para los resultados
-    logistic_process = LogisticProcess.objects.get(id=logistic_process_id)
-    transaction = logistic_process.transactions.first()
-    exchange_rate = ExchangeRate.objects.filter(
-        from_currency=transaction.from_currency,
-        to_currency=transaction.to_currency,
-        date__lte=logistic_process.start_date
-    ).order_by('-date').first()
+    exchange_rate = process_exchange_rate(logistic_process_id)
+    optimal_allocation, max_volume = solve_exchange(exchange_rate, budget, efficiency_improvement)
 
     results = {
         'optimal_resource_allocation': optimal_allocation[0],
         'max_exchange_volume': max_volume,
         'total_cost': exchange_cost(optimal_allocation, exchange_rate),
-        'from_currency': exchange_rate.from_currency.code,
-        'to_currency': exchange_rate.to_currency.code,
+        'from_currency': exchange_rate.from_currency,
+        'to_currency': exchange_rate.to_currency,
         'exchange_rate': exchange_rate.rate
     }
 
     return results
+
+
+def load_process_rates(logistic_process_ids=None):
+    """
+    Obtiene con una sola consulta el par de monedas y el tipo de cambio que usa improve_efficiency
+    para cada proceso: el par de su primera transacción y el último tipo de cambio en o antes de
+    la fecha de inicio del proceso.
+
+    Args:
+    logistic_process_ids (list, optional): IDs de los procesos; por defecto, todos.
+
+    Returns:
+    pd.DataFrame: Una fila por proceso con logistic_process_id, from_currency, to_currency y
+        exchange_rate (NaN si el proceso no tiene transacciones o tipo de cambio).
+    """
+    first_transaction = Transaction.objects.filter(logistic_process=OuterRef('pk')).order_by('pk')
+    processes = LogisticProcess.objects.annotate(
+        pair_from_id=Subquery(first_transaction.values('from_currency')[:1]),
+        pair_to_id=Subquery(first_transaction.values('to_currency')[:1]),
+        from_currency=Subquery(first_transaction.values('from_currency__code')[:1]),
+        to_currency=Subquery(first_transaction.values('to_currency__code')[:1]),
+    ).order_by('id')
+    if logistic_process_ids is not None:
+        processes = processes.filter(id__in=logistic_process_ids)
+
+    columns = ['id', 'from_currency', 'to_currency', 'pair_from_id', 'pair_to_id', 'start_date']
+    df = pd.DataFrame(list(processes.values_list(*columns)), columns=columns)
+    # Los tipos de cambio a fecha se resuelven en bloque con el cubo o el índice compartido
+    _, df['exchange_rate'] = rate_cube.get_rates().lookup(df['pair_from_id'], df['pair_to_id'], df['start_date'])
+    return df[['id', 'from_currency', 'to_currency', 'exchange_rate']].rename(columns={'id': 'logistic_process_id'})
+
+def optimize_batch(logistic_process_ids=None, budgets=(100000,), efficiency_improvements=(10,)):
+    """
+    Resuelve improve_efficiency para todas las combinaciones de procesos, presupuestos y mejoras de
+    eficiencia con una sola consulta y en forma vectorizada.
+
+    Args:
+    logistic_process_ids (list, optional): IDs de los procesos; por defecto, todos.
+    budgets (list): Presupuestos totales disponibles.
+    efficiency_improvements (list): Porcentajes de mejora de la eficiencia.
+
+    Returns:
+    pd.DataFrame: Una fila por proceso × presupuesto × mejora con las columnas de improve_efficiency
+        y un mensaje en 'error' para los procesos que no se pueden optimizar.
+    """
+    # Los valores repetidos solo duplicarían filas de la malla
+    if logistic_process_ids is not None:
+        logistic_process_ids = list(dict.fromkeys(map(int, logistic_process_ids)))
+    budgets = np.asarray(list(dict.fromkeys(budgets)), dtype=np.float64)
+    efficiency_improvements = np.asarray(list(dict.fromkeys(efficiency_improvements)), dtype=np.float64)
+
+    rates = load_process_rates(logistic_process_ids)
+    missing = []
+    if logistic_process_ids is not None:
+        missing = sorted(set(logistic_process_ids) - set(rates['logistic_process_id']))
+        if missing:
+            rates = pd.concat([rates, pd.DataFrame({'logistic_process_id': missing})], ignore_index=True)
+
+    # Malla proceso × presupuesto × mejora resuelta en bloque
+    rate = rates['exchange_rate'].to_numpy(dtype=np.float64)[:, None, None]
+    value_per_unit = (1 + efficiency_improvements / 100)[None, None, :]
+    allocation, volume = solver.maximize_budgeted(value_per_unit, rate, budgets[None, :, None])
+    shape = allocation.shape
+
+    grid = rates.loc[rates.index.repeat(shape[1] * shape[2])].reset_index(drop=True)
+    grid.insert(1, 'budget', np.tile(np.repeat(budgets, shape[2]), shape[0]))
+    grid.insert(2, 'efficiency_improvement', np.tile(efficiency_improvements, shape[0] * shape[1]))
+    grid['optimal_resource_allocation'] = allocation.ravel()
+    grid['max_exchange_volume'] = volume.ravel()
+    grid['total_cost'] = allocation.ravel() * np.repeat(rate.ravel(), shape[1] * shape[2])
+
+    grid['error'] = None
+    grid.loc[grid['exchange_rate'].isna(), 'error'] = "No exchange rate found for the logistic process."
+    grid.loc[grid['from_currency'].isna(), 'error'] = "No transactions found for the given logistic process."
+    grid.loc[grid['logistic_process_id'].isin(missing), 'error'] = "Logistic process not found."
+    grid.loc[grid['error'].isna() & grid['optimal_resource_allocation'].isna(), 'error'] = "The optimization problem is infeasible."
+    grid.attrs['shape'] = shape
+    return grid
+
+def batch_matrix(results, value='max_exchange_volume'):
+    """
+    Convierte el resultado de optimize_batch en una matriz proceso × presupuesto × mejora.
+
+    Args:
+    results (pd.DataFrame): Resultado de optimize_batch.
+    value (str): Columna a colocar en la matriz.
+
+    Returns:
+    dict: Ejes de la matriz y valores anidados (None donde no hay solución), serializable a JSON.
+    """
+    shape = results.attrs['shape']
+    # La malla está ordenada proceso × presupuesto × mejora, así que los ejes salen de sus saltos
+    process_ids = results['logistic_process_id'].iloc[::max(shape[1] * shape[2], 1)].tolist()
+    budgets = results['budget'].iloc[:shape[1] * shape[2]:max(shape[2], 1)].tolist()
+    efficiency_improvements = results['efficiency_improvement'].iloc[:shape[2]].tolist()
+    values = results[value].to_numpy(dtype=np.float64).reshape(shape)
+    return {
+        'logistic_process_ids': process_ids,
+        'budgets': budgets,
+        'efficiency_improvements': efficiency_improvements,
+        value: np.where(np.isnan(values), None, values).tolist(),
+    }
@@ -1,25 +1,163 @@
 #etl_process
 import pandas as pd
-from analyzer.models import LogisticProcess, CurrencyExchangeHouse, ProcessType, Transaction, ExchangeRate
+from analyzer.models import (
+    LogisticProcess, CurrencyExchangeHouse, ProcessType, Transaction, Currency, Optimization,
+    ProcessMetrics, EtlWatermark, DailyTransactionRollup
+)
 from django.core.exceptions import ObjectDoesNotExist
-from django.db.models import Sum
+from django.db import connection, transaction
+from django.db.models import Q, Sum
 
-def extract_data():
+from scripts import accumulators, dataset, instrumentation, rate_index, snapshot
+
+# Número de filas por sentencia en la etapa de carga
+LOAD_CHUNK_SIZE = 5000
+
+# Número de transacciones por bloque en la extracción por bloques
+EXTRACT_CHUNK_SIZE = 50000
+
+TRANSACTION_FIELDS = (
+    'id', 'logistic_process_id', 'date', 'from_currency__code', 'to_currency__code', 'amount', 'exchange_rate__rate'
+)
+PROCESS_FIELDS = ('id', 'currency_exchange_house__name', 'process_type__name', 'start_date', 'end_date', 'status')
+
+# Nombres de las tablas origen con marca de agua persistida
+PROCESSES_SOURCE = 'logistic_processes'
+TRANSACTIONS_SOURCE = 'transactions'
+
+def get_watermarks():
+    """
+    Obtiene la última clave primaria procesada por el ETL para cada tabla origen.
+
+    Returns:
+    dict: Diccionario tabla origen -> último id procesado (0 si nunca se ha procesado).
+    """
+    stored = dict(EtlWatermark.objects.values_list('source', 'last_id'))
+    return {source: stored.get(source, 0) for source in (PROCESSES_SOURCE, TRANSACTIONS_SOURCE)}
+
+def save_watermarks(watermarks):
+    for source, last_id in watermarks.items():
+        EtlWatermark.objects.update_or_create(source=source, defaults={'last_id': last_id})
+
+def extract_processes(watermarks=None, process_ids=()):
+    """
+    Extrae los procesos logísticos.
+
+    Args:
+    watermarks (dict, optional): Últimos ids procesados por tabla origen. Si se indica, solo se
+        extraen los procesos nuevos y los indicados en process_ids.
+    process_ids (list): Ids de procesos afectados por transacciones nuevas.
+
+    Returns:
+    pd.DataFrame: Procesos extraídos.
+    """
+    data = LogisticProcess.objects.select_related('currency_exchange_house', 'process_type').all()
+    if watermarks is not None:
+        data = data.filter(Q(id__gt=watermarks[PROCESSES_SOURCE]) | Q(id__in=list(process_ids)))
+    return dataset.read_queryset(data, PROCESS_FIELDS)
+
+def extract_data(watermarks=None):
+    """
+    Extrae procesos y transacciones de la base de datos.
+
+    Args:
+    watermarks (dict, optional): Últimos ids procesados por tabla origen. Si se indica, solo se
+        extraen las transacciones nuevas y los procesos nuevos o afectados por ellas.
+
+    Returns:
+    tuple: DataFrames de procesos y de transacciones.
+    """
     try:
-        data = LogisticProcess.objects.select_related('currency_exchange_house', 'process_type').prefetch_related('transactions').all().values(
-            'id', 'currency_exchange_house__name', 'process_type__name', 'start_date', 'end_date', 'status'
-        )
-        transactions = Transaction.objects.select_related('from_currency', 'to_currency', 'exchange_rate').values(
-            'logistic_process_id', 'date', 'from_currency__code', 'to_currency__code', 'amount', 'exchange_rate__rate'
-        )
-        df_processes = pd.DataFrame(list(data))
-        df_transactions = pd.DataFrame(list(transactions))
+        transactions = Transaction.objects.select_related('from_currency', 'to_currency', 'exchange_rate')
+        if watermarks is not None:
+            transactions = transactions.filter(id__gt=watermarks[TRANSACTIONS_SOURCE])
+        df_transactions = dataset.read_queryset(transactions, TRANSACTION_FIELDS)
+        process_ids = df_transactions['logistic_process_id'].unique().tolist() if not df_transactions.empty else []
+        df_processes = extract_processes(watermarks, process_ids)
         return df_processes, df_transactions
     except ObjectDoesNotExist:
         print("No data found in the database.")
         return pd.DataFrame(), pd.DataFrame()
 
-def transform_data(df_processes, df_transactions):
+def iter_transaction_chunks(last_id=0, chunk_size=EXTRACT_CHUNK_SIZE, max_id=None):
+    """
+    Extrae las transacciones con id mayor que last_id en bloques de como máximo chunk_size filas.
+
+    Se pagina por clave primaria en lugar de usar QuerySet.iterator(), porque el conector de
+    MySQL carga el resultado completo en memoria aunque se itere por bloques.
+
+    Args:
+    last_id (int): Último id ya procesado.
+    chunk_size (int): Número máximo de filas por bloque.
+    max_id (int, optional): Último id a extraer.
+
+    Yields:
+    pd.DataFrame: Bloque de transacciones ordenado por id.
+    """
+    transactions = Transaction.objects.order_by('id')
+    if max_id is not None:
+        transactions = transactions.filter(id__lte=max_id)
+    while True:
+        chunk = dataset.read_queryset(transactions.filter(id__gt=last_id)[:chunk_size], TRANSACTION_FIELDS)
+        if chunk.empty:
+            return
+        last_id = int(chunk['id'].iloc[-1])
+        yield chunk
+
+def extract_process_metrics(process_ids):
+    """
+    Extrae las métricas acumuladas de los procesos indicados.
+
+    Args:
+    process_ids (list): Ids de los procesos logísticos.
+
+    Returns:
+    pd.DataFrame: Métricas indexadas por logistic_process_id.
+    """
+    metrics = ProcessMetrics.objects.filter(logistic_process_id__in=list(process_ids)).values(
+        'logistic_process_id', 'total_amount', 'transaction_count', 'exchange_rate_sum'
+    )
+    return pd.DataFrame(list(metrics), columns=['logistic_process_id', 'total_amount', 'transaction_count', 'exchange_rate_sum']).set_index('logistic_process_id')
+
+def aggregate_transactions(df_transactions):
+    """
+    Calcula las métricas de transacciones por proceso logístico.
+
+    Args:
+    df_transactions (pd.DataFrame): Transacciones con las columnas 'amount' y 'exchange_rate__rate'.
+
+    Returns:
+    pd.DataFrame: Métricas indexadas por logistic_process_id.
+    """
+    metrics = df_transactions.assign(
+        amount=pd.to_numeric(df_transactions['amount'], errors='coerce'),
+        exchange_rate__rate=pd.to_numeric(df_transactions['exchange_rate__rate'], errors='coerce')
+    ).groupby('logistic_process_id').agg(
+        total_amount=('amount', 'sum'),
+        transaction_count=('amount', 'count'),
+        exchange_rate_sum=('exchange_rate__rate', 'sum')
+    )
+    metrics['avg_exchange_rate'] = metrics['exchange_rate_sum'] / metrics['transaction_count']
+    return metrics
+
+def merge_metrics(delta_metrics, existing_metrics):
+    """
+    Suma las métricas de un lote de transacciones nuevas a las métricas ya acumuladas.
+
+    Args:
+    delta_metrics (pd.DataFrame): Métricas del lote nuevo.
+    existing_metrics (pd.DataFrame): Métricas persistidas de los mismos procesos.
+
+    Returns:
+    pd.DataFrame: Métricas combinadas indexadas por logistic_process_id.
+    """
+    columns = ['total_amount', 'transaction_count', 'exchange_rate_sum']
+    merged = delta_metrics[columns].add(existing_metrics[columns], fill_value=0)
+    merged['transaction_count'] = merged['transaction_count'].astype('int64')
+    merged['avg_exchange_rate'] = merged['exchange_rate_sum'] / merged['transaction_count']
+    return merged
+
+def transform_processes(df_processes, transaction_metrics):
     # Convertir fechas a datetime con 'coerce' para manejar fechas inválidas
     df_processes['start_date'] = pd.to_datetime(df_processes['start_date'], errors='coerce')
     df_processes['end_date'] = pd.to_datetime(df_processes['end_date'], errors='coerce')
@@ -27,65 +165,433 @@ def transform_data(df_processes, df_transactions):
     # Eliminar filas con fechas NaT o aplicar un valor predeterminado
     df_processes['duration'] = (df_processes['end_date'] - df_processes['start_date']).dt.days
     df_processes['duration'] = df_processes['duration'].fillna(-1)  # Rellenar NaT con un valor predeterminado
-    
-    # Convertir la fecha de transacciones también
-    df_transactions['date'] = pd.to_datetime(df_transactions['date'], errors='coerce')
 
-    # Agregar métricas de transacciones a los procesos
-    transaction_metrics = df_transactions.groupby('logistic_process_id').agg({
-        'amount': ['sum', 'count'],
-        'exchange_rate__rate': 'mean'
-    })
-    transaction_metrics.columns = ['total_amount', 'transaction_count', 'avg_exchange_rate']
-    
     # Unir las métricas de transacciones con los procesos
     df_processes = df_processes.merge(transaction_metrics, left_on='id', right_index=True, how='left')
 
     # Eliminar duplicados
-    df_processes = df_processes.drop_duplicates()
-
-    return df_processes, df_transactions
-
-def load_data(df_processes, df_transactions):
-    for _, row in df_processes.iterrows():
-        process_id = row.get('id')
-        if process_id:
-            process = LogisticProcess.objects.filter(id=process_id).first()
-            if process:
-                process.start_date = row['start_date']
-                process.end_date = row['end_date']
-                process.status = row['status']
-                process.save()
-            else:
-                print(f"Process with ID {process_id} not found in the database.")
-        else:
-            print("Invalid data: Missing ID for process.")
-
-    # Actualizar o crear nuevas transacciones
-    for _, row in df_transactions.iterrows():
-        transaction, created = Transaction.objects.update_or_create(
-            logistic_process_id=row['logistic_process_id'],
-            date=row['date'],
-            defaults={
-                'from_currency': ExchangeRate.objects.get(code=row['from_currency__code']),
-                'to_currency': ExchangeRate.objects.get(code=row['to_currency__code']),
-                'amount': row['amount'],
-                'exchange_rate': ExchangeRate.objects.get(rate=row['exchange_rate__rate'])
-            }
+    return df_processes.drop_duplicates()
+
+def transform_transactions(df_transactions):
+    df_transactions['date'] = pd.to_datetime(df_transactions['date'], errors='coerce')
+    return df_transactions
+
+def transform_data(df_processes, df_transactions, existing_metrics=None):
+    df_transactions = transform_transactions(df_transactions)
+
+    # Agregar métricas de transacciones a los procesos
+    transaction_metrics = aggregate_transactions(df_transactions)
+
+    # En modo incremental, combinar las métricas del lote con las ya acumuladas
+    if existing_metrics is not None:
+        transaction_metrics = merge_metrics(transaction_metrics, existing_metrics)
+
+    return transform_processes(df_processes, transaction_metrics), df_transactions
+
+def _to_date(value):
+    return None if pd.isna(value) else pd.Timestamp(value).date()
+
+def _chunks(items, size=LOAD_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def load_processes(df_processes):
+    """
+    Actualiza por lotes las fechas y el estado de los procesos logísticos existentes.
+
+    Args:
+    df_processes (pd.DataFrame): Procesos transformados.
+
+    Returns:
+    dict: Número de procesos actualizados y de filas descartadas.
+    """
+    rows = df_processes.dropna(subset=['id'])
+    existing_ids = set(LogisticProcess.objects.filter(id__in=rows['id'].astype(int).tolist()).values_list('id', flat=True))
+    processes = [
+        LogisticProcess(id=int(process_id), start_date=_to_date(start_date), end_date=_to_date(end_date), status=status)
+        for process_id, start_date, end_date, status in zip(rows['id'], rows['start_date'], rows['end_date'], rows['status'])
+        if int(process_id) in existing_ids
+    ]
+    LogisticProcess.objects.bulk_update(processes, ['start_date', 'end_date', 'status'], batch_size=LOAD_CHUNK_SIZE)
+    return {'updated': len(processes), 'skipped': len(df_processes) - len(processes)}
+
+def load_transactions(df_transactions):
+    """
+    Inserta o actualiza las transacciones por lotes con bulk_create(update_conflicts=True).
+    Las claves foráneas se resuelven con diccionarios construidos una sola vez.
+
+    Args:
+    df_transactions (pd.DataFrame): Transacciones transformadas.
+
+    Returns:
+    dict: Número de transacciones insertadas, actualizadas y descartadas.
+    """
+    counts = {'inserted': 0, 'updated': 0, 'skipped': 0}
+    if df_transactions.empty:
+        return counts
+
+    currency_ids = dict(Currency.objects.values_list('code', 'id'))
+    from_codes = df_transactions['from_currency__code'].to_numpy(dtype=object)
+    to_codes = df_transactions['to_currency__code'].to_numpy(dtype=object)
+    # Los tipos de cambio del mismo día se resuelven en bloque con el índice compartido
+    rate_ids, _ = rate_index.get_rate_index().lookup(from_codes, to_codes, df_transactions['date'], exact=True, codes=True)
+    ids = df_transactions['id'] if 'id' in df_transactions else pd.Series(pd.NA, index=df_transactions.index)
+
+    objects = []
+    for transaction_id, process_id, date, from_code, to_code, amount, rate_id in zip(
+        ids, df_transactions['logistic_process_id'], df_transactions['date'],
+        from_codes, to_codes, df_transactions['amount'], rate_ids.tolist()
+    ):
+        date = _to_date(date)
+        if rate_id < 0 or from_code not in currency_ids or to_code not in currency_ids:
+            counts['skipped'] += 1
+            continue
+        objects.append(Transaction(
+            id=None if pd.isna(transaction_id) else int(transaction_id),
+            logistic_process_id=int(process_id),
+            date=date,
+            from_currency_id=currency_ids[from_code],
+            to_currency_id=currency_ids[to_code],
+            amount=amount,
+            exchange_rate_id=rate_id
+        ))
+
+    # MySQL resuelve el conflicto con cualquier clave única (ON DUPLICATE KEY UPDATE) y no admite unique_fields
+    unique_fields = ['id'] if connection.features.supports_update_conflicts_with_target else None
+    for chunk in _chunks(objects):
+        chunk_ids = [obj.id for obj in chunk if obj.id is not None]
+        updated = Transaction.objects.filter(id__in=chunk_ids).count() if chunk_ids else 0
+        Transaction.objects.bulk_create(
+            chunk,
+            update_conflicts=True,
+            unique_fields=unique_fields,
+            update_fields=['logistic_process', 'date', 'from_currency', 'to_currency', 'amount', 'exchange_rate']
+        )
+        counts['updated'] += updated
+        counts['inserted'] += len(chunk) - updated
+    return counts
+
+def load_metrics(df_processes):
+    """
+    Inserta o reemplaza las métricas acumuladas de cada proceso.
+
+    Args:
+    df_processes (pd.DataFrame): Procesos transformados con las columnas de métricas.
+
+    Returns:
+    int: Número de procesos con métricas escritas.
+    """
+    rows = df_processes.dropna(subset=['id'])
+    metrics = [
+        ProcessMetrics(
+            logistic_process_id=int(process_id),
+            total_amount=0 if pd.isna(total_amount) else float(total_amount),
+            transaction_count=0 if pd.isna(count) else int(count),
+            exchange_rate_sum=0 if pd.isna(rate_sum) else float(rate_sum),
+            avg_exchange_rate=None if pd.isna(avg_rate) else float(avg_rate)
+        )
+        for process_id, total_amount, count, rate_sum, avg_rate in zip(
+            rows['id'], rows['total_amount'], rows['transaction_count'], rows['exchange_rate_sum'], rows['avg_exchange_rate']
+        )
+    ]
+    unique_fields = ['logistic_process'] if connection.features.supports_update_conflicts_with_target else None
+    ProcessMetrics.objects.bulk_create(
+        metrics,
+        batch_size=LOAD_CHUNK_SIZE,
+        update_conflicts=True,
+        unique_fields=unique_fields,
+        update_fields=['total_amount', 'transaction_count', 'exchange_rate_sum', 'avg_exchange_rate', 'updated_at']
+    )
+    return len(metrics)
+
+def aggregate_daily(df_transactions):
+    """
+    Agrega las transacciones por proceso, par de monedas y fecha.
+
+    Args:
+    df_transactions (pd.DataFrame): Transacciones transformadas.
+
+    Returns:
+    pd.DataFrame: Volumen, número de transacciones y suma de tipos de cambio por clave diaria.
+    """
+    return df_transactions.assign(
+        date=pd.to_datetime(df_transactions['date']).dt.date,
+        amount=pd.to_numeric(df_transactions['amount'], errors='coerce'),
+        exchange_rate__rate=pd.to_numeric(df_transactions['exchange_rate__rate'], errors='coerce')
+    ).groupby(
+        ['logistic_process_id', 'from_currency__code', 'to_currency__code', 'date'], observed=True
+    ).agg(
+        volume=('amount', 'sum'),
+        transaction_count=('amount', 'count'),
+        rate_sum=('exchange_rate__rate', 'sum')
+    ).reset_index()
+
+def load_daily_rollups(df_transactions):
+    """
+    Suma un lote de transacciones a los agregados diarios persistidos.
+
+    Los días anteriores no cambian salvo que lleguen transacciones nuevas con esa fecha, por lo
+    que solo se leen y reescriben las filas de agregados afectadas por el lote.
+
+    Args:
+    df_transactions (pd.DataFrame): Transacciones transformadas del lote.
+
+    Returns:
+    int: Número de filas de agregados escritas.
+    """
+    if df_transactions.empty:
+        return 0
+    currency_ids = dict(Currency.objects.values_list('code', 'id'))
+    delta = aggregate_daily(df_transactions)
+    delta['from_currency_id'] = delta['from_currency__code'].astype(object).map(currency_ids)
+    delta['to_currency_id'] = delta['to_currency__code'].astype(object).map(currency_ids)
+    delta = delta.dropna(subset=['from_currency_id', 'to_currency_id'])
+    key = ['logistic_process_id', 'from_currency_id', 'to_currency_id', 'date']
+    delta[key[:3]] = delta[key[:3]].astype('int64')
+
+    existing = pd.DataFrame(
+        list(DailyTransactionRollup.objects.filter(
+            logistic_process_id__in=delta['logistic_process_id'].unique().tolist(),
+            date__range=(delta['date'].min(), delta['date'].max())
+        ).values_list(*key, 'volume', 'transaction_count', 'rate_sum')),
+        columns=key + ['volume', 'transaction_count', 'rate_sum']
+    )
+    merged = pd.concat([delta[key + ['volume', 'transaction_count', 'rate_sum']], existing])
+    merged = merged.groupby(key, as_index=False).sum()
+    # Solo se reescriben las claves presentes en el lote
+    merged = merged.merge(delta[key], on=key)
+
+    rollups = [
+        DailyTransactionRollup(
+            logistic_process_id=process_id,
+            from_currency_id=from_id,
+            to_currency_id=to_id,
+            date=date,
+            volume=float(volume),
+            transaction_count=int(count),
+            rate_sum=float(rate_sum),
+            mean_rate=float(rate_sum) / int(count) if count else None
         )
-        if created:
-            print(f"New transaction created for process ID {row['logistic_process_id']}")
-        else:
-            print(f"Transaction updated for process ID {row['logistic_process_id']}")
-
-def etl_process():
-    raw_processes, raw_transactions = extract_data()
-    if raw_processes.empty or raw_transactions.empty:
-        print("No data to process.")
-        return
-    transformed_processes, transformed_transactions = transform_data(raw_processes, raw_transactions)
-    load_data(transformed_processes, transformed_transactions)
+        for process_id, from_id, to_id, date, volume, count, rate_sum in merged.itertuples(index=False, name=None)
+    ]
+    unique_fields = (
+        ['logistic_process', 'from_currency', 'to_currency', 'date']
+        if connection.features.supports_update_conflicts_with_target else None
+    )
+    DailyTransactionRollup.objects.bulk_create(
+        rollups,
+        batch_size=LOAD_CHUNK_SIZE,
+        update_conflicts=True,
+        unique_fields=unique_fields,
+        update_fields=['volume', 'transaction_count', 'rate_sum', 'mean_rate']
+    )
+    return len(rollups)
+
+def update_statistics(df_transactions):
+    """
+    Añade un lote de transacciones a los estadísticos acumulados de correlaciones y monedas.
+
+    Cada transacción lleva las métricas de optimización y la casa de cambio de su proceso; si las
+    optimizaciones cambiaron desde la última actualización, el estado se recalcula con todo el histórico.
+
+    Args:
+    df_transactions (pd.DataFrame): Transacciones transformadas del lote, ya cargadas.
+    """
+    signature = accumulators.optimizations_signature()
+    process_columns = dataset.aggregate_optimizations(
+        dataset.read_queryset(Optimization.objects.all(), dataset.OPTIMIZATION_COLUMNS)
+    ).join(
+        pd.DataFrame(
+            list(LogisticProcess.objects.values_list('id', 'currency_exchange_house__name')),
+            columns=['logistic_process_id', 'currency_exchange_house__name']
+        ).set_index('logistic_process_id'),
+        how='outer'
+    )
+    state = accumulators.load_state()
+    if state is not None and not accumulators.is_current(state, signature):
+        # Se recalcula hasta el último id del lote, que ya está cargado; los lotes posteriores se sumarán después
+        chunks = iter_transaction_chunks(max_id=int(df_transactions['id'].max()))
+        accumulators.rebuild((chunk.join(process_columns, on='logistic_process_id') for chunk in chunks), signature)
+    else:
+        accumulators.update(df_transactions.join(process_columns, on='logistic_process_id'), signature)
+
+def load_data(df_processes, df_transactions, watermarks=None, full_rebuild=False):
+    """
+    Carga los datos transformados en la base de datos dentro de una única transacción.
+
+    Args:
+    df_processes (pd.DataFrame): Procesos transformados.
+    df_transactions (pd.DataFrame): Transacciones transformadas.
+    watermarks (dict, optional): Marcas de agua a persistir junto con los datos cargados.
+    full_rebuild (bool): Borrar los agregados diarios y los estadísticos acumulados antes de cargar.
+
+    Returns:
+    dict: Resumen con los contadores de procesos, transacciones, métricas y agregados diarios.
+    """
+    with transaction.atomic():
+        if full_rebuild:
+            DailyTransactionRollup.objects.all().delete()
+            accumulators.reset()
+        summary = {
+            'processes': load_processes(df_processes),
+            'transactions': load_transactions(df_transactions),
+            'metrics': load_metrics(df_processes),
+            'rollups': load_daily_rollups(df_transactions),
+        }
+        update_statistics(df_transactions)
+        if watermarks is not None:
+            save_watermarks(watermarks)
+    print_load_summary(summary)
+    return summary
+
+def print_load_summary(summary):
+    print(f"Load summary: processes updated={summary['processes']['updated']} skipped={summary['processes']['skipped']}; "
+          f"transactions inserted={summary['transactions']['inserted']} updated={summary['transactions']['updated']} "
+          f"skipped={summary['transactions']['skipped']}; metrics written={summary['metrics']}; "
+          f"daily rollups written={summary['rollups']}")
+
+def next_watermarks(last_process_id, last_transaction_id, previous_watermarks=None):
+    watermarks = {PROCESSES_SOURCE: int(last_process_id), TRANSACTIONS_SOURCE: int(last_transaction_id)}
+    if previous_watermarks is not None:
+        watermarks = {source: max(last_id, previous_watermarks[source]) for source, last_id in watermarks.items()}
+    return watermarks
+
+def needs_full_rebuild():
+    # Sin instantánea, agregados diarios o estadísticos previos hay que reconstruirlos con todo el histórico
+    return (
+        not snapshot.snapshot_exists()
+        or not DailyTransactionRollup.objects.exists()
+        or not accumulators.state_exists()
+    )
+
+def etl_process_chunked(full_rebuild=False, chunk_size=EXTRACT_CHUNK_SIZE):
+    """
+    Ejecuta el proceso ETL leyendo las transacciones por bloques.
+
+    Cada bloque se transforma, se carga y se reduce a sumas y conteos parciales por proceso,
+    que se combinan al final; el pico de memoria depende de chunk_size y no del tamaño de la tabla.
+
+    Args:
+    full_rebuild (bool): Si es True, vuelve a procesar todo el histórico y recalcula las métricas.
+    chunk_size (int): Número de transacciones por bloque.
+    """
+    full_rebuild = full_rebuild or needs_full_rebuild()
+    previous_watermarks = None if full_rebuild else get_watermarks()
+    last_transaction_id = 0 if full_rebuild else previous_watermarks[TRANSACTIONS_SOURCE]
+    transaction_metrics = None
+    counts = {'inserted': 0, 'updated': 0, 'skipped': 0}
+    rollups = 0
+    snapshot_parts = []
+
+    if full_rebuild:
+        snapshot.reset_snapshot()
+    try:
+        with transaction.atomic():
+            if full_rebuild:
+                DailyTransactionRollup.objects.all().delete()
+                accumulators.reset()
+            with instrumentation.stage('stream_transactions') as stage:
+                rows = 0
+                for chunk in iter_transaction_chunks(last_transaction_id, chunk_size):
+                    rows += len(chunk)
+                    chunk = transform_transactions(chunk)
+                    partial_metrics = aggregate_transactions(chunk)
+                    transaction_metrics = partial_metrics if transaction_metrics is None else merge_metrics(partial_metrics, transaction_metrics)
+                    for key, value in load_transactions(chunk).items():
+                        counts[key] += value
+                    rollups += load_daily_rollups(chunk)
+                    update_statistics(chunk)
+                    snapshot_parts.extend(snapshot.append_transactions(chunk))
+                    last_transaction_id = int(chunk['id'].max())
+                stage.rows_in = rows
+                stage.rows_out = counts['inserted'] + counts['updated']
+
+            if transaction_metrics is None:
+                print("No data to process.")
+                return
+
+            with instrumentation.stage('load_processes', rows_in=len(transaction_metrics)) as stage:
+                raw_processes = extract_processes(previous_watermarks, transaction_metrics.index.tolist())
+                if not full_rebuild:
+                    transaction_metrics = merge_metrics(transaction_metrics, extract_process_metrics(raw_processes['id']))
+                transformed_processes = transform_processes(raw_processes, transaction_metrics)
+
+                summary = {
+                    'processes': load_processes(transformed_processes),
+                    'transactions': counts,
+                    'metrics': load_metrics(transformed_processes),
+                    'rollups': rollups,
+                }
+                save_watermarks(next_watermarks(raw_processes['id'].max(), last_transaction_id, previous_watermarks))
+                stage.rows_out = summary['processes']['updated']
+    except Exception:
+        # Las partes de un lote revertido no deben quedar en la instantánea
+        snapshot.discard_parts(snapshot_parts)
+        raise
+    with instrumentation.stage('snapshot'):
+        snapshot.write_dimensions()
+    dataset.invalidate()
+    print_load_summary(summary)
     print("ETL process completed successfully.")
 
+def etl_process(full_rebuild=False, chunk_size=None):
+    """
+    Ejecuta el proceso ETL.
+
+    Por defecto es incremental: solo procesa las filas con id mayor que la marca de agua
+    persistida de cada tabla y suma sus métricas a las ya acumuladas. Las transacciones se
+    tratan como datos de solo inserción; para recoger correcciones de filas existentes se
+    debe usar full_rebuild.
+
+    Cada etapa se instrumenta (tiempo, CPU, memoria, filas y consultas SQL) y el resultado se
+    añade al fichero de métricas de scripts/instrumentation.py.
+
+    Args:
+    full_rebuild (bool): Si es True, vuelve a procesar todo el histórico y recalcula las métricas.
+    chunk_size (int, optional): Si se indica, extrae y agrega las transacciones por bloques de
+        este tamaño para acotar el uso de memoria.
+    """
+    with instrumentation.pipeline('etl'):
+        if chunk_size:
+            return etl_process_chunked(full_rebuild, chunk_size)
+
+        full_rebuild = full_rebuild or needs_full_rebuild()
+        previous_watermarks = None if full_rebuild else get_watermarks()
+        with instrumentation.stage('extract') as stage:
+            raw_processes, raw_transactions = extract_data(previous_watermarks)
+            stage.rows_out = len(raw_transactions)
+        if raw_processes.empty or raw_transactions.empty:
+            print("No data to process.")
+            return
+
+        with instrumentation.stage('transform', rows_in=len(raw_transactions)) as stage:
+            existing_metrics = None if full_rebuild else extract_process_metrics(raw_processes['id'])
+            transformed_processes, transformed_transactions = transform_data(raw_processes, raw_transactions, existing_metrics)
+            stage.rows_out = len(transformed_transactions)
+
+        if full_rebuild:
+            snapshot.reset_snapshot()
+        snapshot_parts = []
+        try:
+            # Como en etl_process_chunked, la instantánea se escribe antes de confirmar la carga: si
+            # falla, la marca de agua no avanza y el siguiente ETL vuelve a procesar el lote
+            with transaction.atomic():
+                with instrumentation.stage('load', rows_in=len(transformed_transactions)) as stage:
+                    watermarks = next_watermarks(raw_processes['id'].max(), raw_transactions['id'].max(), previous_watermarks)
+                    summary = load_data(transformed_processes, transformed_transactions, watermarks, full_rebuild=full_rebuild)
+                    # Publicar los datos cargados en la instantánea columnar que leen los análisis
+                    snapshot_parts = snapshot.append_transactions(transformed_transactions)
+                    stage.rows_out = summary['transactions']['inserted'] + summary['transactions']['updated']
+        except Exception:
+            # Las partes de una carga revertida no deben quedar en la instantánea
+            snapshot.discard_parts(snapshot_parts)
+            raise
+        with instrumentation.stage('snapshot'):
+            snapshot.write_dimensions()
+        dataset.invalidate()
+        print("ETL process completed successfully.")
+
 if __name__ == "__main__":
-    etl_process()
\ No newline at end of file
+    import sys
+    with instrumentation.pipeline('etl', trace_memory='--trace-memory' in sys.argv or None):
+        etl_process(full_rebuild='--full-rebuild' in sys.argv, chunk_size=EXTRACT_CHUNK_SIZE if '--chunked' in sys.argv else None)
\ No newline at end of file
@@ -0,0 +1,196 @@
+# instrumentation.py
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import connection
+
+_local = threading.local()
+
+
+class Stage:
+    """
+    Métricas de una etapa: tiempo de reloj y de CPU, pico de memoria, filas y consultas SQL.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.rows_in = None
+        self.rows_out = None
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self.peak_memory = None
+        self.query_count = 0
+        self.query_time = 0.0
+        self._started = None
+        self._cpu_started = None
+        self._memory_started = 0
+        self._peak = 0
+
+    def to_dict(self):
+        return {
+            'stage': self.name,
+            'wall_time': round(self.wall_time, 6),
+            'cpu_time': round(self.cpu_time, 6),
+            'peak_memory': self.peak_memory,
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'query_count': self.query_count,
+            'query_time': round(self.query_time, 6),
+        }
+
+
+class PipelineRun:
+    """
+    Ejecución instrumentada de un pipeline, compuesta por etapas que pueden anidarse.
+    """
+
+    def __init__(self, name, trace_memory=None):
+        self.name = name
+        self.trace_memory = trace_memory_enabled() if trace_memory is None else trace_memory
+        self.stages = []
+        self.started_at = datetime.now(timezone.utc)
+        self._stack = []
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        qualified = '/'.join([s.name for s in self._stack[-1:]] + [name])
+        stage = Stage(qualified)
+        stage.rows_in = rows_in
+        self._update_peaks()
+        stage._memory_started = tracemalloc.get_traced_memory()[0] if self.trace_memory else 0
+        self._stack.append(stage)
+        self.stages.append(stage)
+        stage._started = time.perf_counter()
+        stage._cpu_started = time.process_time()
+        try:
+            yield stage
+        finally:
+            stage.wall_time = time.perf_counter() - stage._started
+            stage.cpu_time = time.process_time() - stage._cpu_started
+            self._update_peaks()
+            self._stack.pop()
+            if self.trace_memory:
+                stage.peak_memory = max(stage._peak - stage._memory_started, 0)
+
+    def record_query(self, elapsed):
+        for stage in self._stack:
+            stage.query_count += 1
+            stage.query_time += elapsed
+
+    def _update_peaks(self):
+        # Cada etapa abierta conserva su propio pico aunque las etapas anidadas reinicien el de tracemalloc
+        if not self.trace_memory:
+            return
+        peak = tracemalloc.get_traced_memory()[1]
+        for stage in self._stack:
+            stage._peak = max(stage._peak, peak)
+        tracemalloc.reset_peak()
+
+    def to_dict(self):
+        return {
+            'run': self.name,
+            'started_at': self.started_at.isoformat(),
+            'wall_time': round(sum(s.wall_time for s in self.stages if '/' not in s.name), 6),
+            'stages': [s.to_dict() for s in self.stages],
+        }
+
+    def write(self, path=None):
+        path = path or metrics_file_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'a') as metrics_file:
+            metrics_file.write(json.dumps(self.to_dict()) + '\n')
+
+    def print_summary(self):
+        print(f"\nResumen de etapas ({self.name}):")
+        print(f"  {'etapa':<32}{'reloj (s)':>10}{'CPU (s)':>10}{'pico MB':>10}{'filas ent.':>12}{'filas sal.':>12}{'SQL':>7}{'SQL (s)':>9}")
+        for s in self.stages:
+            peak = f"{s.peak_memory / 2**20:.1f}" if s.peak_memory is not None else '-'
+            rows_in = s.rows_in if s.rows_in is not None else '-'
+            rows_out = s.rows_out if s.rows_out is not None else '-'
+            print(f"  {s.name:<32}{s.wall_time:>10.3f}{s.cpu_time:>10.3f}{peak:>10}{rows_in:>12}{rows_out:>12}"
+                  f"{s.query_count:>7}{s.query_time:>9.3f}")
+
+
+def trace_memory_enabled():
+    # tracemalloc mide el pico de memoria de cada etapa a cambio de ralentizar mucho las
+    # asignaciones, así que solo se activa a petición (PIPELINE_TRACE_MEMORY o trace_memory=True)
+    return getattr(settings, 'PIPELINE_TRACE_MEMORY', False)
+
+
+def metrics_file_path():
+    # Fichero JSON Lines donde se añade una línea por ejecución instrumentada; se lee en cada
+    # llamada para que override_settings (pruebas, benchmark) lo redirija
+    return getattr(settings, 'PIPELINE_METRICS_FILE', os.path.join(settings.BASE_DIR, 'data', 'pipeline_metrics.jsonl'))
+
+
+def current_run():
+    return getattr(_local, 'run', None)
+
+
+@contextmanager
+def pipeline(name, metrics_file=None, trace_memory=None):
+    """
+    Abre una ejecución instrumentada. Si ya hay una activa en el hilo, la reutiliza para que las
+    etapas de un pipeline llamado desde otro (p. ej. el ETL desde main.py) queden en la misma ejecución.
+
+    Args:
+    name (str): Nombre de la ejecución.
+    metrics_file (str, optional): Fichero JSON Lines donde se añade el resultado al terminar; por
+        defecto, el del ajuste PIPELINE_METRICS_FILE.
+    trace_memory (bool, optional): Medir el pico de memoria de cada etapa con tracemalloc; por
+        defecto, según el ajuste PIPELINE_TRACE_MEMORY.
+
+    Yields:
+    PipelineRun: Ejecución activa.
+    """
+    run = current_run()
+    if run is not None:
+        yield run
+        return
+
+    run = PipelineRun(name, trace_memory)
+    metrics_file = metrics_file or metrics_file_path()
+    started_tracing = run.trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+
+    def count_query(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            run.record_query(time.perf_counter() - started)
+
+    _local.run = run
+    try:
+        with connection.execute_wrapper(count_query):
+            yield run
+    finally:
+        _local.run = None
+        if started_tracing:
+            tracemalloc.stop()
+        run.write(metrics_file)
+        run.print_summary()
+
+
+def stage(name, rows_in=None):
+    """
+    Mide una etapa de la ejecución activa; sin ejecución activa no mide nada.
+
+    Args:
+    name (str): Nombre de la etapa.
+    rows_in (int, optional): Filas de entrada de la etapa.
+
+    Returns:
+    Context manager que devuelve la etapa, en la que se puede fijar rows_out.
+    """
+    run = current_run()
+    if run is None:
+        return nullcontext(Stage(name))
+    return run.stage(name, rows_in)
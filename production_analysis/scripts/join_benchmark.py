@@ -0,0 +1,96 @@
+# join_benchmark.py
+import time
+
+import numpy as np
+import pandas as pd
+from scripts import dataset
+
+
+def fanout_join(df_processes, df_transactions, df_optimizations):
+    """
+    Unión anterior de load_data: repite cada transacción una vez por optimización de su proceso.
+
+    Args:
+    df_processes (pd.DataFrame): Procesos.
+    df_transactions (pd.DataFrame): Transacciones.
+    df_optimizations (pd.DataFrame): Optimizaciones.
+
+    Returns:
+    pd.DataFrame: Producto transacciones × optimizaciones de cada proceso.
+    """
+    df = pd.merge(df_processes, df_transactions, left_on='id', right_on='logistic_process_id')
+    return pd.merge(df, df_optimizations, left_on='id', right_on='logistic_process_id')
+
+
+def synthesize_optimizations(df_processes, per_process, rng):
+    """
+    Genera optimizaciones sintéticas con el mismo esquema que la tabla Optimization.
+
+    Args:
+    df_processes (pd.DataFrame): Procesos a los que se asignan las optimizaciones.
+    per_process (int): Número de optimizaciones por proceso.
+    rng (np.random.Generator): Generador de números aleatorios.
+
+    Returns:
+    pd.DataFrame: Optimizaciones con las columnas de dataset.OPTIMIZATION_COLUMNS.
+    """
+    size = len(df_processes) * per_process
+    return pd.DataFrame({
+        'logistic_process_id': np.repeat(df_processes['id'].to_numpy(dtype=np.int64), per_process),
+        'efficiency_improvement': rng.uniform(5, 25, size),
+        'cost_reduction': rng.uniform(3, 20, size),
+        'processing_time_reduction': rng.uniform(10, 50, size),
+    })
+
+
+def _time_join(join, tables, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        df = join(*tables)
+        best = min(best, time.perf_counter() - started)
+    return df, best
+
+
+def benchmark_join(optimizations_per_process=(1, 3, 10, 30), use_snapshot=True, repeat=3, seed=0):
+    """
+    Compara filas, memoria y tiempo de la unión con repetición de filas y de la unión en estrella.
+
+    Las transacciones y los procesos son los reales; las optimizaciones se sintetizan para
+    medir el efecto de tener varias por proceso.
+
+    Args:
+    optimizations_per_process (tuple): Números de optimizaciones por proceso a medir.
+    use_snapshot (bool): Leer la instantánea columnar del ETL cuando exista.
+    repeat (int): Repeticiones por medida; se conserva el mejor tiempo.
+    seed (int): Semilla de las optimizaciones sintéticas.
+
+    Returns:
+    pd.DataFrame: Una fila por unión y número de optimizaciones por proceso.
+    """
+    rng = np.random.default_rng(seed)
+    df_processes, df_transactions, _ = dataset.read_tables(use_snapshot)
+    results = []
+    for per_process in optimizations_per_process:
+        tables = (df_processes, df_transactions, synthesize_optimizations(df_processes, per_process, rng))
+        for name, join in (('fanout', fanout_join), ('star', dataset.join_star)):
+            df, elapsed = _time_join(join, tables, repeat)
+            results.append({
+                'join': name,
+                'optimizations_per_process': per_process,
+                'rows': len(df),
+                'memory_mb': df.memory_usage(deep=True).sum() / 2**20,
+                'seconds': elapsed,
+                'daily_volume': df.groupby('date')['amount'].sum().mean(),
+            })
+    return pd.DataFrame(results)
+
+
+def print_benchmark(results):
+    print("Comparación de uniones para el análisis de desempeño")
+    print("====================================================")
+    print(results.to_string(index=False, float_format=lambda value: f"{value:,.3f}"))
+
+
+if __name__ == "__main__":
+    print_benchmark(benchmark_join())
@@ -2,46 +2,172 @@
 import pandas as pd
 import numpy as np
 from scipy import stats
-from analyzer.models import LogisticProcess, Transaction, ExchangeRate, Optimization
+from django.db.models import Avg, Count, FloatField, Sum
+from django.db.models.functions import Cast, TruncDay, TruncMonth
+from analyzer.models import LogisticProcess, Transaction, ExchangeRate, Optimization, DailyTransactionRollup
+from scripts import accumulators, dataset, trend_analysis
 
-def load_data():
-    logistic_processes = LogisticProcess.objects.all().values(
-        'id', 'currency_exchange_house__name', 'process_type__name', 'start_date', 'end_date', 'status'
-    )
-    transactions = Transaction.objects.all().values(
-        'logistic_process_id', 'date', 'from_currency__code', 'to_currency__code', 'amount', 'exchange_rate__rate'
+OPTIMIZATION_METRICS = {
+    'eficiencia_promedio': 'efficiency_improvement',
+    'reduccion_costos_promedio': 'cost_reduction',
+    'reduccion_tiempo_promedio': 'processing_time_reduction',
+}
+
+# Funciones de truncado de fecha para las series agregadas en la base de datos
+PERIODS = {'day': TruncDay, 'month': TruncMonth}
+
+# Modo aproximado: cuantiles del importe que se estiman y cuantil normal de los intervalos del 95%
+APPROXIMATE_QUANTILES = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+Z_95 = stats.norm.ppf(0.975)
+
+def load_data(use_snapshot=True, use_cache=True):
+    return dataset.load_analytics_frame(use_snapshot, use_cache)
+
+def float_transactions():
+    """
+    Transacciones con importe y tasa de cambio convertidos a float en SQL.
+
+    Returns:
+    QuerySet: Transacciones con las anotaciones amount_float y rate_float.
+    """
+    return Transaction.objects.annotate(
+        amount_float=Cast('amount', FloatField()),
+        rate_float=Cast('exchange_rate__rate', FloatField())
     )
-    optimizations = Optimization.objects.all().values(
-        'logistic_process_id', 'efficiency_improvement', 'cost_reduction', 'processing_time_reduction'
+
+def aggregate_series(period='day'):
+    """
+    Calcula en la base de datos el volumen y la tasa de cambio media por periodo.
+
+    Args:
+    period (str): 'day' o 'month'.
+
+    Returns:
+    pd.DataFrame: Columnas volume y rate indexadas por el inicio del periodo.
+    """
+    rows = float_transactions().annotate(period=PERIODS[period]('date')).values('period').annotate(
+        volume=Sum('amount_float'), rate=Avg('rate_float')
+    ).order_by('period')
+    series = pd.DataFrame(list(rows), columns=['period', 'volume', 'rate'])
+    series['period'] = pd.to_datetime(series['period'])
+    return series.set_index('period').astype(np.float64)
+
+def process_optimizations():
+    """
+    Lee la media de cada métrica de optimización por proceso, como la adjunta dataset.build_analytics_frame.
+
+    Returns:
+    pd.DataFrame: Medias de optimización indexadas por logistic_process_id.
+    """
+    return pd.DataFrame(
+        list(Optimization.objects.values('logistic_process_id').annotate(
+            **{column: Avg(column) for column in OPTIMIZATION_METRICS.values()}
+        )),
+        columns=['logistic_process_id'] + list(OPTIMIZATION_METRICS.values())
+    ).set_index('logistic_process_id')
+
+def optimization_kpis(transaction_counts, optimizations):
+    """
+    Promedia las métricas de optimización por transacción sin materializar las transacciones.
+
+    Args:
+    transaction_counts (pd.Series): Número de transacciones por proceso.
+    optimizations (pd.DataFrame): Medias de optimización por proceso de process_optimizations.
+
+    Returns:
+    dict: KPIs de optimización; solo cuentan los procesos con optimizaciones.
+    """
+    joined = optimizations.join(transaction_counts.rename('transaction_count'), how='inner')
+    total = joined['transaction_count'].sum()
+    return {
+        kpi: (joined[column] * joined['transaction_count']).sum() / total if total else np.nan
+        for kpi, column in OPTIMIZATION_METRICS.items()
+    }
+
+def calculate_kpis_database():
+    """
+    Calcula los KPIs de calculate_kpis con agregaciones del ORM; solo viajan las filas agregadas.
+
+    Returns:
+    dict: Diccionario con los KPIs calculados.
+    """
+    rate = float_transactions().aggregate(rate=Avg('rate_float'))['rate']
+    counts = pd.Series(dict(
+        Transaction.objects.values('logistic_process_id').annotate(count=Count('id')).values_list('logistic_process_id', 'count')
+    ), dtype=np.int64)
+    kpis = {
+        'volumen_promedio_diario': aggregate_series('day')['volume'].mean(),
+        'tasa_cambio_promedio': np.float64(rate) if rate is not None else np.nan,
+    }
+    kpis.update(optimization_kpis(counts, process_optimizations()))
+    return kpis
+
+def load_daily_rollups():
+    """
+    Lee los agregados diarios que mantiene el ETL, sumados por proceso y fecha.
+
+    Returns:
+    pd.DataFrame: Volumen, número de transacciones y suma de tasas por proceso y fecha.
+    """
+    rollups = pd.DataFrame(
+        list(DailyTransactionRollup.objects.values('logistic_process_id', 'date').annotate(
+            volume=Sum('volume'), transaction_count=Sum('transaction_count'), rate_sum=Sum('rate_sum')
+        )),
+        columns=['logistic_process_id', 'date', 'volume', 'transaction_count', 'rate_sum']
     )
+    rollups['date'] = pd.to_datetime(rollups['date'])
+    return rollups
 
-    df_processes = pd.DataFrame(list(logistic_processes))
-    df_transactions = pd.DataFrame(list(transactions))
-    df_optimizations = pd.DataFrame(list(optimizations))
+def daily_series(rollups):
+    """
+    Calcula el volumen diario y la tasa de cambio media diaria a partir de los agregados.
 
-    # Convertir columnas a tipos numéricos
-    df_transactions['amount'] = pd.to_numeric(df_transactions['amount'], errors='coerce')
-    df_transactions['exchange_rate__rate'] = pd.to_numeric(df_transactions['exchange_rate__rate'], errors='coerce')
-    df_optimizations['efficiency_improvement'] = pd.to_numeric(df_optimizations['efficiency_improvement'], errors='coerce')
-    df_optimizations['cost_reduction'] = pd.to_numeric(df_optimizations['cost_reduction'], errors='coerce')
-    df_optimizations['processing_time_reduction'] = pd.to_numeric(df_optimizations['processing_time_reduction'], errors='coerce')
+    Args:
+    rollups (pd.DataFrame): Agregados de load_daily_rollups.
 
-    # Merge the dataframes
-    df = pd.merge(df_processes, df_transactions, left_on='id', right_on='logistic_process_id')
-    df = pd.merge(df, df_optimizations, left_on='id', right_on='logistic_process_id')
+    Returns:
+    pd.DataFrame: Columnas volume y rate indexadas por fecha.
+    """
+    daily = rollups.groupby('date')[['volume', 'transaction_count', 'rate_sum']].sum()
+    return pd.DataFrame({
+        'volume': daily['volume'],
+        'rate': daily['rate_sum'] / daily['transaction_count'],
+    })
 
-    return df
+def calculate_kpis_from_rollups(rollups):
+    """
+    Calcula los KPIs de calculate_kpis leyendo filas por día en lugar de filas por transacción.
+
+    Args:
+    rollups (pd.DataFrame): Agregados de load_daily_rollups.
 
-def calculate_kpis(data):
+    Returns:
+    dict: Diccionario con los KPIs calculados.
+    """
+    kpis = {
+        'volumen_promedio_diario': daily_series(rollups)['volume'].mean(),
+        'tasa_cambio_promedio': rollups['rate_sum'].sum() / rollups['transaction_count'].sum(),
+    }
+    counts = rollups.groupby('logistic_process_id')['transaction_count'].sum()
+    kpis.update(optimization_kpis(counts, process_optimizations()))
+    return kpis
+
+def calculate_kpis(data=None, backend='rollups'):
     """
     Calcula los KPIs clave para el análisis de desempeño de procesos de cambio de divisas.
 
     Args:
-    data (pd.DataFrame): DataFrame con los datos de procesos y transacciones.
+    data (pd.DataFrame, optional): DataFrame con los datos de procesos y transacciones. Si no se
+        indica, los KPIs se calculan con el backend indicado.
+    backend (str): 'rollups' (agregados diarios del ETL) o 'database' (agregaciones del ORM).
 
     Returns:
     dict: Diccionario con los KPIs calculados.
     """
+    if data is None:
+        if backend == 'database':
+            return calculate_kpis_database()
+        return calculate_kpis_from_rollups(load_daily_rollups())
     kpis = {
         'volumen_promedio_diario': data.groupby('date')['amount'].sum().mean(),
         'tasa_cambio_promedio': data['exchange_rate__rate'].mean(),
@@ -51,35 +177,41 @@ def calculate_kpis(data):
     }
     return kpis
 
-def analyze_correlations(data):
+def analyze_correlations(data=None):
     """
     Analiza las correlaciones entre las variables clave de procesos de cambio de divisas.
 
     Args:
-    data (pd.DataFrame): DataFrame con los datos de procesos y transacciones.
+    data (pd.DataFrame, optional): DataFrame con los datos de procesos y transacciones. Si no se
+        indica, se usan los estadísticos acumulados por el ETL.
 
     Returns:
     pd.DataFrame: Matriz de correlación.
     """
-    variables = ['amount', 'exchange_rate__rate', 'efficiency_improvement', 'cost_reduction', 'processing_time_reduction']
-    return data[variables].corr()
+    if data is None:
+        return accumulators.correlation_matrix(accumulators.load_state())
+    return data[accumulators.CORRELATION_VARIABLES].corr()
 
-def compare_currencies(data, currency1, currency2):
+def compare_currencies(data, currency1, currency2, equal_var=True):
     """
     Compara el volumen de transacciones entre dos monedas utilizando una prueba t.
 
     Args:
-    data (pd.DataFrame): DataFrame con los datos de procesos y transacciones.
+    data (pd.DataFrame, optional): DataFrame con los datos de procesos y transacciones. Si es
+        None, se usan los estadísticos acumulados por el ETL.
     currency1 (str): Código de la primera moneda.
     currency2 (str): Código de la segunda moneda.
+    equal_var (bool): Si es False, aplica la prueba de Welch en lugar de la de Student.
 
     Returns:
     dict: Resultados de la comparación, incluyendo estadísticas y valor p.
     """
+    if data is None:
+        return accumulators.compare_currencies(accumulators.load_state(), currency1, currency2, equal_var)
     currency1_data = data[data['from_currency__code'] == currency1]['amount']
     currency2_data = data[data['from_currency__code'] == currency2]['amount']
     
-    t_stat, p_value = stats.ttest_ind(currency1_data, currency2_data)
+    t_stat, p_value = stats.ttest_ind(currency1_data, currency2_data, equal_var=equal_var)
     return {
         'moneda1_volumen_medio': currency1_data.mean(),
         'moneda2_volumen_medio': currency2_data.mean(),
@@ -88,19 +220,85 @@ def compare_currencies(data, currency1, currency2):
         'valor_p': p_value
     }
 
-def analyze_trends(data):
+def currency_moments(data=None):
+    """
+    Calcula una sola vez el número de transacciones, la media y M2 del importe por moneda de origen.
+
+    Args:
+    data (pd.DataFrame, optional): DataFrame con los datos de procesos y transacciones. Si no se
+        indica, se usan los estadísticos acumulados por el ETL.
+
+    Returns:
+    pd.DataFrame: Columnas count, mean y m2 indexadas por código de moneda.
+    """
+    if data is None:
+        currencies = accumulators.load_state()['currencies']
+        return pd.DataFrame(
+            [moments.to_list() for moments in currencies.values()], index=list(currencies), columns=['count', 'mean', 'm2']
+        ).sort_index()
+    grouped = data.groupby('from_currency__code', observed=True)['amount'].agg(['count', 'mean', 'var'])
+    grouped['m2'] = (grouped['var'] * (grouped['count'] - 1)).fillna(0)
+    grouped.index = grouped.index.astype(str)
+    return grouped[['count', 'mean', 'm2']].sort_index()
+
+def compare_all_currencies(data=None, equal_var=True):
+    """
+    Compara el volumen de transacciones entre todos los pares de monedas con pruebas t vectorizadas.
+
+    Args:
+    data (pd.DataFrame, optional): DataFrame con los datos de procesos y transacciones. Si no se
+        indica, se usan los estadísticos acumulados por el ETL.
+    equal_var (bool): Si es False, aplica la prueba de Welch en lugar de la de Student.
+
+    Returns:
+    dict: Volumen medio por moneda y matrices (fila menos columna) de diferencia media, estadístico t y valor p.
+    """
+    moments = currency_moments(data)
+    count = moments['count'].to_numpy(dtype=np.float64)
+    mean = moments['mean'].to_numpy(dtype=np.float64)
+    m2 = moments['m2'].to_numpy(dtype=np.float64)
+    n1, n2 = count[:, None], count[None, :]
+    difference = mean[:, None] - mean[None, :]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if equal_var:
+            dof = n1 + n2 - 2
+            standard_error = np.sqrt((m2[:, None] + m2[None, :]) / dof * (1 / n1 + 1 / n2))
+        else:
+            variance = np.where(count > 1, m2 / (count - 1), np.nan)
+            term1, term2 = (variance / count)[:, None], (variance / count)[None, :]
+            standard_error = np.sqrt(term1 + term2)
+            dof = (term1 + term2) ** 2 / (term1 ** 2 / (n1 - 1) + term2 ** 2 / (n2 - 1))
+        t_stat = difference / standard_error
+        p_value = 2 * stats.t.sf(np.abs(t_stat), dof)
+
+    codes = moments.index
+    return {
+        'volumen_medio': moments['mean'],
+        'diferencia_media': pd.DataFrame(difference, index=codes, columns=codes),
+        'estadistica_t': pd.DataFrame(t_stat, index=codes, columns=codes),
+        'valor_p': pd.DataFrame(p_value, index=codes, columns=codes),
+    }
+
+def analyze_trends(data=None, backend='rollups'):
     """
     Analiza las tendencias en el volumen de transacciones y tasas de cambio a lo largo del tiempo.
 
     Args:
-    data (pd.DataFrame): DataFrame con los datos de procesos y transacciones.
+    data (pd.DataFrame, optional): DataFrame con los datos de procesos y transacciones. Si no se
+        indica, las series diarias se calculan con el backend indicado.
+    backend (str): 'rollups' (agregados diarios del ETL) o 'database' (agregaciones del ORM).
 
     Returns:
     dict: Resultados del análisis de tendencias.
     """
-    data['date'] = pd.to_datetime(data['date'])
-    daily_volume = data.groupby(data['date'].dt.to_period('D'))['amount'].sum()
-    daily_rate = data.groupby(data['date'].dt.to_period('D'))['exchange_rate__rate'].mean()
+    if data is None:
+        daily = aggregate_series('day') if backend == 'database' else daily_series(load_daily_rollups())
+        daily_volume, daily_rate = daily['volume'], daily['rate']
+    else:
+        data['date'] = pd.to_datetime(data['date'])
+        daily_volume = data.groupby(data['date'].dt.to_period('D'))['amount'].sum()
+        daily_rate = data.groupby(data['date'].dt.to_period('D'))['exchange_rate__rate'].mean()
 
     volume_trend = np.polyfit(range(len(daily_volume)), daily_volume, 1)
     rate_trend = np.polyfit(range(len(daily_rate)), daily_rate, 1)
@@ -110,24 +308,172 @@ def analyze_trends(data):
         'tasa_cambio_tendencia': rate_trend[0]
     }
 
-def perform_analysis():
+def perform_analysis(backend='rollups', approximate=False):
     """
     Realiza un análisis completo de desempeño de procesos de cambio de divisas.
 
+    Args:
+    backend (str): Origen de los KPIs y tendencias: 'rollups' (agregados diarios del ETL),
+        'database' (agregaciones del ORM) o 'pandas' (DataFrame combinado). Salvo con 'pandas',
+        las correlaciones y la comparación de monedas se leen de los estadísticos acumulados.
+    approximate (bool): Si es True, devuelve el análisis aproximado de perform_approximate_analysis,
+        calculado con la muestra y los sketches que mantiene el ETL.
+
     Returns:
     dict: Resultados completos del análisis de desempeño.
     """
-    data = load_data()
+    if approximate:
+        return perform_approximate_analysis()
+
+    # Sin agregados diarios del ETL se agrega en la base de datos en lugar de recorrer las transacciones
+    if backend == 'rollups' and not DailyTransactionRollup.objects.exists():
+        backend = 'database'
+    # El DataFrame combinado solo se carga si algún resultado no puede salir de los datos agregados
+    use_statistics = backend != 'pandas' and accumulators.state_exists()
+    data = None if use_statistics else load_data()
+    daily_data = data if backend == 'pandas' else None
 
     results = {
-        'kpis': calculate_kpis(data),
+        'kpis': calculate_kpis(daily_data, backend),
         'correlaciones': analyze_correlations(data),
         'comparacion_monedas': compare_currencies(data, 'USD', 'EUR'),  # Ejemplo con USD y EUR
-        'tendencias': analyze_trends(data)
+        'comparacion_monedas_matriz': compare_all_currencies(data),
+        'tendencias': analyze_trends(daily_data, backend),
+        'tendencias_segmentos': trend_analysis.summarize_segment_trends(
+            trend_analysis.analyze_segment_trends(daily_data, backend=backend)
+        ),
     }
 
     return results
 
+def approximate_correlations(sample):
+    """
+    Estima la matriz de correlación con la muestra, con intervalos del 95% por la transformación de Fisher.
+
+    Args:
+    sample (ReservoirSample): Muestra de filas del estado acumulado.
+
+    Returns:
+    dict: Matrices 'valor', 'inferior' y 'superior'.
+    """
+    frame = sample.to_frame()[accumulators.CORRELATION_VARIABLES]
+    correlation = frame.corr()
+    present = frame.notna().to_numpy(dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        half_width = Z_95 / np.sqrt(present.T @ present - 3)
+        z = np.arctanh(np.clip(correlation.to_numpy(), -0.999999, 0.999999))
+    bounds = {
+        name: pd.DataFrame(np.tanh(z + sign * half_width), index=correlation.index, columns=correlation.columns)
+        for name, sign in (('inferior', -1), ('superior', 1))
+    }
+    return {'valor': correlation, **bounds}
+
+def approximate_trends(sample):
+    """
+    Estima las tendencias de analyze_trends con la muestra, con el error del 95% de cada pendiente.
+
+    El volumen diario se estima escalando la suma muestral por filas vistas / filas muestreadas.
+
+    Args:
+    sample (ReservoirSample): Muestra de filas del estado acumulado.
+
+    Returns:
+    dict: Pendientes y su error (semiamplitud del intervalo del 95%).
+    """
+    frame = sample.to_frame()
+    scale = sample.seen / len(frame) if len(frame) else np.nan
+    daily = frame.groupby('day').agg(volume=('amount', 'sum'), rate=('exchange_rate__rate', 'mean'))
+    results = {}
+    for name, values in (('volumen_tendencia', daily['volume'] * scale), ('tasa_cambio_tendencia', daily['rate'])):
+        x = np.arange(len(values), dtype=np.float64)
+        if len(values) < 3:
+            results[name], results[f"{name}_error"] = np.nan, np.nan
+            continue
+        fit = stats.linregress(x, values.to_numpy(dtype=np.float64))
+        results[name] = fit.slope
+        results[f"{name}_error"] = stats.t.ppf(0.975, len(values) - 2) * fit.stderr
+    return results
+
+def approximate_quantiles(sketch, probabilities=APPROXIMATE_QUANTILES):
+    """
+    Estima cuantiles del importe con el sketch, acotados por su error de rango.
+
+    Args:
+    sketch (QuantileSketch): Sketch de cuantiles del importe.
+    probabilities (list): Probabilidades a estimar.
+
+    Returns:
+    pd.DataFrame: Valor, cota inferior y superior por probabilidad, y error de rango.
+    """
+    error = sketch.rank_error()
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    return pd.DataFrame({
+        'valor': sketch.quantiles(probabilities),
+        'inferior': sketch.quantiles(probabilities - error),
+        'superior': sketch.quantiles(probabilities + error),
+        'error_rango': error,
+    }, index=pd.Index(probabilities, name='cuantil'))
+
+def perform_approximate_analysis(data=None):
+    """
+    Realiza el análisis en modo aproximado a partir de la muestra y los sketches acumulados por el ETL.
+
+    Args:
+    data (pd.DataFrame, optional): Si se indica, se resume este DataFrame en lugar de leer el estado acumulado.
+
+    Returns:
+    dict: Correlaciones, tendencias, cuantiles del importe y valores distintos, cada uno con su cota de error.
+    """
+    if data is not None:
+        state = accumulators.batch_state(data)
+    elif accumulators.state_exists():
+        state = accumulators.load_state()
+    else:
+        state = accumulators.batch_state(load_data())
+
+    return {
+        'muestra': {'filas': len(state['sample'].rows), 'total': state['sample'].seen},
+        'correlaciones': approximate_correlations(state['sample']),
+        'tendencias': approximate_trends(state['sample']),
+        'cuantiles_importe': approximate_quantiles(state['amount_quantiles']),
+        'distintos': {
+            name: {'valor': sketch.estimate(), 'error_relativo': sketch.relative_error()}
+            for name, sketch in state['distinct'].items()
+        },
+    }
+
+def print_approximate_results(results):
+    """
+    Imprime los resultados del modo aproximado con sus cotas de error.
+
+    Args:
+    results (dict): Resultados de perform_approximate_analysis.
+    """
+    print("Análisis Aproximado de Procesos de Cambio de Divisas")
+    print("===================================================")
+    print(f"Muestra: {results['muestra']['filas']} de {results['muestra']['total']} transacciones")
+
+    print("\nCorrelaciones principales (intervalo del 95%):")
+    correlations = results['correlaciones']
+    for var1 in correlations['valor'].index:
+        for var2 in correlations['valor'].columns:
+            if var1 < var2 and abs(correlations['valor'].loc[var1, var2]) > 0.5:
+                print(f"  {var1} vs {var2}: {correlations['valor'].loc[var1, var2]:.2f} "
+                      f"[{correlations['inferior'].loc[var1, var2]:.2f}, {correlations['superior'].loc[var1, var2]:.2f}]")
+
+    print("\nCuantiles del importe:")
+    for probability, row in results['cuantiles_importe'].iterrows():
+        print(f"  p{probability * 100:g}: {row['valor']:.2f} [{row['inferior']:.2f}, {row['superior']:.2f}]")
+
+    print("\nValores distintos:")
+    for name, estimate in results['distintos'].items():
+        print(f"  {name}: {estimate['valor']:.0f} (±{estimate['error_relativo']:.1%})")
+
+    print("\nTendencias:")
+    trends = results['tendencias']
+    print(f"  Tendencia de volumen diario: {trends['volumen_tendencia']:.2f} ± {trends['volumen_tendencia_error']:.2f} unidades/día")
+    print(f"  Tendencia de tasa de cambio: {trends['tasa_cambio_tendencia']:.4f} ± {trends['tasa_cambio_tendencia_error']:.4f} unidades/día")
+
 def print_analysis_results(results):
     """
     Imprime los resultados del análisis de desempeño de forma legible.
@@ -154,11 +500,24 @@ def print_analysis_results(results):
     print(f"  Diferencia media en volumen: {currency_comp['diferencia_media']:.2f}")
     print(f"  Valor p: {currency_comp['valor_p']:.4f}")
 
+    print("\nComparación de Monedas (todos los pares, valor p):")
+    currency_matrix = results['comparacion_monedas_matriz']['valor_p']
+    print('\n'.join(f"  {line}" for line in currency_matrix.to_string(float_format=lambda value: f"{value:.4f}").splitlines()))
+
     print("\nTendencias:")
     trends = results['tendencias']
     print(f"  Tendencia de volumen diario: {trends['volumen_tendencia']:.2f} unidades/día")
     print(f"  Tendencia de tasa de cambio: {trends['tasa_cambio_tendencia']:.4f} unidades/día")
 
+    print("\nTendencias por segmento (unidades/día):")
+    for name, table in results['tendencias_segmentos'].items():
+        print(f"  {name}:")
+        columns = ['volumen_tendencia', 'tasa_cambio_tendencia'] + [c for c in table.columns if c.startswith('volumen_tendencia_')]
+        print('\n'.join(f"    {line}" for line in table[columns].to_string(float_format=lambda value: f"{value:.4f}").splitlines()))
+
 if __name__ == "__main__":
-    results = perform_analysis()
-    print_analysis_results(results)
\ No newline at end of file
+    import sys
+    if '--approximate' in sys.argv:
+        print_approximate_results(perform_analysis(approximate=True))
+    else:
+        print_analysis_results(perform_analysis())
\ No newline at end of file
@@ -0,0 +1,193 @@
+# portfolio_optimization.py
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from django.db.models import Avg
+from analyzer.models import Transaction, Optimization, DailyTransactionRollup
+from scripts import dataset, rate_cube, solver
+
+# Reparto de un único presupuesto entre todos los pares de monedas y procesos a la vez. Cada
+# unidad asignada a un par cuesta su tipo de cambio y rinde 1 + mejora / 100 del proceso que la
+# gestiona, como en improve_efficiency; el modelo conjunto es un programa lineal de N variables
+# que solver.maximize_knapsack resuelve en bloque.
+
+PAIR_COLUMNS = ['logistic_process_id', 'from_currency_id', 'to_currency_id', 'from_currency', 'to_currency']
+
+
+def pair_label(from_currency, to_currency):
+    return f"{from_currency}/{to_currency}"
+
+
+def load_candidates(as_of=None):
+    """
+    Carga los candidatos del reparto: cada combinación proceso × par de monedas con transacciones,
+    la mejora de eficiencia media de las optimizaciones del proceso y el tipo de cambio del par a
+    la fecha indicada.
+
+    Args:
+    as_of (date, optional): Fecha del tipo de cambio; por defecto, hoy (el último disponible).
+
+    Returns:
+    pd.DataFrame: Una fila por proceso × par con las columnas de PAIR_COLUMNS, pair,
+        efficiency_improvement y exchange_rate (NaN si el par no tiene tipo de cambio).
+    """
+    as_of = as_of or date.today()
+    # Los agregados diarios del ETL tienen los mismos pares con muchas menos filas que Transaction
+    source = DailyTransactionRollup if DailyTransactionRollup.objects.exists() else Transaction
+    pairs = source.objects.values_list(
+        'logistic_process_id', 'from_currency_id', 'to_currency_id', 'from_currency__code', 'to_currency__code'
+    ).distinct().order_by('logistic_process_id', 'from_currency_id', 'to_currency_id')
+    candidates = pd.DataFrame(list(pairs), columns=PAIR_COLUMNS)
+    candidates['pair'] = [pair_label(f, t) for f, t in zip(candidates['from_currency'], candidates['to_currency'])]
+
+    efficiency = dict(Optimization.objects.values('logistic_process_id').annotate(
+        mean=Avg('efficiency_improvement')
+    ).values_list('logistic_process_id', 'mean'))
+    candidates['efficiency_improvement'] = candidates['logistic_process_id'].map(efficiency).fillna(0.0).astype(np.float64)
+
+    _, candidates['exchange_rate'] = rate_cube.get_rates().lookup(
+        candidates['from_currency_id'], candidates['to_currency_id'], np.full(len(candidates), as_of)
+    )
+    return candidates
+
+
+def optimize_portfolio(budget, caps=None, efficiency_improvements=None, as_of=None, previous=None, candidates=None):
+    """
+    Reparte un presupuesto entre todos los pares de monedas y procesos maximizando el volumen de
+    intercambio total, con un límite de asignación por par.
+
+    Todas las unidades de un par cuestan lo mismo, así que el límite del par se asigna entero al
+    proceso con mayor mejora de eficiencia y el modelo queda en una variable por par.
+
+    Args:
+    budget (float): Presupuesto total disponible.
+    caps (float or dict, optional): Asignación máxima por par, común o por par ('USD/EUR' o
+        ('USD', 'EUR')); por defecto, sin límite.
+    efficiency_improvements (float or dict, optional): Porcentaje de mejora de eficiencia, común o
+        por ID de proceso; por defecto, la media de las optimizaciones de cada proceso.
+    as_of (date, optional): Fecha del tipo de cambio; por defecto, hoy.
+    previous (dict, optional): Resultado anterior de optimize_portfolio desde el que arrancar en caliente.
+    candidates (pd.DataFrame, optional): Candidatos ya cargados con load_candidates (por ejemplo,
+        previous['candidates']) para no volver a consultarlos.
+
+    Returns:
+    dict: Reparto por par ('allocations'), totales, método del solver y orden de llenado.
+    """
+    start = time.perf_counter()
+    if candidates is None:
+        candidates = load_candidates(as_of)
+    candidates = candidates.copy()
+    if np.isscalar(efficiency_improvements):
+        candidates['efficiency_improvement'] = float(efficiency_improvements)
+    elif efficiency_improvements is not None:
+        candidates['efficiency_improvement'] = candidates['logistic_process_id'].map(efficiency_improvements).fillna(
+            candidates['efficiency_improvement']
+        ).astype(np.float64)
+
+    # Una variable por par: el proceso con mayor mejora se queda con toda la asignación del par
+    pairs = candidates.dropna(subset=['exchange_rate']).sort_values(
+        ['efficiency_improvement', 'logistic_process_id'], ascending=[False, True], kind='stable'
+    ).drop_duplicates('pair').sort_values('pair').reset_index(drop=True)
+
+    if isinstance(caps, dict):
+        caps = {key if isinstance(key, str) else pair_label(*key): value for key, value in caps.items()}
+        pairs['cap'] = pairs['pair'].map(caps).fillna(np.inf).astype(np.float64)
+    else:
+        pairs['cap'] = np.inf if caps is None else float(caps)
+
+    # El orden anterior solo sirve si se refiere a los mismos pares
+    order = None
+    if previous is not None and sorted(previous['order']) == pairs['pair'].tolist():
+        order = pairs.reset_index().set_index('pair').loc[previous['order'], 'index'].to_numpy()
+
+    rate = pairs['exchange_rate'].to_numpy(dtype=np.float64)
+    value_per_unit = 1 + pairs['efficiency_improvement'].to_numpy(dtype=np.float64) / 100
+    solution = solver.maximize_knapsack(value_per_unit, rate, budget, pairs['cap'].to_numpy(), order)
+
+    pairs['allocation'] = solution.x
+    pairs['cost'] = solution.x * rate
+    pairs['volume'] = solution.x * value_per_unit
+
+    return {
+        'budget': budget,
+        'allocations': pairs,
+        'total_cost': float(pairs['cost'].sum()),
+        'total_volume': solution.value,
+        'method': solution.method,
+        'order': pairs['pair'].iloc[solution.order].tolist(),
+        'candidates': candidates,
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def save_portfolio(result, implementation_date=None):
+    """
+    Guarda el reparto como una Optimization por proceso con asignación, con una sola inserción masiva.
+
+    La mejora de eficiencia es la del volumen obtenido sobre lo asignado; la reducción de costos
+    compara el costo por unidad de volumen del proceso con el de repartir el presupuesto a partes
+    iguales entre los pares; la reducción del tiempo de procesamiento, que el modelo no estima, se
+    mantiene en la media de las optimizaciones anteriores del proceso.
+
+    Args:
+    result (dict): Resultado de optimize_portfolio.
+    implementation_date (date, optional): Fecha de implementación; por defecto, hoy.
+
+    Returns:
+    list: Objetos Optimization creados.
+    """
+    pairs = result['allocations']
+    allocated = pairs[pairs['allocation'] > 0]
+    if allocated.empty:
+        return []
+
+    # Referencia sin optimizar: el mismo presupuesto repartido a partes iguales entre los pares
+    even_volume = (result['budget'] / len(pairs) / pairs['exchange_rate'] * (1 + pairs['efficiency_improvement'] / 100)).sum()
+    baseline_cost_per_volume = result['budget'] / even_volume if even_volume else np.nan
+
+    processing_time = dict(Optimization.objects.filter(
+        logistic_process_id__in=allocated['logistic_process_id'].unique().tolist()
+    ).values('logistic_process_id').annotate(mean=Avg('processing_time_reduction')).values_list('logistic_process_id', 'mean'))
+
+    optimizations = []
+    for process_id, group in allocated.groupby('logistic_process_id'):
+        volume, cost = group['volume'].sum(), group['cost'].sum()
+        lines = [f"{row.pair} {row.allocation:,.2f} (cost {row.cost:,.2f})" for row in group.itertuples()]
+        cost_reduction = (1 - cost / volume / baseline_cost_per_volume) * 100 if volume else 0.0
+        optimizations.append(Optimization(
+            logistic_process_id=int(process_id),
+            efficiency_improvement=float((volume / group['allocation'].sum() - 1) * 100),
+            cost_reduction=float(np.nan_to_num(cost_reduction)),
+            processing_time_reduction=float(processing_time.get(process_id) or 0.0),
+            implementation_date=implementation_date or date.today(),
+            comments=f"Portfolio allocation of a {result['budget']:,.2f} budget: " + "; ".join(lines),
+        ))
+
+    created = Optimization.objects.bulk_create(optimizations)
+    dataset.invalidate()
+    return created
+
+
+def print_portfolio(result):
+    """
+    Imprime el reparto del presupuesto por par.
+
+    Args:
+    result (dict): Resultado de optimize_portfolio.
+    """
+    print(f"Presupuesto: {result['budget']:,.2f} repartido entre {len(result['allocations'])} pares "
+          f"({result['method']}, {result['seconds'] * 1000:.1f} ms)")
+    allocated = result['allocations'][result['allocations']['allocation'] > 0]
+    print(allocated[['pair', 'logistic_process_id', 'exchange_rate', 'efficiency_improvement', 'allocation', 'cost', 'volume']].to_string(index=False))
+    print(f"Costo total: {result['total_cost']:,.2f}")
+    print(f"Volumen total: {result['total_volume']:,.2f}")
+
+
+if __name__ == "__main__":
+    import sys
+    result = optimize_portfolio(float(sys.argv[1]) if len(sys.argv) > 1 else 100000)
+    print_portfolio(result)
+    if '--save' in sys.argv:
+        print(f"Optimizaciones guardadas: {len(save_portfolio(result))}")
@@ -0,0 +1,323 @@
+# rate_cube.py
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from analyzer.models import Currency
+from scripts import rate_index
+
+# Cubo denso de tipos de cambio [día, moneda origen, moneda destino] persistido como ficheros .npy.
+# Los procesos lo abren con memory mapping de solo lectura, de modo que los workers del servidor
+# web y los de análisis comparten las mismas páginas de memoria y cada búsqueda es un acceso O(1).
+#
+# Cada reconstrucción escribe una versión nueva (v-<version>/) y después cambia el puntero CURRENT
+# con os.replace; los lectores que aún tengan abierta la versión anterior siguen leyéndola hasta
+# que vuelven a consultar el puntero.
+POINTER_FILE = 'CURRENT'
+META_FILE = 'meta.json'
+# Versiones anteriores que se conservan para los lectores que todavía las tengan abiertas
+KEEP_VERSIONS = 2
+
+
+def rate_cube_dir():
+    # Se lee en cada llamada para que override_settings (pruebas, benchmark) redirija el cubo
+    return getattr(settings, 'ANALYTICS_RATE_CUBE_DIR', os.path.join(settings.BASE_DIR, 'data', 'rate_cube'))
+
+
+class RateCube:
+    """
+    Vista de solo lectura de una versión del cubo.
+
+    Ofrece la misma interfaz de búsqueda que rate_index.RateIndex (lookup y as_of), y además
+    series y matrices como vistas sin copia de los ficheros mapeados.
+    """
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, META_FILE)) as meta_file:
+            self.meta = json.load(meta_file)
+        self.directory = directory
+        self.version = self.meta['version']
+        self.start_date = np.datetime64(self.meta['start_date'], 'D')
+        self.codes = np.array(self.meta['currency_codes'], dtype=object)
+        self._codes = pd.Index(self.meta['currency_codes'])
+        self._ids = pd.Index(self.meta['currency_ids'])
+        self.rates = np.load(os.path.join(directory, 'rates.npy'), mmap_mode='r')
+        self.rate_ids = np.load(os.path.join(directory, 'rate_ids.npy'), mmap_mode='r')
+        self.last_day = np.load(os.path.join(directory, 'last_day.npy'), mmap_mode='r')
+
+    @property
+    def dates(self):
+        return self.start_date + np.arange(self.rates.shape[0])
+
+    def currency_positions(self, currencies, codes=False):
+        index = self._codes if codes else self._ids
+        return index.get_indexer(np.atleast_1d(np.asarray(currencies, dtype=object)))
+
+    def day_positions(self, dates):
+        return (rate_index._days(dates) - self.start_date).astype(np.int64)
+
+    def positions(self, from_currencies, to_currencies, dates, exact=False, codes=False):
+        """
+        Calcula en bloque la celda (día, origen, destino) del tipo de cambio de cada consulta.
+
+        Args:
+        from_currencies (array-like): Monedas de origen (ids, o códigos si codes es True).
+        to_currencies (array-like): Monedas de destino.
+        dates (array-like): Fechas de consulta.
+        exact (bool): Exigir un tipo de cambio de la misma fecha en lugar del último anterior.
+        codes (bool): Las monedas se indican por código en lugar de por id.
+
+        Returns:
+        tuple: Arrays de día, origen y destino, y máscara de las consultas con tipo de cambio.
+        """
+        from_idx = self.currency_positions(from_currencies, codes)
+        to_idx = self.currency_positions(to_currencies, codes)
+        days = self.day_positions(dates)
+        days_in_cube = self.rates.shape[0]
+        valid = (from_idx >= 0) & (to_idx >= 0) & (days >= 0) & (days_in_cube > 0)
+        if not valid.any():
+            return np.zeros_like(days), np.zeros_like(from_idx), np.zeros_like(to_idx), valid
+        if exact:
+            valid &= days < days_in_cube
+        # Después del último día, el tipo a fecha es el del último día del cubo
+        days = np.clip(days, 0, days_in_cube - 1)
+        from_idx, to_idx = np.maximum(from_idx, 0), np.maximum(to_idx, 0)
+        if exact:
+            valid &= self.rate_ids[days, from_idx, to_idx] >= 0
+        else:
+            days = np.asarray(self.last_day[days, from_idx, to_idx], dtype=np.int64)
+            valid &= days >= 0
+        return np.maximum(days, 0), from_idx, to_idx, valid
+
+    def lookup(self, from_currencies, to_currencies, dates, exact=False, codes=False):
+        """
+        Devuelve en bloque el id y el valor del tipo de cambio de cada (moneda origen, moneda destino, fecha).
+
+        Args:
+        from_currencies (array-like): Monedas de origen (ids, o códigos si codes es True).
+        to_currencies (array-like): Monedas de destino.
+        dates (array-like): Fechas de consulta.
+        exact (bool): Exigir un tipo de cambio de la misma fecha en lugar del último anterior.
+        codes (bool): Las monedas se indican por código en lugar de por id.
+
+        Returns:
+        tuple: Ids de ExchangeRate (-1 si no hay) y tipos de cambio (NaN si no hay).
+        """
+        days, from_idx, to_idx, valid = self.positions(from_currencies, to_currencies, dates, exact, codes)
+        if not valid.any():
+            return np.full(len(valid), -1, dtype=np.int64), np.full(len(valid), np.nan)
+        return (
+            np.where(valid, self.rate_ids[days, from_idx, to_idx], -1),
+            np.where(valid, self.rates[days, from_idx, to_idx], np.nan),
+        )
+
+    def as_of(self, from_currency, to_currency, date, codes=False):
+        """
+        Último tipo de cambio de un par en o antes de una fecha.
+
+        Args:
+        from_currency: Moneda de origen (id, o código si codes es True).
+        to_currency: Moneda de destino.
+        date (date): Fecha de consulta.
+        codes (bool): Las monedas se indican por código en lugar de por id.
+
+        Returns:
+        rate_index.Rate: Tipo de cambio, o None si no existe.
+        """
+        days, from_idx, to_idx, valid = self.positions([from_currency], [to_currency], [date], codes=codes)
+        if not valid[0]:
+            return None
+        day, i, j = days[0], from_idx[0], to_idx[0]
+        return rate_index.Rate(
+            int(self.rate_ids[day, i, j]), self.codes[i], self.codes[j],
+            (self.start_date + day).astype(object), float(self.rates[day, i, j])
+        )
+
+    def series(self, from_currency, to_currency, start_date=None, end_date=None, codes=False):
+        """
+        Serie diaria de un par como vista sin copia del fichero mapeado.
+
+        Args:
+        from_currency: Moneda de origen (id, o código si codes es True).
+        to_currency: Moneda de destino.
+        start_date (date, optional): Primer día de la serie.
+        end_date (date, optional): Último día de la serie (incluido).
+        codes (bool): Las monedas se indican por código en lugar de por id.
+
+        Returns:
+        tuple: Fechas y tipos de cambio (NaN los días sin tipo).
+        """
+        i = self.currency_positions([from_currency], codes)[0]
+        j = self.currency_positions([to_currency], codes)[0]
+        if i < 0 or j < 0:
+            raise KeyError(f"Currency pair {from_currency}/{to_currency} is not in the rate cube.")
+        start = max(int(self.day_positions([start_date])[0]), 0) if start_date is not None else 0
+        stop = max(int(self.day_positions([end_date])[0]) + 1, 0) if end_date is not None else self.rates.shape[0]
+        return self.dates[start:stop], self.rates[start:stop, i, j]
+
+    def matrix(self, date):
+        """
+        Matriz origen × destino de los tipos de cambio de un día, como vista sin copia.
+
+        Args:
+        date (date): Día de la matriz.
+
+        Returns:
+        pd.DataFrame: Tipos de cambio con los códigos de moneda como índice y columnas.
+        """
+        return pd.DataFrame(self.rates[int(self.day_positions([date])[0])], index=self.codes, columns=self.codes, copy=False)
+
+
+def read_pointer(path=None):
+    path = path or rate_cube_dir()
+    try:
+        with open(os.path.join(path, POINTER_FILE)) as pointer_file:
+            return pointer_file.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _write_pointer(name, path):
+    tmp = os.path.join(path, f"{POINTER_FILE}.tmp-{uuid.uuid4().hex}")
+    with open(tmp, 'w') as pointer_file:
+        pointer_file.write(name)
+    os.replace(tmp, os.path.join(path, POINTER_FILE))
+
+
+def _remove_old_versions(current, path):
+    versions = sorted(name for name in os.listdir(path) if name.startswith('v-') and name != current)
+    for name in versions[:max(len(versions) - (KEEP_VERSIONS - 1), 0)]:
+        # En Windows no se puede borrar un fichero que otro proceso tiene mapeado; se reintenta en la próxima reconstrucción
+        shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+    for name in os.listdir(path):
+        if name.startswith('tmp-'):
+            shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+
+
+def build_cube(path=None):
+    """
+    Reconstruye el cubo a partir de la tabla ExchangeRate y publica la nueva versión de forma atómica.
+
+    Args:
+    path (str, optional): Directorio del cubo; por defecto, el del ajuste ANALYTICS_RATE_CUBE_DIR.
+
+    Returns:
+    RateCube: La versión recién publicada.
+    """
+    path = path or rate_cube_dir()
+    started = time.perf_counter()
+    version = rate_index.rate_version()
+    index = rate_index.build_rate_index()
+    currencies = list(Currency.objects.order_by('id').values_list('id', 'code'))
+    currency_ids = [currency_id for currency_id, _ in currencies]
+
+    start_date = index.dates.min() if len(index) else np.datetime64('today', 'D')
+    num_days = int((index.dates.max() - start_date).astype(np.int64)) + 1 if len(index) else 0
+    shape = (num_days, len(currencies), len(currencies))
+
+    currency_index = pd.Index(currency_ids)
+    days = (index.dates - start_date).astype(np.int64)
+    from_idx, to_idx = currency_index.get_indexer(index.from_ids), currency_index.get_indexer(index.to_ids)
+    rates = np.full(shape, np.nan)
+    rate_ids = np.full(shape, -1, dtype=np.int64)
+    rates[days, from_idx, to_idx] = index.rates
+    rate_ids[days, from_idx, to_idx] = index.ids
+    # Día del último tipo conocido en o antes de cada día, para las búsquedas a fecha
+    day_numbers = np.arange(num_days, dtype=np.int32)[:, None, None]
+    last_day = np.maximum.accumulate(np.where(rate_ids >= 0, day_numbers, np.int32(-1)), axis=0)
+
+    os.makedirs(path, exist_ok=True)
+    cube_version = time.time_ns()
+    tmp = os.path.join(path, f"tmp-{uuid.uuid4().hex}")
+    os.makedirs(tmp)
+    np.save(os.path.join(tmp, 'rates.npy'), rates)
+    np.save(os.path.join(tmp, 'rate_ids.npy'), rate_ids)
+    np.save(os.path.join(tmp, 'last_day.npy'), last_day)
+    with open(os.path.join(tmp, META_FILE), 'w') as meta_file:
+        json.dump({
+            'version': cube_version,
+            'rate_version': [version[0], version[1], str(version[2]) if version[2] else None],
+            'start_date': str(start_date),
+            'currency_ids': currency_ids,
+            'currency_codes': [code for _, code in currencies],
+        }, meta_file)
+
+    name = f"v-{cube_version}"
+    os.rename(tmp, os.path.join(path, name))
+    _write_pointer(name, path)
+    _remove_old_versions(name, path)
+    print(f"Rate cube {shape[0]}x{shape[1]}x{shape[2]} built in {time.perf_counter() - started:.2f}s.")
+    return RateCube(os.path.join(path, name))
+
+
+_lock = threading.Lock()
+_cube = None
+
+
+def get_rate_cube(path=None):
+    """
+    Devuelve la versión publicada del cubo, mapeada una sola vez por proceso y reabierta cuando
+    cambia el puntero CURRENT.
+
+    Args:
+    path (str, optional): Directorio del cubo; por defecto, el del ajuste ANALYTICS_RATE_CUBE_DIR.
+
+    Returns:
+    RateCube: Cubo publicado, o None si todavía no se ha construido.
+    """
+    global _cube
+    path = path or rate_cube_dir()
+    name = read_pointer(path)
+    with _lock:
+        if name is None:
+            return None
+        if _cube is None or os.path.basename(_cube.directory) != name or os.path.dirname(_cube.directory) != path:
+            _cube = RateCube(os.path.join(path, name))
+        return _cube
+
+
+def is_current(cube, version=None):
+    version = version or rate_index.rate_version()
+    return cube.meta['rate_version'] == [version[0], version[1], str(version[2]) if version[2] else None]
+
+
+def refresh_cube(path=None):
+    """
+    Reconstruye el cubo solo si la tabla de tipos de cambio ha cambiado desde la última versión.
+
+    Args:
+    path (str, optional): Directorio del cubo; por defecto, el del ajuste ANALYTICS_RATE_CUBE_DIR.
+
+    Returns:
+    RateCube: Cubo publicado y al día.
+    """
+    path = path or rate_cube_dir()
+    cube = get_rate_cube(path)
+    if cube is not None and is_current(cube):
+        return cube
+    return build_cube(path)
+
+
+def get_rates():
+    """
+    Devuelve la fuente de tipos de cambio más barata que esté al día: el cubo mapeado si refleja
+    la tabla actual, o el índice en memoria del proceso en caso contrario.
+
+    Returns:
+    RateCube o rate_index.RateIndex: Objeto con lookup y as_of.
+    """
+    version = rate_index.rate_version()
+    cube = get_rate_cube()
+    if cube is not None and is_current(cube, version):
+        return cube
+    return rate_index.get_rate_index(version)
+
+
+if __name__ == "__main__":
+    build_cube()
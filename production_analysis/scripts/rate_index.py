@@ -0,0 +1,176 @@
+# rate_index.py
+import threading
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+from django.db.models import Count, FloatField, Max
+from django.db.models.functions import Cast
+from analyzer.models import ExchangeRate
+
+# Índice en memoria de los tipos de cambio para consultas "a fecha" (el último tipo en o antes
+# de una fecha) y exactas, sin una consulta SQL por búsqueda. Lo comparten el optimizador, el
+# ETL y el generador de datos a través de get_rate_index().
+
+Rate = namedtuple('Rate', ['id', 'from_currency', 'to_currency', 'date', 'rate'])
+
+RATE_COLUMNS = ['id', 'from_currency_id', 'to_currency_id', 'from_currency__code', 'to_currency__code', 'date', 'rate']
+
+
+def _days(dates):
+    return np.atleast_1d(np.asarray(pd.to_datetime(dates), dtype='datetime64[D]'))
+
+
+class RateIndex:
+    """
+    Tipos de cambio ordenados por par de monedas y fecha.
+
+    Cada fila tiene la clave par × span + día, de modo que una búsqueda vectorizada de muchos
+    (par, fecha) se resuelve con un único np.searchsorted sobre un array ordenado.
+    """
+
+    def __init__(self, rates):
+        rates = rates.sort_values(['from_currency_id', 'to_currency_id', 'date'], kind='stable').reset_index(drop=True)
+        slots, pairs = pd.MultiIndex.from_frame(rates[['from_currency_id', 'to_currency_id']]).factorize()
+        self._pair_ids = pairs
+        self._pair_codes = pd.MultiIndex.from_frame(
+            rates[['from_currency__code', 'to_currency__code']].iloc[np.unique(slots, return_index=True)[1]]
+        )
+        self.from_ids = rates['from_currency_id'].to_numpy(dtype=np.int64)
+        self.to_ids = rates['to_currency_id'].to_numpy(dtype=np.int64)
+        self.from_codes = rates['from_currency__code'].to_numpy(dtype=object)
+        self.to_codes = rates['to_currency__code'].to_numpy(dtype=object)
+        self.dates = _days(rates['date']) if len(rates) else np.empty(0, dtype='datetime64[D]')
+        self.rates = rates['rate'].to_numpy(dtype=np.float64)
+        self.ids = rates['id'].to_numpy(dtype=np.int64)
+        self.slots = slots.astype(np.int64)
+
+        days = self.dates.astype(np.int64)
+        self._first_day = int(days.min()) if len(days) else 0
+        # Hueco de un día antes del primero para que las fechas anteriores no caigan en el par previo
+        self._span = (int(days.max()) - self._first_day + 2) if len(days) else 1
+        self._keys = self.slots * self._span + (days - self._first_day + 1)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def positions(self, from_currencies, to_currencies, dates, exact=False, codes=False):
+        """
+        Busca en bloque la fila del tipo de cambio de cada (moneda origen, moneda destino, fecha).
+
+        Args:
+        from_currencies (array-like): Monedas de origen (ids, o códigos si codes es True).
+        to_currencies (array-like): Monedas de destino.
+        dates (array-like): Fechas de consulta.
+        exact (bool): Si es True, solo vale un tipo de cambio de esa misma fecha; si no, el último
+            en o antes de la fecha.
+        codes (bool): Las monedas se indican por código en lugar de por id.
+
+        Returns:
+        np.ndarray: Posición de la fila en el índice, o -1 si no hay tipo de cambio.
+        """
+        pairs = self._pair_codes if codes else self._pair_ids
+        query = pd.MultiIndex.from_arrays([np.atleast_1d(from_currencies), np.atleast_1d(to_currencies)])
+        slots = pairs.get_indexer(query).astype(np.int64) if len(pairs) else np.full(len(query), -1, dtype=np.int64)
+        dates = _days(dates)
+        valid = (slots >= 0) & ~np.isnat(dates)
+
+        offsets = np.clip(dates.astype(np.int64) - self._first_day + 1, 0, self._span - 1)
+        keys = np.where(valid, slots * self._span + offsets, -1)
+        positions = np.searchsorted(self._keys, keys, side='right') - 1
+        found = valid & (positions >= 0)
+        found[found] &= self.slots[positions[found]] == slots[found]
+        if exact:
+            found[found] &= self.dates[positions[found]] == dates[found]
+        return np.where(found, positions, -1)
+
+    def lookup(self, from_currencies, to_currencies, dates, exact=False, codes=False):
+        """
+        Devuelve en bloque el id y el valor del tipo de cambio de cada (moneda origen, moneda destino, fecha).
+
+        Args:
+        from_currencies (array-like): Monedas de origen (ids, o códigos si codes es True).
+        to_currencies (array-like): Monedas de destino.
+        dates (array-like): Fechas de consulta.
+        exact (bool): Exigir un tipo de cambio de la misma fecha en lugar del último anterior.
+        codes (bool): Las monedas se indican por código en lugar de por id.
+
+        Returns:
+        tuple: Ids de ExchangeRate (-1 si no hay) y tipos de cambio (NaN si no hay).
+        """
+        positions = self.positions(from_currencies, to_currencies, dates, exact, codes)
+        if not len(self):
+            return np.full(len(positions), -1, dtype=np.int64), np.full(len(positions), np.nan)
+        found = positions >= 0
+        return np.where(found, self.ids[positions], -1), np.where(found, self.rates[positions], np.nan)
+
+    def as_of(self, from_currency, to_currency, date, codes=False):
+        """
+        Último tipo de cambio de un par en o antes de una fecha.
+
+        Args:
+        from_currency: Moneda de origen (id, o código si codes es True).
+        to_currency: Moneda de destino.
+        date (date): Fecha de consulta.
+        codes (bool): Las monedas se indican por código en lugar de por id.
+
+        Returns:
+        Rate: Tipo de cambio, o None si no existe.
+        """
+        position = self.positions([from_currency], [to_currency], [date], codes=codes)[0]
+        if position < 0:
+            return None
+        return Rate(
+            int(self.ids[position]), self.from_codes[position], self.to_codes[position],
+            self.dates[position].astype(object), float(self.rates[position])
+        )
+
+
+def rate_version():
+    """
+    Identificador barato de la versión de la tabla de tipos de cambio.
+
+    Returns:
+    tuple: Número de filas, id máximo y fecha máxima.
+    """
+    stats = ExchangeRate.objects.aggregate(count=Count('id'), max_id=Max('id'), max_date=Max('date'))
+    return stats['count'], stats['max_id'], stats['max_date']
+
+
+def build_rate_index():
+    rates = ExchangeRate.objects.annotate(rate_value=Cast('rate', FloatField())).values_list(
+        *RATE_COLUMNS[:-1], 'rate_value'
+    )
+    return RateIndex(pd.DataFrame(list(rates.iterator()), columns=RATE_COLUMNS))
+
+
+_lock = threading.Lock()
+_index = None
+_version = None
+
+
+def get_rate_index(version=None):
+    """
+    Devuelve el índice compartido del proceso, construyéndolo la primera vez y reconstruyéndolo
+    cuando cambia la versión de la tabla de tipos de cambio.
+
+    Quien modifique tipos de cambio existentes sin añadir filas debe llamar a invalidate().
+
+    Args:
+    version (tuple, optional): Versión de la tabla ya consultada con rate_version().
+
+    Returns:
+    RateIndex: Índice de tipos de cambio.
+    """
+    global _index, _version
+    version = version or rate_version()
+    with _lock:
+        if _index is None or version != _version:
+            _index, _version = build_rate_index(), version
+        return _index
+
+
+def invalidate():
+    global _index, _version
+    with _lock:
+        _index, _version = None, None
@@ -0,0 +1,153 @@
+# segment_analysis.py
+import json
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scripts import performance_analysis
+
+# Columnas por las que se puede partir el conjunto de análisis
+SEGMENT_COLUMNS = {
+    'exchange_house': 'currency_exchange_house__name',
+    'process_type': 'process_type__name',
+}
+# Columnas que necesitan los KPIs, las correlaciones y las tendencias de cada segmento
+PARTITION_COLUMNS = [
+    'date', 'amount', 'exchange_rate__rate', 'efficiency_improvement', 'cost_reduction', 'processing_time_reduction'
+]
+
+
+def write_partitions(data, segment_columns, directory):
+    """
+    Escribe cada segmento en su propio directorio, una columna por fichero .npy.
+
+    Los trabajadores abren los ficheros con memory mapping, de modo que los DataFrames no se
+    serializan con pickle al enviarlos a otro proceso.
+
+    Args:
+    data (pd.DataFrame): DataFrame de análisis.
+    segment_columns (list): Columnas que definen el segmento.
+    directory (str): Directorio donde se crean las particiones.
+
+    Returns:
+    list: Tareas con la clave del segmento y el directorio de su partición.
+    """
+    tasks = []
+    for index, (key, rows) in enumerate(data.groupby(segment_columns, observed=True, sort=True)):
+        path = os.path.join(directory, f"part-{index:05d}")
+        os.makedirs(path)
+        for column in PARTITION_COLUMNS:
+            values = rows[column]
+            if column == 'date':
+                # Resolución en segundos, que pandas admite sin convertir, para poder envolver el mapa sin copiarlo
+                values = pd.to_datetime(values).to_numpy(dtype='datetime64[s]')
+            else:
+                values = values.to_numpy(dtype=np.float64)
+            np.save(os.path.join(path, f"{column}.npy"), values)
+        with open(os.path.join(path, 'segment.json'), 'w') as segment_file:
+            json.dump({'key': [str(value) for value in key]}, segment_file)
+        tasks.append(path)
+    return tasks
+
+
+def read_partition(path):
+    """
+    Abre una partición escrita por write_partitions.
+
+    Args:
+    path (str): Directorio de la partición.
+
+    Returns:
+    tuple: Clave del segmento y DataFrame con las columnas de PARTITION_COLUMNS, cuyas columnas
+        son vistas de solo lectura de los ficheros mapeados en memoria.
+    """
+    with open(os.path.join(path, 'segment.json')) as segment_file:
+        key = tuple(json.load(segment_file)['key'])
+    # copy=False deja una columna por bloque sobre el propio mapa en lugar de consolidarlas en una copia
+    data = pd.DataFrame({
+        column: np.load(os.path.join(path, f"{column}.npy"), mmap_mode='r') for column in PARTITION_COLUMNS
+    }, copy=False)
+    return key, data
+
+
+def analyze_partition(path):
+    """
+    Ejecuta los KPIs, las correlaciones y las tendencias de un segmento en un proceso trabajador.
+
+    Args:
+    path (str): Directorio de la partición.
+
+    Returns:
+    dict: Clave del segmento, número de transacciones y resultados del análisis.
+    """
+    started = time.perf_counter()
+    key, data = read_partition(path)
+    # Con menos de dos días no hay pendiente que ajustar
+    if data['date'].nunique() > 1:
+        trends = performance_analysis.analyze_trends(data)
+    else:
+        trends = {'volumen_tendencia': np.nan, 'tasa_cambio_tendencia': np.nan}
+    return {
+        'segmento': key,
+        'transacciones': len(data),
+        'kpis': performance_analysis.calculate_kpis(data),
+        'correlaciones': performance_analysis.analyze_correlations(data),
+        'tendencias': trends,
+        'seconds': time.perf_counter() - started,
+    }
+
+
+def analyze_segments(by=('exchange_house', 'process_type'), workers=None, data=None):
+    """
+    Analiza cada segmento del conjunto de datos en paralelo con un proceso por segmento.
+
+    Args:
+    by (tuple): Segmentaciones a combinar: 'exchange_house' y/o 'process_type'.
+    workers (int, optional): Número de procesos trabajadores; por defecto, uno por CPU.
+    data (pd.DataFrame, optional): DataFrame de análisis; por defecto el de performance_analysis.load_data.
+
+    Returns:
+    dict: Resultados por segmento, tabla resumen con KPIs y tendencias por segmento, y tiempos.
+    """
+    started = time.perf_counter()
+    segment_columns = [SEGMENT_COLUMNS[name] for name in by]
+    if data is None:
+        data = performance_analysis.load_data()
+    directory = tempfile.mkdtemp(prefix='segments-')
+    try:
+        tasks = write_partitions(data, segment_columns, directory)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(analyze_partition, tasks))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    summary = pd.DataFrame(
+        [{'transacciones': result['transacciones'], **result['kpis'], **result['tendencias']} for result in results],
+        index=pd.MultiIndex.from_tuples([result['segmento'] for result in results], names=segment_columns)
+    )
+    return {
+        'segmentos': {result['segmento']: result for result in results},
+        'resumen': summary,
+        'seconds': time.perf_counter() - started,
+    }
+
+
+def print_segment_results(results):
+    """
+    Imprime la tabla resumen del análisis por segmento.
+
+    Args:
+    results (dict): Resultados de analyze_segments.
+    """
+    print("Análisis de Desempeño por Segmento")
+    print("==================================")
+    print(results['resumen'].to_string(float_format=lambda value: f"{value:,.2f}"))
+    print(f"\n{len(results['segmentos'])} segmentos analizados en {results['seconds']:.2f}s")
+
+
+if __name__ == "__main__":
+    print_segment_results(analyze_segments())
@@ -0,0 +1,229 @@
+# sketches.py
+import base64
+
+import numpy as np
+import pandas as pd
+
+# Resúmenes aproximados de tamaño acotado para el modo aproximado de performance_analysis.
+# Todos se combinan con merge() (lotes del ETL o shards) y se serializan a JSON con to_dict().
+
+# Semilla de los generadores que se crean cuando no se pasa uno, para que el resultado de
+# muestrear y combinar los mismos lotes sea siempre el mismo
+SEED = 0
+
+
+def _to_json_list(values):
+    return [None if np.isnan(value) else float(value) for value in np.asarray(values, dtype=np.float64).ravel()]
+
+
+def _from_json_list(values):
+    return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+
+def _rng(rng, *keys):
+    # Sin generador explícito se deriva uno determinista de los tamaños de las entradas
+    return rng if rng is not None else np.random.default_rng([SEED, *(int(key) for key in keys)])
+
+
+class ReservoirSample:
+    """
+    Muestra aleatoria uniforme de tamaño fijo de las filas vistas (muestreo de reservorio).
+
+    Dos muestras se combinan eligiendo cuántas filas tomar de cada una con una distribución
+    hipergeométrica, de modo que el resultado es una muestra uniforme de la unión.
+    """
+
+    def __init__(self, columns, capacity=5000, rows=None, seen=0):
+        self.columns = list(columns)
+        self.capacity = capacity
+        self.rows = np.empty((0, len(self.columns))) if rows is None else np.asarray(rows, dtype=np.float64)
+        self.seen = int(seen)
+
+    @classmethod
+    def from_frame(cls, df, columns, capacity=5000, rng=None):
+        rng = _rng(rng, len(df))
+        rows = df[columns].to_numpy(dtype=np.float64)
+        if len(rows) > capacity:
+            rows = rows[rng.choice(len(rows), capacity, replace=False)]
+        return cls(columns, capacity, rows, len(df))
+
+    def merge(self, other, rng=None):
+        rng = _rng(rng, self.seen, other.seen)
+        size = min(self.capacity, len(self.rows) + len(other.rows))
+        if not self.seen or not other.seen:
+            rows = self.rows if other.seen == 0 else other.rows
+        else:
+            from_self = rng.hypergeometric(self.seen, other.seen, size)
+            rows = np.concatenate([
+                self.rows[rng.choice(len(self.rows), from_self, replace=False)],
+                other.rows[rng.choice(len(other.rows), size - from_self, replace=False)],
+            ])
+        return ReservoirSample(self.columns, self.capacity, rows, self.seen + other.seen)
+
+    def to_frame(self):
+        return pd.DataFrame(self.rows, columns=self.columns)
+
+    def to_dict(self):
+        return {'columns': self.columns, 'capacity': self.capacity, 'seen': self.seen, 'rows': _to_json_list(self.rows)}
+
+    @classmethod
+    def from_dict(cls, data):
+        rows = _from_json_list(data['rows']).reshape(-1, len(data['columns']))
+        return cls(data['columns'], data['capacity'], rows, data['seen'])
+
+
+class QuantileSketch:
+    """
+    Sketch de cuantiles de tipo KLL: niveles de compactadores en los que cada elemento del nivel h
+    representa 2**h valores. El error de rango es aproximadamente rank_error() con alta probabilidad.
+    """
+
+    def __init__(self, k=200, levels=None, count=0, minimum=np.inf, maximum=-np.inf):
+        self.k = k
+        self.levels = [np.asarray(level, dtype=np.float64) for level in levels] if levels else [np.empty(0)]
+        self.count = int(count)
+        self.minimum = float(minimum)
+        self.maximum = float(maximum)
+
+    @classmethod
+    def from_values(cls, values, k=200, rng=None):
+        sketch = cls(k)
+        sketch.update(values, rng)
+        return sketch
+
+    def _capacity(self, level):
+        return max(2, int(np.ceil(self.k * (2 / 3) ** (len(self.levels) - 1 - level))))
+
+    def _compress(self, rng):
+        level = 0
+        while level < len(self.levels):
+            if len(self.levels[level]) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(self.levels[level])
+                leftover = len(items) % 2
+                # Se conserva uno de cada dos elementos, empezando al azar, con el doble de peso
+                promoted = items[leftover:][rng.integers(2)::2]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                self.levels[level] = items[:leftover]
+            level += 1
+
+    def update(self, values, rng=None):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[np.isfinite(values)]
+        if not len(values):
+            return
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        rng = _rng(rng, self.count, len(values))
+        self.count += len(values)
+        self.minimum = min(self.minimum, values.min())
+        self.maximum = max(self.maximum, values.max())
+        self._compress(rng)
+
+    def merge(self, other, rng=None):
+        levels = [
+            np.concatenate([
+                self.levels[level] if level < len(self.levels) else np.empty(0),
+                other.levels[level] if level < len(other.levels) else np.empty(0),
+            ])
+            for level in range(max(len(self.levels), len(other.levels)))
+        ]
+        merged = QuantileSketch(
+            self.k, levels, self.count + other.count, min(self.minimum, other.minimum), max(self.maximum, other.maximum)
+        )
+        merged._compress(_rng(rng, self.count, other.count))
+        return merged
+
+    def rank_error(self):
+        # Error de rango normalizado de KLL con ~99% de confianza (constantes de Apache DataSketches)
+        return 2.296 / self.k ** 0.9723
+
+    def quantiles(self, probabilities):
+        """
+        Estima cuantiles del flujo.
+
+        Args:
+        probabilities (list): Probabilidades entre 0 y 1.
+
+        Returns:
+        np.ndarray: Valor estimado para cada probabilidad.
+        """
+        probabilities = np.asarray(probabilities, dtype=np.float64)
+        if not self.count:
+            return np.full(probabilities.shape, np.nan)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** height) for height, level in enumerate(self.levels)])
+        order = np.argsort(items)
+        items, cumulative = items[order], np.cumsum(weights[order])
+        ranks = np.clip(probabilities, 0, 1) * cumulative[-1]
+        values = items[np.minimum(np.searchsorted(cumulative, ranks, side='left'), len(items) - 1)]
+        values[probabilities <= 0] = self.minimum
+        values[probabilities >= 1] = self.maximum
+        return values
+
+    def to_dict(self):
+        return {
+            'k': self.k,
+            'levels': [level.tolist() for level in self.levels],
+            'count': self.count,
+            'minimum': self.minimum if self.count else None,
+            'maximum': self.maximum if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if not data['count']:
+            return cls(data['k'])
+        return cls(data['k'], data['levels'], data['count'], data['minimum'], data['maximum'])
+
+
+class HyperLogLog:
+    """
+    Contador aproximado de valores distintos con 2**precision registros; error relativo ≈ 1.04 / sqrt(2**precision).
+    """
+
+    def __init__(self, precision=12, registers=None):
+        self.precision = precision
+        size = 1 << precision
+        self.registers = np.zeros(size, dtype=np.uint8) if registers is None else np.asarray(registers, dtype=np.uint8)
+
+    @classmethod
+    def from_values(cls, values, precision=12):
+        sketch = cls(precision)
+        sketch.update(values)
+        return sketch
+
+    def update(self, values):
+        values = pd.Series(values).dropna()
+        if values.empty:
+            return
+        hashes = pd.util.hash_array(values.astype(str).to_numpy(dtype=object))
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        remaining = hashes & np.uint64((1 << (64 - self.precision)) - 1)
+        # Posición del primer bit a 1 en los 64 - precision bits restantes
+        bit_length = np.searchsorted(2 ** np.arange(64, dtype=np.float64), remaining.astype(np.float64), side='right')
+        rank = (64 - self.precision - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other):
+        return HyperLogLog(self.precision, np.maximum(self.registers, other.registers))
+
+    def relative_error(self):
+        return 1.04 / np.sqrt(len(self.registers))
+
+    def estimate(self):
+        size = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size ** 2 / np.sum(2.0 ** -self.registers.astype(np.float64))
+        zeros = np.count_nonzero(self.registers == 0)
+        if estimate <= 2.5 * size and zeros:
+            # Corrección de rango pequeño (conteo lineal)
+            estimate = size * np.log(size / zeros)
+        return float(estimate)
+
+    def to_dict(self):
+        return {'precision': self.precision, 'registers': base64.b64encode(self.registers.tobytes()).decode('ascii')}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['precision'], np.frombuffer(base64.b64decode(data['registers']), dtype=np.uint8).copy())
@@ -0,0 +1,251 @@
+# snapshot.py
+import json
+import os
+import shutil
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from analyzer.models import LogisticProcess, Optimization
+
+# Instantánea columnar que escribe el ETL y que leen los scripts de análisis y visualización.
+# Cada columna es un fichero .npy que se abre con memory mapping; las transacciones se
+# particionan por mes (transactions/date=YYYY-MM/part-<primer id>/<columna>.npy).
+META_FILE = '_meta.json'
+
+TRANSACTIONS_TABLE = 'transactions'
+PROCESSES_TABLE = 'processes'
+OPTIMIZATIONS_TABLE = 'optimizations'
+
+TRANSACTION_COLUMNS = (
+    'id', 'logistic_process_id', 'date', 'from_currency__code', 'to_currency__code', 'amount', 'exchange_rate__rate'
+)
+PROCESS_COLUMNS = ('id', 'currency_exchange_house__name', 'process_type__name', 'start_date', 'end_date', 'status')
+OPTIMIZATION_COLUMNS = (
+    'logistic_process_id', 'efficiency_improvement', 'cost_reduction', 'processing_time_reduction', 'implementation_date'
+)
+
+# Columnas de texto que se guardan como códigos enteros con su diccionario en _meta.json
+CATEGORICAL_COLUMNS = (
+    'from_currency__code', 'to_currency__code', 'currency_exchange_house__name', 'process_type__name', 'status'
+)
+DATE_COLUMNS = ('date', 'start_date', 'end_date', 'implementation_date')
+INTEGER_COLUMNS = ('id', 'logistic_process_id')
+
+
+def snapshot_dir():
+    # Se lee en cada llamada para que override_settings (pruebas, benchmark) redirija la instantánea
+    return getattr(settings, 'ANALYTICS_SNAPSHOT_DIR', os.path.join(settings.BASE_DIR, 'data', 'snapshot'))
+
+
+def snapshot_exists(path=None):
+    return os.path.exists(os.path.join(path or snapshot_dir(), META_FILE))
+
+
+def read_meta(path=None):
+    path = path or snapshot_dir()
+    if not snapshot_exists(path):
+        return {'categories': {}}
+    with open(os.path.join(path, META_FILE)) as meta_file:
+        return json.load(meta_file)
+
+
+def write_meta(meta, path=None):
+    path = path or snapshot_dir()
+    os.makedirs(path, exist_ok=True)
+    # La versión identifica el contenido publicado; la usa la caché de scripts/dataset.py
+    meta['version'] = time.time_ns()
+    tmp = os.path.join(path, f"{META_FILE}.tmp-{uuid.uuid4().hex}")
+    with open(tmp, 'w') as meta_file:
+        json.dump(meta, meta_file)
+    os.replace(tmp, os.path.join(path, META_FILE))
+
+
+def _encode(series, column, categories):
+    if column in CATEGORICAL_COLUMNS:
+        known = categories.setdefault(column, [])
+        codes = {value: code for code, value in enumerate(known)}
+        for value in pd.unique(series.dropna()):
+            if value not in codes:
+                codes[value] = len(known)
+                known.append(value)
+        return series.astype(object).map(codes).fillna(-1).to_numpy(dtype=np.int32)
+    if column in DATE_COLUMNS:
+        return pd.to_datetime(series, errors='coerce').to_numpy(dtype='datetime64[D]')
+    if column in INTEGER_COLUMNS:
+        return pd.to_numeric(series, errors='coerce').to_numpy(dtype=np.int64)
+    return pd.to_numeric(series, errors='coerce').to_numpy(dtype=np.float64)
+
+
+def _decode(values, column, categories):
+    if column in categories:
+        return pd.Categorical.from_codes(values, categories=categories[column])
+    return values
+
+
+def _swap_directory(tmp, directory):
+    # Sustituye el directorio de forma que los lectores nunca vean una tabla a medio escribir
+    if os.path.exists(directory):
+        old = f"{directory}.old-{uuid.uuid4().hex}"
+        os.rename(directory, old)
+        os.rename(tmp, directory)
+        shutil.rmtree(old)
+    else:
+        os.rename(tmp, directory)
+
+
+def _write_columns(directory, df, categories):
+    tmp = f"{directory}.tmp-{uuid.uuid4().hex}"
+    os.makedirs(tmp)
+    for column in df.columns:
+        np.save(os.path.join(tmp, f"{column}.npy"), _encode(df[column], column, categories))
+    return tmp
+
+
+def _read_columns(directory, columns):
+    return {column: np.load(os.path.join(directory, f"{column}.npy"), mmap_mode='r') for column in columns}
+
+
+def _list_parts(path=None, start_date=None, end_date=None):
+    table_dir = os.path.join(path or snapshot_dir(), TRANSACTIONS_TABLE)
+    if not os.path.isdir(table_dir):
+        return []
+    start_month = pd.Timestamp(start_date).strftime('%Y-%m') if start_date is not None else None
+    end_month = pd.Timestamp(end_date).strftime('%Y-%m') if end_date is not None else None
+    parts = []
+    for partition in sorted(os.listdir(table_dir)):
+        if not partition.startswith('date=') or '.' in partition:
+            continue
+        month = partition[len('date='):]
+        if (start_month and month < start_month) or (end_month and month > end_month):
+            continue
+        partition_dir = os.path.join(table_dir, partition)
+        parts.extend(
+            os.path.join(partition_dir, part) for part in sorted(os.listdir(partition_dir)) if '.' not in part
+        )
+    return parts
+
+
+def append_transactions(df_transactions, path=None):
+    """
+    Añade un lote de transacciones a la instantánea, con una parte nueva por cada mes del lote.
+
+    Args:
+    df_transactions (pd.DataFrame): Transacciones con las columnas de TRANSACTION_COLUMNS.
+    path (str, optional): Directorio de la instantánea; por defecto, el configurado.
+
+    Returns:
+    list: Directorios de las partes escritas.
+    """
+    if df_transactions.empty:
+        return []
+    path = path or snapshot_dir()
+    df = df_transactions[list(TRANSACTION_COLUMNS)]
+    months = pd.to_datetime(df['date'], errors='coerce').dt.strftime('%Y-%m')
+
+    # El diccionario de categorías se publica antes que las partes que lo usan
+    meta = read_meta(path)
+    for column in CATEGORICAL_COLUMNS:
+        if column in df:
+            _encode(df[column], column, meta['categories'])
+    write_meta(meta, path)
+
+    parts = []
+    try:
+        for month, rows in df.groupby(months, sort=True):
+            partition_dir = os.path.join(path, TRANSACTIONS_TABLE, f"date={month}")
+            os.makedirs(partition_dir, exist_ok=True)
+            part_dir = os.path.join(partition_dir, f"part-{int(rows['id'].min()):012d}")
+            _swap_directory(_write_columns(part_dir, rows, meta['categories']), part_dir)
+            parts.append(part_dir)
+    except Exception:
+        # Un lote a medio escribir no debe quedar publicado
+        discard_parts(parts)
+        raise
+
+    # Nueva versión una vez publicadas todas las partes
+    write_meta(meta, path)
+    return parts
+
+
+def discard_parts(parts):
+    for part_dir in parts:
+        shutil.rmtree(part_dir, ignore_errors=True)
+
+
+def write_dimensions(path=None):
+    """
+    Reescribe las tablas de procesos y optimizaciones de la instantánea desde la base de datos.
+
+    Args:
+    path (str, optional): Directorio de la instantánea; por defecto, el configurado.
+    """
+    path = path or snapshot_dir()
+    tables = {
+        PROCESSES_TABLE: pd.DataFrame(
+            list(LogisticProcess.objects.values(*PROCESS_COLUMNS)), columns=list(PROCESS_COLUMNS)
+        ),
+        OPTIMIZATIONS_TABLE: pd.DataFrame(
+            list(Optimization.objects.values(*OPTIMIZATION_COLUMNS)), columns=list(OPTIMIZATION_COLUMNS)
+        ),
+    }
+    meta = read_meta(path)
+    pending = {name: _write_columns(os.path.join(path, name), df, meta['categories']) for name, df in tables.items()}
+    write_meta(meta, path)
+    for name, tmp in pending.items():
+        _swap_directory(tmp, os.path.join(path, name))
+    write_meta(meta, path)
+
+
+def reset_snapshot(path=None):
+    path = path or snapshot_dir()
+    if os.path.exists(path):
+        shutil.rmtree(path)
+
+
+def read_table(name, columns=None, start_date=None, end_date=None, path=None):
+    """
+    Lee una tabla de la instantánea leyendo solo las columnas pedidas.
+
+    Args:
+    name (str): Tabla a leer (transactions, processes u optimizations).
+    columns (list, optional): Columnas a leer; por defecto todas.
+    start_date (date, optional): Para transacciones, fecha mínima incluida.
+    end_date (date, optional): Para transacciones, fecha máxima incluida.
+    path (str, optional): Directorio de la instantánea; por defecto, el configurado.
+
+    Returns:
+    pd.DataFrame: Tabla con las columnas de texto como categorías y las fechas como datetime64.
+    """
+    default_columns = {
+        TRANSACTIONS_TABLE: TRANSACTION_COLUMNS,
+        PROCESSES_TABLE: PROCESS_COLUMNS,
+        OPTIMIZATIONS_TABLE: OPTIMIZATION_COLUMNS,
+    }[name]
+    columns = list(columns or default_columns)
+    path = path or snapshot_dir()
+
+    if name == TRANSACTIONS_TABLE:
+        # Se listan las partes antes de leer el diccionario, que siempre se publica primero
+        parts = _list_parts(path, start_date, end_date)
+        if not parts:
+            return pd.DataFrame(columns=columns)
+        read_columns = columns if 'date' in columns or (start_date is None and end_date is None) else columns + ['date']
+        arrays = [_read_columns(part_dir, read_columns) for part_dir in parts]
+        data = {column: np.concatenate([part[column] for part in arrays]) for column in read_columns}
+    else:
+        read_columns = columns
+        data = _read_columns(os.path.join(path, name), columns)
+
+    categories = read_meta(path)['categories']
+    df = pd.DataFrame({column: _decode(np.asarray(values), column, categories) for column, values in data.items()})
+    if name == TRANSACTIONS_TABLE and (start_date is not None or end_date is not None):
+        mask = np.ones(len(df), dtype=bool)
+        if start_date is not None:
+            mask &= df['date'] >= pd.Timestamp(start_date)
+        if end_date is not None:
+            mask &= df['date'] <= pd.Timestamp(end_date)
+        df = df.loc[mask, columns].reset_index(drop=True)
+    return df
@@ -0,0 +1,212 @@
+# solver.py
+import numpy as np
+from scipy.optimize import linprog, minimize
+
+# Capa de resolución de los modelos de asignación de recursos. Los modelos cuyo objetivo y
+# restricciones son afines se resuelven de forma analítica (una variable) o con programación
+# lineal (HiGHS); solo los modelos no lineales pasan por el método iterativo SLSQP.
+
+
+class LinearFunction:
+    """
+    Función afín coefficients · x + constant.
+
+    Se puede llamar como cualquier función de x, de modo que sirve igual para SLSQP, y permite
+    a maximize reconocer que el modelo es lineal.
+    """
+
+    def __init__(self, coefficients, constant=0.0):
+        self.coefficients = np.atleast_1d(np.asarray(coefficients, dtype=np.float64))
+        self.constant = float(constant)
+
+    def __call__(self, x):
+        return float(self.coefficients @ np.atleast_1d(np.asarray(x, dtype=np.float64))) + self.constant
+
+
+class Solution:
+    """
+    Resultado de maximize: punto óptimo, valor del objetivo y método con el que se resolvió.
+    Los métodos que admiten arranque en caliente guardan en order el estado a reutilizar.
+    """
+
+    def __init__(self, x, value, method, order=None):
+        self.x = np.atleast_1d(np.asarray(x, dtype=np.float64))
+        self.value = float(value)
+        self.method = method
+        self.order = order
+
+
+def is_linear(objective, constraints):
+    return isinstance(objective, LinearFunction) and all(isinstance(c, LinearFunction) for c in constraints)
+
+
+def _normalize_bounds(bounds, size):
+    bounds = bounds or [(None, None)] * size
+    return [
+        (-np.inf if lower is None else float(lower), np.inf if upper is None else float(upper))
+        for lower, upper in bounds
+    ]
+
+
+def maximize_scalar_linear(objective, constraints, bounds):
+    """
+    Maximiza c·x con una sola variable y restricciones a·x + k >= 0 de forma analítica.
+
+    Args:
+    objective (LinearFunction): Objetivo.
+    constraints (list): Restricciones LinearFunction, cada una >= 0.
+    bounds (list): Límites [(inferior, superior)] de la variable.
+
+    Returns:
+    Solution: Solución óptima.
+    """
+    (lower, upper), = _normalize_bounds(bounds, 1)
+    for constraint in constraints:
+        a, k = constraint.coefficients[0], constraint.constant
+        if a > 0:
+            lower = max(lower, -k / a)
+        elif a < 0:
+            upper = min(upper, k / -a)
+        elif k < 0:
+            raise ValueError("The optimization problem is infeasible.")
+    if lower > upper:
+        raise ValueError("The optimization problem is infeasible.")
+
+    c = objective.coefficients[0]
+    if c == 0:
+        # Con pendiente nula cualquier punto factible es óptimo; se toma el menor finito
+        x = lower if np.isfinite(lower) else upper if np.isfinite(upper) else 0.0
+    else:
+        x = upper if c > 0 else lower
+    if not np.isfinite(x):
+        raise ValueError("The optimization problem is unbounded.")
+    return Solution([x], objective([x]), 'closed_form')
+
+
+def maximize_budgeted(value_per_unit, cost_per_unit, budget):
+    """
+    Resuelve en bloque muchos modelos de una variable: maximizar value_per_unit·x sujeto a
+    cost_per_unit·x <= budget y x >= 0. Es la forma cerrada de maximize_scalar_linear aplicada
+    elemento a elemento (los argumentos se combinan con broadcasting de NumPy).
+
+    Args:
+    value_per_unit (np.ndarray): Coeficiente del objetivo de cada modelo.
+    cost_per_unit (np.ndarray): Coste por unidad asignada de cada modelo (positivo).
+    budget (np.ndarray): Presupuesto de cada modelo.
+
+    Returns:
+    tuple: Asignación óptima y valor del objetivo de cada modelo.
+    """
+    value_per_unit, cost_per_unit, budget = np.broadcast_arrays(
+        np.asarray(value_per_unit, dtype=np.float64),
+        np.asarray(cost_per_unit, dtype=np.float64),
+        np.asarray(budget, dtype=np.float64),
+    )
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = np.where(value_per_unit > 0, budget / cost_per_unit, 0.0)
+    # Sin coste positivo el modelo no está acotado y sin presupuesto no es factible
+    x[(cost_per_unit <= 0) & (value_per_unit > 0)] = np.nan
+    x[budget < 0] = np.nan
+    return x, value_per_unit * x
+
+
+def maximize_knapsack(value_per_unit, cost_per_unit, budget, caps=None, order=None):
+    """
+    Reparte un presupuesto entre N variables: maximizar value_per_unit·x sujeto a
+    cost_per_unit·x <= budget y 0 <= x <= caps.
+
+    Es un programa lineal de mochila fraccionaria cuyo óptimo se obtiene llenando las variables por
+    orden de valor por unidad de coste; el reparto se calcula en bloque con una suma acumulada. Si
+    se pasa el orden de una solución anterior y sigue siendo válido (los datos han cambiado poco),
+    se reutiliza sin volver a ordenar.
+
+    Args:
+    value_per_unit (np.ndarray): Valor del objetivo por unidad de cada variable.
+    cost_per_unit (np.ndarray): Coste por unidad de cada variable.
+    budget (float): Presupuesto total.
+    caps (np.ndarray, optional): Máximo de cada variable; por defecto, sin límite.
+    order (np.ndarray, optional): Orden de llenado de una solución anterior (Solution.order).
+
+    Returns:
+    Solution: Reparto óptimo; method es 'greedy' o 'greedy_warm' si se reutilizó el orden.
+    """
+    value_per_unit = np.asarray(value_per_unit, dtype=np.float64)
+    cost_per_unit = np.asarray(cost_per_unit, dtype=np.float64)
+    caps = np.full(len(value_per_unit), np.inf) if caps is None else np.asarray(caps, dtype=np.float64)
+    if budget < 0 or (caps < 0).any():
+        raise ValueError("The optimization problem is infeasible.")
+    if ((cost_per_unit <= 0) & (value_per_unit > 0) & np.isinf(caps)).any():
+        raise ValueError("The optimization problem is unbounded.")
+
+    # Las variables gratuitas se llenan primero; las que no aportan valor no se llenan
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(cost_per_unit > 0, value_per_unit / cost_per_unit, np.inf)
+    ratio[value_per_unit <= 0] = -np.inf
+
+    method = 'greedy'
+    if order is not None and len(order) == len(ratio) and (np.diff(ratio[order]) <= 0).all():
+        method = 'greedy_warm'
+    else:
+        order = np.argsort(-ratio, kind='stable')
+
+    useful = ratio[order] > -np.inf
+    cost_caps = np.where(useful, caps[order] * np.maximum(cost_per_unit[order], 0), 0.0)
+    spent_before = np.concatenate([[0.0], np.cumsum(cost_caps)[:-1]])
+    spend = np.minimum(cost_caps, np.clip(budget - spent_before, 0, None))
+    x = np.zeros(len(ratio))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x[order] = np.where(cost_per_unit[order] > 0, spend / cost_per_unit[order], np.where(useful, caps[order], 0.0))
+    return Solution(x, value_per_unit @ x, method, order)
+
+
+def maximize_linear(objective, constraints, bounds=None):
+    """
+    Maximiza un objetivo afín sujeto a restricciones afines >= 0.
+
+    Args:
+    objective (LinearFunction): Objetivo.
+    constraints (list): Restricciones LinearFunction, cada una >= 0.
+    bounds (list, optional): Límites [(inferior, superior)] por variable; None significa sin límite.
+
+    Returns:
+    Solution: Solución óptima.
+    """
+    size = len(objective.coefficients)
+    if size == 1:
+        return maximize_scalar_linear(objective, constraints, bounds)
+
+    # a·x + k >= 0  <=>  -a·x <= k
+    a_ub = -np.array([c.coefficients for c in constraints]) if constraints else None
+    b_ub = np.array([c.constant for c in constraints]) if constraints else None
+    result = linprog(-objective.coefficients, A_ub=a_ub, b_ub=b_ub, bounds=bounds or [(None, None)] * size,
+                     method='highs')
+    if result.status == 2:
+        raise ValueError("The optimization problem is infeasible.")
+    if result.status == 3:
+        raise ValueError("The optimization problem is unbounded.")
+    if not result.success:
+        raise ValueError(f"The optimization failed: {result.message}")
+    return Solution(result.x, objective(result.x), 'highs')
+
+
+def maximize(objective, constraints, x0, bounds=None):
+    """
+    Maximiza un objetivo sujeto a restricciones de desigualdad >= 0, con el método más directo posible.
+
+    Args:
+    objective (callable): Función a maximizar; LinearFunction si es afín.
+    constraints (list): Funciones g con g(x) >= 0; LinearFunction si son afines.
+    x0 (list): Punto inicial, usado solo por SLSQP.
+    bounds (list, optional): Límites [(inferior, superior)] por variable.
+
+    Returns:
+    Solution: Solución óptima.
+    """
+    if is_linear(objective, constraints):
+        return maximize_linear(objective, constraints, bounds)
+
+    result = minimize(
+        lambda x: -objective(x), x0, method='SLSQP', bounds=bounds,
+        constraints=[{'type': 'ineq', 'fun': constraint} for constraint in constraints]
+    )
+    return Solution(result.x, -result.fun, 'slsqp')
@@ -0,0 +1,203 @@
+# trend_analysis.py
+import numpy as np
+import pandas as pd
+from django.db.models import Count, FloatField, Sum
+from django.db.models.functions import Cast
+from analyzer.models import DailyTransactionRollup, Transaction
+
+# Segmentaciones para las que se calculan tendencias; cada una agrupa por sus columnas
+SEGMENTS = {
+    'process_type': ['process_type__name'],
+    'currency_pair': ['from_currency__code', 'to_currency__code'],
+    'exchange_house': ['currency_exchange_house__name'],
+}
+TREND_WINDOWS = (7, 30, 90)
+
+# Columnas de los agregados diarios equivalentes a las del DataFrame de análisis
+ROLLUP_COLUMNS = {
+    'logistic_process__process_type__name': 'process_type__name',
+    'logistic_process__currency_exchange_house__name': 'currency_exchange_house__name',
+    'from_currency__code': 'from_currency__code',
+    'to_currency__code': 'to_currency__code',
+}
+
+
+def daily_segment_totals(data=None, backend='rollups'):
+    """
+    Obtiene volumen, número de transacciones y suma de tasas por día y por todas las columnas de segmento.
+
+    Args:
+    data (pd.DataFrame, optional): DataFrame de análisis. Si no se indica, se agrega en la base de datos.
+    backend (str): Sin data, 'rollups' lee los agregados diarios del ETL y 'database' agrega las transacciones.
+
+    Returns:
+    pd.DataFrame: Una fila por combinación de segmentos y fecha.
+    """
+    columns = list(ROLLUP_COLUMNS.values())
+    if data is None:
+        if backend == 'database':
+            rows = Transaction.objects.values(*ROLLUP_COLUMNS, 'date').annotate(
+                volume=Sum(Cast('amount', FloatField())), transaction_count=Count('exchange_rate__rate'),
+                rate_sum=Sum(Cast('exchange_rate__rate', FloatField()))
+            )
+        else:
+            rows = DailyTransactionRollup.objects.values(*ROLLUP_COLUMNS, 'date').annotate(
+                volume=Sum('volume'), transaction_count=Sum('transaction_count'), rate_sum=Sum('rate_sum')
+            )
+        totals = pd.DataFrame(list(rows), columns=list(ROLLUP_COLUMNS) + ['date', 'volume', 'transaction_count', 'rate_sum'])
+        totals = totals.rename(columns=ROLLUP_COLUMNS)
+    else:
+        totals = data.assign(
+            transaction_count=data['exchange_rate__rate'].notna().astype(np.int64),
+            rate_sum=data['exchange_rate__rate'].fillna(0)
+        ).groupby(columns + ['date'], observed=True).agg(
+            volume=('amount', 'sum'), transaction_count=('transaction_count', 'sum'), rate_sum=('rate_sum', 'sum')
+        ).reset_index()
+        # Los segmentos se ordenan por nombre, igual que los leídos de la base de datos
+        totals[columns] = totals[columns].astype(str)
+    totals['date'] = pd.to_datetime(totals['date'])
+    return totals
+
+
+def segment_matrices(totals, segment_columns):
+    """
+    Convierte los totales diarios en matrices segmentos × días naturales.
+
+    Args:
+    totals (pd.DataFrame): Totales de daily_segment_totals.
+    segment_columns (list): Columnas que definen el segmento.
+
+    Returns:
+    tuple: (matriz de volumen, matriz de tasa media, índice de segmentos, fechas). Los días sin
+        transacciones del segmento son NaN.
+    """
+    grouped = totals.groupby(segment_columns + ['date'], observed=True)[['volume', 'transaction_count', 'rate_sum']].sum()
+    dates = pd.date_range(totals['date'].min(), totals['date'].max(), freq='D') if len(totals) else pd.DatetimeIndex([])
+    volume = grouped['volume'].unstack('date').reindex(columns=dates)
+    count = grouped['transaction_count'].unstack('date').reindex(columns=dates)
+    rate_sum = grouped['rate_sum'].unstack('date').reindex(columns=dates)
+    rate = rate_sum.to_numpy(dtype=np.float64) / count.to_numpy(dtype=np.float64)
+    return volume.to_numpy(dtype=np.float64), rate, volume.index, dates
+
+
+def batch_trend_slopes(values):
+    """
+    Pendiente de mínimos cuadrados de cada fila de una matriz de series, en forma cerrada.
+
+    Equivale a np.polyfit(x, fila, 1)[0] por fila con x = 0, 1, 2, ..., ignorando los NaN.
+
+    Args:
+    values (np.ndarray): Matriz series × tiempo.
+
+    Returns:
+    np.ndarray: Pendiente por serie; NaN si tiene menos de dos puntos.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    present = ~np.isnan(values)
+    x = np.broadcast_to(np.arange(values.shape[1], dtype=np.float64), values.shape)
+    n = present.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_mean = np.where(present, x, 0).sum(axis=1) / n
+        y_mean = np.where(present, values, 0).sum(axis=1) / n
+        dx = np.where(present, x - x_mean[:, None], 0)
+        dy = np.where(present, values - y_mean[:, None], 0)
+        slopes = (dx * dy).sum(axis=1) / (dx ** 2).sum(axis=1)
+    slopes[n < 2] = np.nan
+    return slopes
+
+
+def rolling_trend_slopes(values, window, min_periods=2):
+    """
+    Pendiente de mínimos cuadrados de cada serie en todas las ventanas móviles de un tamaño.
+
+    Usa sumas acumuladas de n, x, y, x² y xy, de modo que el coste es O(series × tiempo) con
+    independencia del tamaño de la ventana.
+
+    Args:
+    values (np.ndarray): Matriz series × tiempo; los NaN no cuentan como observación.
+    window (int): Días de la ventana.
+    min_periods (int): Observaciones mínimas en la ventana para calcular la pendiente.
+
+    Returns:
+    np.ndarray: Matriz series × tiempo con la pendiente de la ventana que termina en cada día.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    present = ~np.isnan(values)
+    # Centrar x e y reduce la cancelación numérica de las sumas acumuladas
+    x = np.arange(values.shape[1], dtype=np.float64) - (values.shape[1] - 1) / 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        y = values - (np.where(present, values, 0).sum(axis=1) / present.sum(axis=1))[:, None]
+    y = np.where(present, y, 0)
+    xs = np.where(present, x, 0)
+
+    def window_sum(matrix):
+        cumulative = np.cumsum(np.pad(matrix, ((0, 0), (1, 0))), axis=1)
+        start = np.clip(np.arange(values.shape[1]) + 1 - window, 0, None)
+        return cumulative[:, 1:] - cumulative[:, start]
+
+    n = window_sum(present.astype(np.float64))
+    sx, sy = window_sum(xs), window_sum(y)
+    sxx, sxy = window_sum(xs * xs), window_sum(xs * y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slopes = (n * sxy - sx * sy) / (n * sxx - sx ** 2)
+    slopes[n < max(min_periods, 2)] = np.nan
+    return slopes
+
+
+def analyze_segment_trends(data=None, segments=None, windows=TREND_WINDOWS, backend='rollups'):
+    """
+    Calcula las tendencias de volumen y tasa de cambio por segmento, en todo el periodo y en ventanas móviles.
+
+    Las pendientes se expresan por día natural; los días sin transacciones de un segmento no
+    cuentan como observación.
+
+    Args:
+    data (pd.DataFrame, optional): DataFrame de análisis. Si no se indica, se leen los agregados diarios del ETL.
+    segments (dict, optional): Segmentaciones a calcular; por defecto SEGMENTS.
+    windows (tuple): Días de las ventanas móviles.
+    backend (str): Origen de los totales diarios cuando no se indica data (ver daily_segment_totals).
+
+    Returns:
+    dict: Para cada segmentación, 'tendencias' (pendientes de todo el periodo por segmento) y
+        'ventanas' (por tamaño de ventana, matrices segmento × fecha de volumen y tasa de cambio).
+    """
+    totals = daily_segment_totals(data, backend)
+    results = {}
+    for name, segment_columns in (segments or SEGMENTS).items():
+        volume, rate, index, dates = segment_matrices(totals, segment_columns)
+        results[name] = {
+            'tendencias': pd.DataFrame({
+                'volumen_tendencia': batch_trend_slopes(volume),
+                'tasa_cambio_tendencia': batch_trend_slopes(rate),
+            }, index=index),
+            'ventanas': {
+                window: {
+                    'volumen_tendencia': pd.DataFrame(rolling_trend_slopes(volume, window), index=index, columns=dates),
+                    'tasa_cambio_tendencia': pd.DataFrame(rolling_trend_slopes(rate, window), index=index, columns=dates),
+                }
+                for window in windows
+            },
+        }
+    return results
+
+
+def summarize_segment_trends(results):
+    """
+    Resume las tendencias por segmento en una tabla por segmentación: la pendiente de todo el
+    periodo y la de la última ventana de cada tamaño.
+
+    Args:
+    results (dict): Resultado de analyze_segment_trends.
+
+    Returns:
+    dict: Para cada segmentación, un DataFrame indexado por el nombre del segmento ('USD/EUR' en los pares).
+    """
+    summary = {}
+    for name, result in results.items():
+        table = result['tendencias'].copy()
+        for window, trends in result['ventanas'].items():
+            for trend, matrix in trends.items():
+                table[f"{trend}_{window}d"] = matrix.iloc[:, -1] if matrix.shape[1] else np.nan
+        table.index = ['/'.join(map(str, label)) if isinstance(label, tuple) else str(label) for label in table.index]
+        summary[name] = table
+    return summary
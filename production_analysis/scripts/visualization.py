@@ -3,30 +3,21 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 from analyzer.models import LogisticProcess, Transaction, Optimization
+from scripts import dataset
 
-def load_data():
+def load_data(use_snapshot=True, use_cache=True):
     """
-    Load logistic processes and transactions data from the database.
+    Load the merged logistic processes, transactions and optimizations data through the
+    shared dataset loader, which reads the ETL snapshot when present and caches the result.
+
+    Args:
+    use_snapshot (bool): Read the columnar snapshot when it exists.
+    use_cache (bool): Reuse the in-process cached frame while the data version is unchanged.
 
     Returns:
     pd.DataFrame: DataFrame with logistic processes and transactions data.
     """
-    logistic_processes = pd.DataFrame(LogisticProcess.objects.all().values(
-        'id', 'currency_exchange_house__name', 'process_type__name', 'start_date', 'end_date', 'status'
-    ))
-    transactions = pd.DataFrame(Transaction.objects.all().values(
-        'logistic_process_id', 'date', 'from_currency__code', 'to_currency__code', 'amount', 'exchange_rate__rate'
-    ))
-    optimizations = pd.DataFrame(Optimization.objects.all().values(
-        'logistic_process_id', 'efficiency_improvement', 'cost_reduction', 'processing_time_reduction'
-    ))
-    
-    # Merge the dataframes
-    df = (logistic_processes
-          .merge(transactions, left_on='id', right_on='logistic_process_id')
-          .merge(optimizations, left_on='id', right_on='logistic_process_id'))
-    
-    return df
+    return dataset.load_analytics_frame(use_snapshot, use_cache)
 
 def create_plot(data, plot_type, x, y, title, xlabel, ylabel, filename, output_dir, **kwargs):
     """
@@ -51,7 +42,7 @@ def create_plot(data, plot_type, x, y, title, xlabel, ylabel, filename, output_d
     elif plot_type == 'bar':
         sns.barplot(x=x, y=y, data=data)
     elif plot_type == 'heatmap':
-        pivot_data = data.pivot_table(values=y, index=kwargs.get('index'), columns=kwargs.get('columns'), aggfunc='mean')
+        pivot_data = data.pivot_table(values=y, index=kwargs.get('index'), columns=kwargs.get('columns'), aggfunc='mean', observed=True)
         sns.heatmap(pivot_data, annot=True, cmap='YlGnBu', fmt='.2f')
     elif plot_type == 'scatter':
         sns.scatterplot(x=x, y=y, data=data)
@@ -87,7 +78,7 @@ def generate_visualizations():
                 index='process_type__name', columns='currency_exchange_house__name')
 
     # Cost Breakdown
-    cost_breakdown = data.groupby('currency_exchange_house__name')['amount'].sum().reset_index()
+    cost_breakdown = data.groupby('currency_exchange_house__name', observed=True)['amount'].sum().reset_index()
     create_plot(cost_breakdown, 'bar', 'currency_exchange_house__name', 'amount', 
                 'Cost Breakdown', 'Exchange House', 'Total Cost', 
                 'cost_breakdown.png', output_dir)